@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+"""
+This file is part of the "DEMvironment" Add-on package for Orange3, that
+facilitates the data management of the DEM parameter calibration, Mainly using
+Aspherix(c) as a DEM calibration tool.
+DEMvironment add-on is a free software: you can redistribute it
+and/or modify it under the  terms of the GNU General Public License as
+published by the Free Software  Foundation, either version 3 of the License,
+or (at your option) any later version.
+
+DEMvironment add-on is distributed in the hope that it will be useful, but WITHOUT ANY
+ WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR
+ A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License along with
+ PP-SBSC. If not, see <https://www.gnu.org/licenses/>.
+
+ -------------------------------------------------------------------------
+    Contributing author and copyright for this file:
+
+        Copyright (c) 2023    Nazanin Ghods (TU Graz)
+        Copyright (c) 2023    Richard Amering (TU Graz)
+        Copyright (c) 2023    Stefan Radl (TU Graz)
+ -------------------------------------------------------------------------
+"""
+import argparse
+import random
+
+HEADER = """- {time} INFO    : This is Aspherix(R)calibration version 6.1.0
+                     git commit fd5aa51fd7ca1fb0e4338fad9db72bb7df00cec9
+                     built on Dec  5 2022 at 20:29:29
+
+- {time} INFO    : attempting to {attempt} calibraiton
+"""
+MODELS = [
+    ("normal_contact_model", "hertz"),
+    ("tangential_contact_model", "history"),
+    ("cohesion_model", "sjkr"),
+    ("rolling_friction_model", "epsd"),
+    ("surface_model", "default"),
+    ("coarsegraining_val", "1"),
+]
+MATERIALS = [
+    ("density_p", "999"), ("young_w", "1e7"), ("young_p", "10000"), ("poisson_p", "0.5"),
+    ("poisson_w", "0.3"), ("char_vel", "1"), ("rest_coef_pw", "0.5"), ("rest_coef_pp", "0.5"),
+    ("fric_coef_pp", "0.01"), ("fric_coef_pw", "0.1"), ("roll_fric_pp", "0.1"), ("roll_fric_pw", "0.2"),
+    ("roll_damp_pw", "0.3"), ("roll_damp_pp", "0.3"), ("cohesion_energy_pp", "500.0"),
+    ("cohesion_energy_pw", "200.0"),
+]
+RESPONSES = ["angle", "cohesion index"]
+
+
+class LogWriter:
+    """Writes log lines with a wall clock that advances by the given seconds."""
+
+    def __init__(self, file, clock=8 * 3600):
+        self.file = file
+        self.clock = clock
+        self.lines = 0
+
+    def stamp(self):
+        clock = self.clock % 86400
+        return f"{clock // 3600:02d}:{clock // 60 % 60:02d}:{clock % 60:02d}"
+
+    def write(self, marker, payload, seconds=0):
+        self.clock += seconds
+        self.file.write(f"- {self.stamp()} {marker} : {payload}\n")
+        self.lines += 1
+
+    def write_raw(self, text):
+        self.file.write(text)
+        self.lines += text.count("\n")
+
+
+def iteration_lines(parameters, cases):
+    """Number of log lines written per iteration."""
+    return 2 + len(parameters) + 1 + len(cases) * (8 + len(RESPONSES)) + 1
+
+
+def write_setup(log, parameters, cases, psd_classes, max_function_eval, restart):
+    log.write_raw(HEADER.format(time=log.stamp(), attempt="restart" if restart else "run"))
+    log.write("COMMAND", "reading file .\\benchmark.casx")
+    for name, value in MATERIALS:
+        log.write("COMMAND", f"variable {name} string {value}")
+    for index in range(psd_classes):
+        log.write("COMMAND", f"variable rp{index + 1} string {1.0e-3 * (1 + 0.2 * index):.4e}")
+    for index in range(psd_classes):
+        log.write("COMMAND", f"variable mf{index + 1} string {1 / psd_classes:.6g}")
+    for name, value in MODELS:
+        log.write("COMMAND", f"variable {name} string {value}")
+    log.write("COMMAND", f"variable n_iter string {max_function_eval}")
+    for name in parameters:
+        log.write("COMMAND", f"param_calibration {name} type log init 0.1 min 0.001 max 1")
+    radii = " ".join(f"${{rp{index + 1}}}" for index in range(psd_classes))
+    mass_fractions = " ".join(f"${{mf{index + 1}}}" for index in range(psd_classes))
+    log.write("COMMAND", f"particle_distribution p density ${{density_p}} radius {radii} mass_fraction {mass_fractions}")
+    log.write("COMMAND", "optimizer_setting maxFunctionEval ${n_iter}")
+    for case, template in cases:
+        log.write("COMMAND", f"calibration_case {case} template {template} type Aspherix target_param "
+                             f"{' '.join(parameters)} measfile measurements/{template}.dat parameter_overrides "
+                             f"pairGranModel ${{normal_contact_model}} nChunks 1 coresPerChunk 1")
+    log.write("COMMAND", "run single")
+    log.write("INFO   ", "entering run mode single")
+
+
+def write_iteration(log, rng, iteration, parameters, cases):
+    log.write("INFO   ", "------------------------")
+    log.write("INFO   ", f"iteration {iteration}")
+    for name in parameters:
+        log.write("INFO   ", f"setting parameter {name} to value {rng.uniform(0.001, 1):.6g}")
+    log.write("INFO   ", f"added {len(cases)} jobs to worker pool. will run them using 1 workers")
+    total_qf = 0.0
+    for case, template in cases:
+        log.write("INFO   ", f"running iteration for case {case} using template {template}")
+        log.write_raw(f"                     up-to-date log file of this simulation is located at : "
+                      f"calibration\\workDir\\workDir.{iteration}\\Aspherix\\{case}\\logRun.txt\n")
+        log.write("COMMAND", f"attempting direct simulation run of case {case}")
+        log.write("COMMAND", f"direct running script aspherix_{template}.asx")
+        log.write("INFO   ", f"direct simulation run of case {case} succeeded", rng.randint(1200, 1600))
+        log.write("INFO   ", f"iteration of case {case} succeeded with return status 0")
+        for response in RESPONSES:
+            log.write("INFO   ", f"{response}: {rng.uniform(1, 20):.6g}", 1)
+        quality_function = rng.uniform(5, 50)
+        total_qf += quality_function
+        log.write("INFO   ", f"calibration case {case} returned with value 0 - quality function: "
+                             f"{quality_function:.6g} - scaled qf: {quality_function:.6g}")
+    log.write("INFO   ", f"total quality function {total_qf:.6g}")
+
+
+def generate_log(file, iterations=30, parameters=3, templates=1, restarts=0, psd_classes=2, seed=0):
+    """
+    Write a deterministic calibration log with the given number of iterations,
+    calibrated parameters, templates (one calibration case each), restarts and
+    PSD classes. A restart repeats the setup and the last iteration before it,
+    as Aspherix does when a calibration is resumed. Returns the number of lines.
+    """
+    rng = random.Random(seed)
+    log = LogWriter(file)
+    parameter_names = [f"param_{index}" for index in range(parameters)]
+    cases = [(f"test{index + 1}", f"template{index + 1}") for index in range(templates)]
+    segment_ends = {iterations * (index + 1) // (restarts + 1) for index in range(restarts)}
+    write_setup(log, parameter_names, cases, psd_classes, iterations, restart=False)
+    for iteration in range(1, iterations + 1):
+        write_iteration(log, rng, iteration, parameter_names, cases)
+        if iteration in segment_ends:
+            write_setup(log, parameter_names, cases, psd_classes, iterations, restart=True)
+            write_iteration(log, rng, iteration, parameter_names, cases)
+    log.write("INFO   ", "reached max. number of function evaluations")
+    log.write("INFO   ", "calibration ended successfully")
+    return log.lines
+
+
+def generate_log_with_lines(file, lines, parameters=3, templates=1, restarts=0, psd_classes=2, seed=0):
+    """generate_log with the number of iterations chosen to give about the given number of lines."""
+    per_iteration = iteration_lines(range(parameters), range(templates))
+    iterations = max(1, lines // per_iteration)
+    return generate_log(file, iterations, parameters, templates, restarts, psd_classes, seed)
+
+
+def write_calibrated_params(file, parameters=3, seed=0):
+    """Write a calibrated_params.txt with the given number of calibrated parameters."""
+    rng = random.Random(seed)
+    file.write("# paramName bestVal qf@bestVal fnEvalfBestVal\n")
+    for index in range(parameters):
+        file.write(f"param_{index} {rng.uniform(0.001, 1):.6g} 12.3482 28\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a synthetic Aspherix calibration log.")
+    parser.add_argument("output", help="path of the log file to write")
+    parser.add_argument("--lines", type=int, default=1000, help="approximate number of lines")
+    parser.add_argument("--parameters", type=int, default=3)
+    parser.add_argument("--templates", type=int, default=1)
+    parser.add_argument("--restarts", type=int, default=0)
+    parser.add_argument("--psd-classes", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    with open(args.output, 'w') as file:
+        lines = generate_log_with_lines(file, args.lines, args.parameters, args.templates, args.restarts,
+                                        args.psd_classes, args.seed)
+    print(f"{lines} lines written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""
+This file is part of the "DEMvironment" Add-on package for Orange3, that
+facilitates the data management of the DEM parameter calibration, Mainly using
+Aspherix(c) as a DEM calibration tool.
+DEMvironment add-on is a free software: you can redistribute it
+and/or modify it under the  terms of the GNU General Public License as
+published by the Free Software  Foundation, either version 3 of the License,
+or (at your option) any later version.
+
+DEMvironment add-on is distributed in the hope that it will be useful, but WITHOUT ANY
+ WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR
+ A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License along with
+ PP-SBSC. If not, see <https://www.gnu.org/licenses/>.
+
+ -------------------------------------------------------------------------
+    Contributing author and copyright for this file:
+
+        Copyright (c) 2023    Nazanin Ghods (TU Graz)
+        Copyright (c) 2023    Richard Amering (TU Graz)
+        Copyright (c) 2023    Stefan Radl (TU Graz)
+ -------------------------------------------------------------------------
+"""
+# Import time of the GUI-free modules, measured with python -X importtime in a
+# fresh interpreter per module. Run from the repository root:
+#
+#     python benchmarks/benchImportTime.py
+#     python benchmarks/benchImportTime.py shared.aspherixCli orangedemvironment.OWReadAspherix
+#
+# The shared modules are imported by every worker process of the campaign
+# extraction and by the command-line extractor, so they must not pull in Qt,
+# Orange or numpy.
+import argparse
+import os
+import subprocess
+import sys
+
+REPOSITORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_MODULES = [
+    "shared.aspherixLog",
+    "shared.aspherixBatch",
+    "shared.aspherixCasx",
+    "shared.aspherixWorkDir",
+    "shared.metadataWarehouse",
+    "shared.aspherixCli",
+    "orangedemvironment.readAspehrix",
+]
+HEAVY_PACKAGES = ["PyQt5", "Orange", "numpy"]
+
+
+def import_time(module, repeat):
+    """
+    Return the best cumulative import time of module in microseconds and the
+    heavy packages it imported.
+    """
+    best = None
+    heavy = set()
+    for _ in range(repeat):
+        result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                                cwd=REPOSITORY, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.strip().splitlines()[-1])
+        cumulative = None
+        for line in result.stderr.splitlines():
+            if not line.startswith("import time:") or "|" not in line:
+                continue
+            _, cumulative_us, name = line[len("import time:"):].split("|")
+            name = name.strip()
+            if name.split(".")[0] in HEAVY_PACKAGES:
+                heavy.add(name.split(".")[0])
+            if name == module:
+                cumulative = int(cumulative_us)
+        if cumulative is not None and (best is None or cumulative < best):
+            best = cumulative
+    return best, sorted(heavy)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the import time of the GUI-free modules.")
+    parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES)
+    parser.add_argument("--repeat", type=int, default=5, help="interpreter starts per module, the best is reported")
+    args = parser.parse_args()
+    print(f"{'module':<36} {'import [ms]':>12}  heavy imports")
+    for module in args.modules:
+        try:
+            microseconds, heavy = import_time(module, args.repeat)
+        except RuntimeError as e:
+            print(f"{module:<36} {'failed':>12}  {e}")
+            continue
+        print(f"{module:<36} {microseconds / 1000:>12.1f}  {', '.join(heavy) or '-'}")
+
+
+if __name__ == "__main__":
+    main()
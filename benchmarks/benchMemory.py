@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""
+This file is part of the "DEMvironment" Add-on package for Orange3, that
+facilitates the data management of the DEM parameter calibration, Mainly using
+Aspherix(c) as a DEM calibration tool.
+DEMvironment add-on is a free software: you can redistribute it
+and/or modify it under the  terms of the GNU General Public License as
+published by the Free Software  Foundation, either version 3 of the License,
+or (at your option) any later version.
+
+DEMvironment add-on is distributed in the hope that it will be useful, but WITHOUT ANY
+ WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR
+ A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License along with
+ PP-SBSC. If not, see <https://www.gnu.org/licenses/>.
+
+ -------------------------------------------------------------------------
+    Contributing author and copyright for this file:
+
+        Copyright (c) 2023    Nazanin Ghods (TU Graz)
+        Copyright (c) 2023    Richard Amering (TU Graz)
+        Copyright (c) 2023    Stefan Radl (TU Graz)
+ -------------------------------------------------------------------------
+"""
+# Memory benchmark of the parsed log data held for many runs at once, run from
+# the repository root:
+#
+#     python benchmarks/benchMemory.py
+#     python benchmarks/benchMemory.py --runs 1000 --lines 20000 --parameters 6 --psd-classes 10
+#
+# One synthetic log is parsed and its iteration history, parameter definitions
+# and PSD classes are held for every run, once in the compact containers of
+# shared.aspherixRecords and once in the dicts and lists they replace (the
+# shape of their JSON serialization). The memory allocated by Python
+# (tracemalloc) for all runs is reported.
+import argparse
+import os
+import pickle
+import sys
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from shared import aspherixLog
+from benchmarks.aspherixLogGenerator import generate_log_with_lines
+
+
+def compact_state(parser):
+    """The parsed data as held by CalibrationLogParser."""
+    return parser.history, parser.calibrated_parameters_property, parser.psd
+
+
+def dict_state(parser):
+    """The same data in plain dicts and lists, as held before the compact containers."""
+    history = parser.history
+    columns = {"iteration": list(history.iterations)}
+    for columns_by_key in (history.parameters, history.responses, history.quality_functions):
+        columns.update((str(key), list(column)) for key, column in columns_by_key.items())
+    columns["total quality function"] = list(history.total_quality_function)
+    columns["simulation duration [s]"] = list(history.simulation_duration)
+    columns["jobs"] = list(history.jobs)
+    columns["workers"] = list(history.workers)
+    case_rows = {case: list(rows) for case, rows in history.case_rows.items()}
+    parameters = {name: param_details.to_dict() for name, param_details in parser.calibrated_parameters_property.items()}
+    return columns, case_rows, parameters, parser.psd.to_dict()
+
+
+def held_bytes(build, runs):
+    """Bytes allocated by Python to hold build() for the given number of runs."""
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        held = [build() for _ in range(runs)]
+        size = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+    del held
+    return size
+
+
+def run(runs, lines, parameters, templates, psd_classes):
+    with tempfile.TemporaryDirectory() as directory:
+        log_path = os.path.join(directory, aspherixLog.LOG_FILE_NAME)
+        with open(log_path, 'w') as file:
+            written = generate_log_with_lines(file, lines, parameters, templates, psd_classes=psd_classes)
+        parser = aspherixLog.parse_calibration_log(log_path)
+    # Every run gets its own objects, as if its log was parsed separately
+    compact = pickle.dumps(compact_state(parser), protocol=pickle.HIGHEST_PROTOCOL)
+    plain = pickle.dumps(dict_state(parser), protocol=pickle.HIGHEST_PROTOCOL)
+    iterations = len(parser.history)
+    print(f"{runs} runs of {written} lines, {iterations} iterations each")
+    print(f"{'containers':<16} {'held [MiB]':>11} {'per run [KiB]':>14} {'per iteration [B]':>18}")
+    results = {}
+    for name, state in (("dicts and lists", plain), ("compact", compact)):
+        size = held_bytes(lambda: pickle.loads(state), runs)
+        results[name] = size
+        print(f"{name:<16} {size / 2**20:>11.2f} {size / runs / 2**10:>14.1f} {size / runs / max(iterations, 1):>18.1f}")
+    if results["compact"]:
+        print(f"reduction: {results['dicts and lists'] / results['compact']:.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the memory of the parsed log data of many runs.")
+    parser.add_argument("--runs", type=int, default=1000, help="number of runs held at once")
+    parser.add_argument("--lines", type=int, default=10000, help="approximate log size in lines")
+    parser.add_argument("--parameters", type=int, default=3)
+    parser.add_argument("--templates", type=int, default=1)
+    parser.add_argument("--psd-classes", type=int, default=2)
+    args = parser.parse_args()
+    run(args.runs, args.lines, args.parameters, args.templates, args.psd_classes)
+
+
+if __name__ == "__main__":
+    main()
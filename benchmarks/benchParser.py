@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+"""
+This file is part of the "DEMvironment" Add-on package for Orange3, that
+facilitates the data management of the DEM parameter calibration, Mainly using
+Aspherix(c) as a DEM calibration tool.
+DEMvironment add-on is a free software: you can redistribute it
+and/or modify it under the  terms of the GNU General Public License as
+published by the Free Software  Foundation, either version 3 of the License,
+or (at your option) any later version.
+
+DEMvironment add-on is distributed in the hope that it will be useful, but WITHOUT ANY
+ WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR
+ A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License along with
+ PP-SBSC. If not, see <https://www.gnu.org/licenses/>.
+
+ -------------------------------------------------------------------------
+    Contributing author and copyright for this file:
+
+        Copyright (c) 2023    Nazanin Ghods (TU Graz)
+        Copyright (c) 2023    Richard Amering (TU Graz)
+        Copyright (c) 2023    Stefan Radl (TU Graz)
+ -------------------------------------------------------------------------
+"""
+# Benchmarks of the Aspherix parsers on synthetic logs, run from the repository root:
+#
+#     python benchmarks/benchParser.py
+#     python benchmarks/benchParser.py --lines 1000 100000 10000000 --repeat 3
+#
+# Every stage reports the best wall time of the repeats and the peak memory
+# allocated by Python (tracemalloc) of one extra run. The Orange table stage
+# is skipped when Orange is not installed.
+#
+# Regressions are checked against a baseline recorded on the same machine:
+#
+#     python benchmarks/benchParser.py --repeat 3 --save-baseline benchmarks/parser_baseline.json
+#     python benchmarks/benchParser.py --compare benchmarks/parser_baseline.json --max-slowdown 1.5
+#
+# The baseline covers the default log sizes, the 10,000,000 line log included,
+# so both take about three minutes.
+# The comparison runs the log sizes and generator settings of the baseline and
+# exits with status 1 when a stage got slower, or needs more memory, than the
+# baseline times the factor. The committed baseline was recorded on a
+# development machine, record a new one before comparing on another machine.
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from shared import aspherixLog
+from benchmarks.aspherixLogGenerator import generate_log_with_lines, write_calibrated_params
+
+DEFAULT_LINES = [1000, 100000, 10000000]
+DEFAULT_MAX_SLOWDOWN = 1.5
+# Stages faster than this are compared as if they took this long, shorter
+# timings are dominated by noise
+MIN_COMPARED_SECONDS = 0.01
+# Likewise for the peak memory of a stage, in MiB
+MIN_COMPARED_PEAK = 1.0
+# Generator settings stored with a baseline, a comparison runs the same ones
+BASELINE_SETTINGS = ["lines", "repeat", "parameters", "templates", "restarts", "psd_classes"]
+
+
+def measure(function, repeat):
+    """Return the best wall time in seconds and the peak traced memory in bytes of function()."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        function()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return best, peak
+
+
+def stages(log_path, calibrated_params_path, array_to_orange_table=None):
+    """The benchmarked stages as (name, function) pairs."""
+    parser = aspherixLog.parse_calibration_log(log_path)
+    stage_list = [
+        ("parse log", lambda: aspherixLog.parse_calibration_log(log_path).results()),
+        ("iteration history array", parser.history_table),
+        ("read calibrated_params", lambda: aspherixLog.read_calibrated_params(calibrated_params_path)),
+    ]
+    if array_to_orange_table is None:
+        return stage_list
+    column_names, values = parser.history_table()
+    stage_list.append(("iteration history table", lambda: array_to_orange_table(column_names, values)))
+    return stage_list
+
+
+def run(lines_list, repeat, parameters, templates, restarts, psd_classes):
+    """
+    Run all stages for every log size and print one line per stage. Returns
+    {lines: {stage: {"time [s]": ..., "peak [MiB]": ...}}}, keyed by the
+    requested log size as a string.
+    """
+    results = {}
+    try:
+        # dictHandler only imports Orange when a table is built
+        import Orange.data  # noqa: F401
+        from shared.dictHandler import array_to_orange_table
+    except ImportError:
+        print("Orange is not installed, the table conversion is skipped.")
+        array_to_orange_table = None
+    print(f"{'lines':>10} {'stage':<26} {'time [s]':>10} {'lines/s':>12} {'peak [MiB]':>11}")
+    with tempfile.TemporaryDirectory() as directory:
+        for lines in lines_list:
+            log_path = os.path.join(directory, aspherixLog.LOG_FILE_NAME)
+            calibrated_params_path = os.path.join(directory, aspherixLog.CALIBRATED_PARAMS_FILE_NAME)
+            with open(log_path, 'w') as file:
+                written = generate_log_with_lines(file, lines, parameters, templates, restarts, psd_classes)
+            with open(calibrated_params_path, 'w') as file:
+                write_calibrated_params(file, parameters)
+            for name, function in stages(log_path, calibrated_params_path, array_to_orange_table):
+                seconds, peak = measure(function, repeat)
+                rate = written / seconds if seconds > 0 else float("inf")
+                print(f"{written:>10} {name:<26} {seconds:>10.4f} {rate:>12.0f} {peak / 2**20:>11.2f}")
+                results.setdefault(str(lines), {})[name] = {"time [s]": round(seconds, 6),
+                                                            "peak [MiB]": round(peak / 2**20, 4)}
+    return results
+
+
+def compare(results, baseline, max_slowdown):
+    """
+    Print the ratio of every stage to the baseline and return the regressions
+    as (lines, stage, measure, ratio). Stages missing from the baseline are
+    not compared.
+    """
+    floors = {"time [s]": MIN_COMPARED_SECONDS, "peak [MiB]": MIN_COMPARED_PEAK}
+    regressions = []
+    print(f"{'lines':>10} {'stage':<26} {'time ratio':>10} {'peak ratio':>11}")
+    for lines, stage_results in results.items():
+        for name, measured in stage_results.items():
+            reference = baseline["results"].get(lines, {}).get(name)
+            if reference is None:
+                continue
+            ratios = {key: max(measured[key], floor) / max(reference[key], floor) for key, floor in floors.items()}
+            flag = "  REGRESSION" if max(ratios.values()) > max_slowdown else ""
+            print(f"{lines:>10} {name:<26} {ratios['time [s]']:>10.2f} {ratios['peak [MiB]']:>11.2f}{flag}")
+            regressions.extend((lines, name, key, ratio) for key, ratio in ratios.items() if ratio > max_slowdown)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Aspherix parsers on synthetic logs.")
+    parser.add_argument("--lines", type=int, nargs="+", default=DEFAULT_LINES,
+                        help="approximate log sizes in lines")
+    parser.add_argument("--repeat", type=int, default=1, help="timed runs per stage, the best is reported")
+    parser.add_argument("--parameters", type=int, default=3)
+    parser.add_argument("--templates", type=int, default=1)
+    parser.add_argument("--restarts", type=int, default=0)
+    parser.add_argument("--psd-classes", type=int, default=2)
+    parser.add_argument("--save-baseline", metavar="FILE", help="write the results as a baseline to FILE")
+    parser.add_argument("--compare", metavar="FILE",
+                        help="compare with the baseline in FILE, using its log sizes and generator settings")
+    parser.add_argument("--max-slowdown", type=float, default=DEFAULT_MAX_SLOWDOWN,
+                        help="factor of the baseline time or peak memory above which a stage fails the comparison")
+    args = parser.parse_args()
+    settings = {name: getattr(args, name) for name in BASELINE_SETTINGS}
+    baseline = None
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+        settings.update(baseline["settings"])
+    results = run(settings["lines"], settings["repeat"], settings["parameters"], settings["templates"],
+                  settings["restarts"], settings["psd_classes"])
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as file:
+            json.dump({"settings": settings, "results": results}, file, indent=4)
+            file.write("\n")
+    if baseline is None:
+        return 0
+    regressions = compare(results, baseline, args.max_slowdown)
+    for lines, name, key, ratio in regressions:
+        print(f"{name} on {lines} lines: {key} is {ratio:.2f} times the baseline (limit {args.max_slowdown})")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+"""
+This file is part of the "DEMvironment" Add-on package for Orange3, that 
+facilitates the data management of the DEM parameter calibration, Mainly using
+Aspherix(c) as a DEM calibration tool.
+DEMvironment add-on is a free software: you can redistribute it
+and/or modify it under the  terms of the GNU General Public License as 
+published by the Free Software  Foundation, either version 3 of the License,
+or (at your option) any later version.
+
+DEMvironment add-on is distributed in the hope that it will be useful, but WITHOUT ANY
+ WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR
+ A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License along with
+ PP-SBSC. If not, see <https://www.gnu.org/licenses/>.
+ 
+ -------------------------------------------------------------------------
+    Contributing author and copyright for this file:
+        
+        Copyright (c) 2023    Nazanin Ghods (TU Graz)
+        Copyright (c) 2023    Richard Amering (TU Graz)
+        Copyright (c) 2023    Stefan Radl (TU Graz)
+ -------------------------------------------------------------------------
+"""
+import os
+from PyQt5.QtWidgets import QFileDialog, QPlainTextEdit, QTableWidget, QTableWidgetItem, QHeaderView
+from PyQt5.QtCore import QTimer, Qt
+from Orange.widgets import widget, gui, settings
+from Orange.widgets.utils.concurrent import ConcurrentWidgetMixin, TaskState
+from Orange.data import Table
+from shared.dictHandler import records_to_orange_table
+from shared.campaignMonitor import CampaignMonitor
+
+# Columns of the live table, the keys of the campaignMonitor status records
+TABLE_COLUMNS = ["run", "status", "iteration", "completed iterations", "best quality function",
+                 "last iteration duration [s]", "ETA [h]", "idle time [s]"]
+# The campaign root is scanned for new runs on every n-th refresh
+RESCAN_EVERY = 12
+
+
+def poll_campaign(monitor, rescan, state: TaskState):
+    """Poll the logs of all monitored runs on a worker thread and return their status records."""
+    def progress(done, total):
+        state.set_progress_value(100 * done / total)
+        if state.is_interruption_requested():
+            raise InterruptedError("Polling cancelled.")
+
+    if rescan:
+        monitor.rescan()
+    return monitor.poll(progress=progress)
+
+
+class OWCampaignMonitor(widget.OWWidget, ConcurrentWidgetMixin):
+    name = "Campaign Monitor"
+    description = "Follow many running Aspherix calibrations at once."
+    icon = "icons/ReadAspherix.png"
+    priority = 11
+    want_main_area = True
+
+    campaign_root = settings.Setting("")
+    run_directories = settings.Setting("")
+    refresh_interval = settings.Setting(5)
+    monitor = None
+
+    class Inputs:
+        campaign_directory = widget.Input("Campaign Directory", str)
+
+    class Outputs:
+        campaign_status = widget.Output("Campaign Status", Table)
+
+    def __init__(self):
+        widget.OWWidget.__init__(self)
+        ConcurrentWidgetMixin.__init__(self)
+        self.refresh_count = 0
+
+        # Runs Box: a root that is scanned for calibration logs and/or a list of run directories
+        runs_box = gui.widgetBox(self.controlArea, "Runs", orientation="vertical")
+        gui.widgetLabel(runs_box, "Campaign root:")
+        root_hbox = gui.hBox(runs_box)
+        gui.lineEdit(root_hbox, self, "campaign_root")
+        gui.button(root_hbox, self, "Browse", callback=self.browse_campaign_root)
+        gui.widgetLabel(runs_box, "Run directories (one per line):")
+        self.run_directories_edit = QPlainTextEdit(self)
+        self.run_directories_edit.setPlainText(self.run_directories)
+        self.run_directories_edit.textChanged.connect(self.on_run_directories_changed)
+        runs_box.layout().addWidget(self.run_directories_edit)
+
+        # Monitor Box
+        monitor_box = gui.widgetBox(self.controlArea, "Monitor", orientation="vertical")
+        gui.spin(monitor_box, self, "refresh_interval", 1, 3600, label="Refresh every (s):",
+                 callback=self.on_refresh_interval_changed)
+        monitor_buttons = gui.hBox(monitor_box)
+        self.start_btn = gui.button(monitor_buttons, self, "Start", callback=self.start_monitoring)
+        self.stop_btn = gui.button(monitor_buttons, self, "Stop", callback=self.stop_monitoring)
+        self.stop_btn.setEnabled(False)
+        self.monitor_label = gui.widgetLabel(monitor_box, "")
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.timeout.connect(self.refresh)
+        gui.rubber(self.controlArea)
+
+        # Main Area
+        self.status_table = QTableWidget(self.mainArea)
+        self.status_table.setColumnCount(len(TABLE_COLUMNS))
+        self.status_table.setHorizontalHeaderLabels(TABLE_COLUMNS)
+        self.status_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        self.status_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.status_table.setSortingEnabled(True)
+        self.status_table.sortByColumn(0, Qt.AscendingOrder)
+        self.mainArea.layout().addWidget(self.status_table)
+
+    def onDeleteWidget(self):
+        self.stop_monitoring()
+        self.shutdown()
+        super().onDeleteWidget()
+
+    def browse_campaign_root(self):
+        directory_path = QFileDialog.getExistingDirectory(self, "Select Campaign Root Directory", self.campaign_root)
+        if directory_path:
+            self.campaign_root = directory_path
+
+    def on_run_directories_changed(self):
+        self.run_directories = self.run_directories_edit.toPlainText()
+
+    def on_refresh_interval_changed(self):
+        self.refresh_timer.setInterval(self.refresh_interval * 1000)
+
+    @Inputs.campaign_directory
+    def set_campaign_directory(self, directory):
+        if directory:
+            self.campaign_root = directory
+            self.start_monitoring()
+
+    def start_monitoring(self):
+        """Start following the runs of the campaign root and of the run list."""
+        self.stop_monitoring()
+        self.warning()
+        directories = [line.strip() for line in self.run_directories.splitlines() if line.strip()]
+        if self.campaign_root and not os.path.isdir(self.campaign_root):
+            self.warning(f"The campaign directory '{self.campaign_root}' does not exist.")
+            return
+        if not self.campaign_root and not directories:
+            self.warning("Please select a campaign root or list the run directories.")
+            return
+        self.monitor = CampaignMonitor(directories, root=self.campaign_root)
+        self.refresh_count = 0
+        self.start_btn.setEnabled(False)
+        self.stop_btn.setEnabled(True)
+        self.refresh_timer.setInterval(self.refresh_interval * 1000)
+        self.refresh_timer.start()
+        self.refresh()
+
+    def stop_monitoring(self):
+        self.refresh_timer.stop()
+        self.cancel()
+        if self.monitor is not None:
+            self.monitor.close()
+            self.monitor = None
+        self.start_btn.setEnabled(True)
+        self.stop_btn.setEnabled(False)
+
+    def refresh(self):
+        """Poll the runs on a worker thread, a refresh is skipped while the previous one still runs."""
+        if self.monitor is None or self.task is not None:
+            return
+        self.start(poll_campaign, self.monitor, self.refresh_count % RESCAN_EVERY == 0)
+        self.refresh_count += 1
+
+    def on_done(self, records):
+        self.display_records(records)
+        statuses = {}
+        for record in records:
+            statuses[record["status"]] = statuses.get(record["status"], 0) + 1
+        summary = ", ".join(f"{count} {status}" for status, count in statuses.items())
+        self.monitor_label.setText(f"{len(records)} runs: {summary}" if records else "No runs found yet.")
+        self.Outputs.campaign_status.send(records_to_orange_table(records) if records else None)
+
+    def on_exception(self, ex):
+        self.error(f"An error occurred while polling the runs: {ex}")
+
+    def on_partial_result(self, result):
+        pass
+
+    def display_records(self, records):
+        """Show one row per run, the sorting chosen by the user is kept."""
+        self.error()
+        sort_column = self.status_table.horizontalHeader().sortIndicatorSection()
+        sort_order = self.status_table.horizontalHeader().sortIndicatorOrder()
+        self.status_table.setSortingEnabled(False)
+        self.status_table.setRowCount(len(records))
+        for row, record in enumerate(records):
+            for column, key in enumerate(TABLE_COLUMNS):
+                value = record[key]
+                item = QTableWidgetItem()
+                # Numbers are set as data so they sort numerically
+                item.setData(Qt.DisplayRole, value if isinstance(value, (int, float)) else str(value or ""))
+                if key == "run":
+                    item.setToolTip(record["directory"])
+                elif key == "status" and record.get("error"):
+                    item.setToolTip(record["error"])
+                self.status_table.setItem(row, column, item)
+        self.status_table.setSortingEnabled(True)
+        self.status_table.sortItems(sort_column, sort_order)
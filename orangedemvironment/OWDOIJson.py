@@ -28,9 +28,7 @@ from Orange.widgets import widget, gui, settings
 from Orange.widgets.widget import Msg
 import os
 import json
-import glob
-import uuid  # for generating unique DOI
-from datetime import datetime
+from shared import metadataWarehouse
 
 class OWDOIJson(widget.OWWidget):
     name = "DOI.json"
@@ -55,9 +53,6 @@ class OWDOIJson(widget.OWWidget):
         super().__init__()
         
         self.meta_info = {}
-        
-        # Flag to distinguish between generate DOI and submit new version actions
-        self.is_new_version = False
 
         
         # Create a QGroupBox in the main area
@@ -159,55 +154,22 @@ class OWDOIJson(widget.OWWidget):
        
 
     def generate_doi(self):
-        widget_indicator = self.get_widget_indicator()
-        # Get the current date and time
-        current_datetime = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        # Assign a new DOI (version 0) and save the metadata file in the directory path
+        combined_data, file_path = metadataWarehouse.assign_doi(self.input_json_data, self.extracted_directory)
+        self.show_saved_metadata(combined_data)
         
-        if not self.is_new_version:
-            # Reset the version to 0 for a new DOI
-            self.meta_info["version"] = 0
-            
-            # Generate a custom DOI
-            unique_doi = str(uuid.uuid4())  # Generate a unique UUID
-            custom_doi = f"{widget_indicator}-{unique_doi[:8]}"  # Using the first 8 characters of the UUID
-            
-        else:
-            # Keep the old UUID and increment the version
-            unique_doi = self.meta_info["doi"].replace(f"{self.widget_indicator}-", "", 1)
-            custom_doi = f"{widget_indicator}-{unique_doi[:8]}"  # Using the first 8 characters of the UUID
-        # Show the DOI label after generating the DOI
-        self.doi_label.setText(f"DOI: {custom_doi}")
+    def show_saved_metadata(self, combined_data):
+        self.meta_info = combined_data["meta_info"]
+        # Show the DOI label, the DOI is shortened to the first 8 characters of the UUID
+        self.doi_label.setText(f"DOI: {os.path.splitext(metadataWarehouse.warehouse_file_name(combined_data))[0]}")
         self.doi_label.show()
         
-        # Create or update the meta-information dictionary
-        self.meta_info.update({
-            "Archived time": current_datetime,
-            "doi": f"{widget_indicator}-{unique_doi}",
-            "version": self.meta_info.get("version", 0)  # Default to 0 if version is not set
-            })
-    
-
-        # Append the meta-information dictionary to the beginning of the input JSON data
-        combined_data = {"meta_info": self.meta_info, **self.input_json_data}
-
-        # Save the combined data to a .json file in the directory path
-        if combined_data:
-            file_path = os.path.join(self.extracted_directory, f"{widget_indicator}-{unique_doi[:8]}.json")
-            with open(file_path, 'w') as json_file:
-                json.dump(combined_data, json_file, indent=4) 
-                
-                # Store the combined data in an instance variable for later use
-                self.combined_data_json = json.dumps(combined_data, indent=4)
-    
-                # Enable the "Submit to Metadata Registry" button
-                self.submit_to_registry_button.setEnabled(True)
+        # Store the combined data in an instance variable for later use
+        self.combined_data_json = json.dumps(combined_data, indent=4)
 
-            # Refresh the directory information after creating the .json file
-            self.refresh_directory_info()
-            
-      
-        # After generating the DOI, reset the flag
-        self.is_new_version = False
+        # Refresh the directory information after creating the .json file
+        self.refresh_directory_info()
+        
         # Enable the button after generating the DOI or submitting a new version
         self.submit_to_registry_button.setEnabled(True)
         
@@ -272,26 +234,12 @@ class OWDOIJson(widget.OWWidget):
     
     def extract_directory(self, data_str):
         data_dict = json.loads(data_str)
-        widget_indicator = ""
         
         # Check the source widget and extract the directory accordingly
-        if "Data Info" in data_dict:
-            file_path = data_dict["Data Info"].get("File location/Links", "")
-            directory = os.path.dirname(file_path)
-            widget_indicator = "exp"
-            self.connected_widget_label.setText("Connected Widget: Experiment")
-        elif "Correlation Info" in data_dict:
-            file_path = data_dict["Correlation Info"].get("Python file path", "")
-            directory = os.path.dirname(file_path)
-            widget_indicator = "rel"
-            self.connected_widget_label.setText("Connected Widget: Relational")
-        elif "Calibration Case" in data_dict:
-            directory = data_dict["Calibration Case"].get("Local Directory", "")
-            widget_indicator = "calib"
-            self.connected_widget_label.setText("Connected Widget: Read Aspherix")
-        else:
-            directory = ""
-            self.connected_widget_label.setText("Connected Widget: None")
+        directory = metadataWarehouse.document_directory(data_dict)
+        widget_indicator = metadataWarehouse.widget_indicator(data_dict)
+        connected_widgets = {"exp": "Experiment", "rel": "Relational", "calib": "Read Aspherix"}
+        self.connected_widget_label.setText(f"Connected Widget: {connected_widgets.get(widget_indicator, 'None')}")
         
         self.extracted_directory = directory
         self.widget_indicator = widget_indicator  # Set as an instance variable
@@ -300,30 +248,14 @@ class OWDOIJson(widget.OWWidget):
         return self.extracted_directory
     
     def submit_new_version(self):
-        self.is_new_version = True
-        
-        self.is_new_version = True
         selected_file = self.json_file_combobox.currentText()  # Get the selected file from the ComboBox
         existing_file_path = os.path.join(self.extracted_directory, selected_file)
         
         if os.path.isfile(existing_file_path):
-            with open(existing_file_path, 'r') as file:
-                data = json.load(file)
-                old_version = data["meta_info"]["version"]
-                old_uuid = data["meta_info"]["doi"].replace(f"{self.widget_indicator}-", "", 1)  # Extract the old UUID
-            
-            # Rename the existing file to backup with the old version number
-            backup_file_path = existing_file_path + f".v{old_version}.bak"
-            os.rename(existing_file_path, backup_file_path)
-                
-            # Update the version in meta_info without changing the UUID
-            new_version = old_version + 1
-            self.meta_info["version"] = new_version
-            self.meta_info["doi"] = f"{self.widget_indicator}-{old_uuid}"  # Keep the old UUID
-            
-            # Refresh directory info and save the new version
-            self.refresh_directory_info()
-            self.generate_doi()
+            # Keep the old UUID, increment the version and back up the existing file with its version number
+            combined_data, file_path = metadataWarehouse.assign_new_version(self.input_json_data, existing_file_path)
+            new_version = combined_data["meta_info"]["version"]
+            self.show_saved_metadata(combined_data)
 
             # Display the success message
             self.success_label.setText(f"The metadata for the new version (v{new_version}) has been created and saved.")
@@ -331,9 +263,7 @@ class OWDOIJson(widget.OWWidget):
 
     def check_existing_json_files(self):
         """Check for existing JSON files and return their paths."""
-        json_file_pattern = os.path.join(self.extracted_directory, f"{self.widget_indicator}-*.json")
-        json_files = glob.glob(json_file_pattern)
-        return json_files if json_files else []
+        return metadataWarehouse.existing_metadata_files(self.extracted_directory, self.widget_indicator)
 
     @Inputs.json_data
     def set_input_data(self, data):
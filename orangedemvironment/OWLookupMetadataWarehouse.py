@@ -24,13 +24,49 @@ You should have received a copy of the GNU General Public License along with
 """
 import os
 import json
+import sqlite3
+import time
+from functools import partial
 from PyQt5.QtWidgets import (QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
                              QComboBox, QLineEdit, QListWidget, QMessageBox, 
                              QFileDialog, QWidget, QTextEdit)
 from Orange.widgets import widget, gui, settings
 from Orange.widgets.widget import Output
+from Orange.widgets.utils.concurrent import ConcurrentWidgetMixin, TaskState
+from Orange.data import Table
+from shared.dictHandler import records_to_orange_table
+from shared import warehouseStats, metadataWarehouse
+from shared.warehouseService import get_warehouse_service
+from shared.warehouseQuery import QueryError
 
-class OWLookupMetadataWarehouse(widget.OWWidget):
+# A search refreshes the index in the background when it is older than this
+INDEX_REFRESH_INTERVAL_S = 5
+
+
+def validate_warehouse(warehouse_index, only_if_changed, state: TaskState):
+    """
+    Bring the warehouse index up to date on a worker thread, the added and
+    changed files are read by a thread pool. Returns the file counts, the keys
+    per kind of file and the core-hour records, all taken from the index.
+    With only_if_changed the warehouse is only scanned when its directories
+    changed, None is returned when the index did not change.
+    """
+    def progress(done, total):
+        state.set_progress_value(100 * done / total)
+        if state.is_interruption_requested():
+            raise InterruptedError("Validation cancelled.")
+
+    state.set_status("Reading the warehouse...")
+    changes = warehouse_index.update(progress=progress, only_if_changed=only_if_changed)
+    if only_if_changed and changes == (0, 0, 0):
+        return None
+    file_stats = warehouse_index.file_counts()
+    keys_for_file_type = {prefix: set(warehouse_index.keys(prefix)) for prefix in file_stats}
+    core_hour_records = warehouseStats.core_hour_records_from_index(warehouse_index)
+    return file_stats, keys_for_file_type, core_hour_records
+
+
+class OWLookupMetadataWarehouse(widget.OWWidget, ConcurrentWidgetMixin):
     name = "Lookup Metadata Warehouse"
     description = "Search and preview metadata from a warehouse directory."
     icon = "icons/LookupMetadataWarehouse.png"
@@ -42,16 +78,21 @@ class OWLookupMetadataWarehouse(widget.OWWidget):
     # Output signal to display the previewed file content
     class Outputs:
         file_content = widget.Output("File Content", str)
+        core_hours = widget.Output("Core Hours", Table)
 
     # Settings
     metadata_warehouse_directory = settings.Setting("")
 
     def __init__(self):
-        super().__init__()
+        widget.OWWidget.__init__(self)
+        ConcurrentWidgetMixin.__init__(self)
         self.setup_ui()
         self.file_stats = {"exp": 0, "rel": 0, "calib": 0}
         self.current_file_type = None
         self.keys_for_file_type = {"exp": set(), "rel": set(), "calib": set()}
+        self.warehouse_index = None
+        self.index_updated_at = None
+        self.repeat_search = None
         
         # self.search_results_list = QListWidget()
         # self.search_results_list.itemClicked.connect(self.display_file_content)
@@ -75,6 +116,10 @@ class OWLookupMetadataWarehouse(widget.OWWidget):
         self.load_validate_button = QPushButton("Load and Validate")
         self.load_validate_button.clicked.connect(self.load_and_validate)
         self.controlArea.layout().addWidget(self.load_validate_button)
+        self.cancel_button = QPushButton("Cancel")
+        self.cancel_button.clicked.connect(self.cancel)
+        self.cancel_button.setEnabled(False)
+        self.controlArea.layout().addWidget(self.cancel_button)
 
         # File statistics display
         self.stats_label = QLabel("File Statistics: Not Loaded")
@@ -98,6 +143,16 @@ class OWLookupMetadataWarehouse(widget.OWWidget):
         lookup_box.layout().addWidget(self.search_value_input)
         lookup_box.layout().addWidget(self.search_button)
 
+        # Typed query over all keys of the selected kind of file
+        query_box = gui.widgetBox(self.controlArea, "Query")
+        self.query_input = QLineEdit()
+        self.query_input.setPlaceholderText("young_p between 1e4 and 1e6 and cohesion_model == sjkr")
+        self.query_input.returnPressed.connect(self.on_query_clicked)
+        self.query_button = QPushButton("Run Query")
+        self.query_button.clicked.connect(self.on_query_clicked)
+        query_box.layout().addWidget(self.query_input)
+        query_box.layout().addWidget(self.query_button)
+
         # Search results list
         self.results_list = QListWidget()
         self.results_list.itemClicked.connect(self.preview_file)
@@ -119,34 +174,87 @@ class OWLookupMetadataWarehouse(widget.OWWidget):
             QMessageBox.warning(self, "Error", "Directory does not exist.")
             return
 
-        self.file_stats = {"exp": 0, "rel": 0, "calib": 0}
-        self.keys_for_file_type = {"exp": set(), "rel": set(), "calib": set()}
+        # Only the files added or changed since the last load are read into the index
+        try:
+            self.warehouse_index = get_warehouse_service().index(self.metadata_warehouse_directory)
+        except (OSError, sqlite3.Error) as e:
+            self.warehouse_index = None
+            QMessageBox.warning(self, "Error", f"The warehouse index could not be opened: {e}")
+            return
+        self.repeat_search = None
+        self.index_updated_at = None
+        self.set_busy(True)
+        self.start(validate_warehouse, self.warehouse_index, False)
 
-        for file in os.listdir(self.metadata_warehouse_directory):
-            if file.endswith(".json"):
-                prefix = file.split("-")[0]
-                if prefix in ["exp", "rel", "calib"]:
-                    self.file_stats[prefix] += 1
-                    self.collect_keys_from_file(file, prefix)
+    def refresh_index(self, repeat_search):
+        """
+        Update the index on the worker after a search, when it was not updated
+        recently and the warehouse directories changed, and repeat the search
+        with the updated index. Searching stays possible meanwhile.
+        """
+        if self.task is not None or (self.index_updated_at is not None
+                                     and time.monotonic() - self.index_updated_at < INDEX_REFRESH_INTERVAL_S):
+            return
+        self.repeat_search = repeat_search
+        self.load_validate_button.setEnabled(False)
+        self.cancel_button.setEnabled(True)
+        self.start(validate_warehouse, self.warehouse_index, True)
 
-        self.stats_label.setText(f"File Statistics: exp-{self.file_stats['exp']}, "
-                                 f"rel-{self.file_stats['rel']}, calib-{self.file_stats['calib']}")
+    def set_busy(self, busy):
+        # The first validation fills the index, searching waits until it is complete
+        self.load_validate_button.setEnabled(not busy)
+        self.search_button.setEnabled(not busy)
+        self.query_button.setEnabled(not busy)
+        self.cancel_button.setEnabled(busy)
 
-    def collect_keys_from_file(self, file_name, prefix):
-        file_path = os.path.join(self.metadata_warehouse_directory, file_name)
-        with open(file_path, 'r') as file:
-            data = json.load(file)
-            self.extract_keys(data, self.keys_for_file_type[prefix])
-    
-    def extract_keys(self, data, keys_set):
-        if isinstance(data, dict):
-            for key, value in data.items():
-                keys_set.add(key)
-                self.extract_keys(value, keys_set)
-        elif isinstance(data, list):
-            for item in data:
-                self.extract_keys(item, keys_set)
+    def on_done(self, result):
+        self.set_busy(False)
+        self.index_updated_at = time.monotonic()
+        if result is None:
+            # The warehouse did not change, the results shown are up to date
+            self.repeat_search = None
+            return
+        self.file_stats, self.keys_for_file_type, core_hour_records = result
+        if self.current_file_type:
+            search_key = self.search_key_combo.currentText()
+            self.populate_search_key_dropdown()
+            self.search_key_combo.setCurrentText(search_key)
 
+        self.update_stats_label()
+        self.send_core_hours(core_hour_records)
+        repeat_search, self.repeat_search = self.repeat_search, None
+        if repeat_search is not None:
+            repeat_search()
+
+    def on_exception(self, ex):
+        self.set_busy(False)
+        self.repeat_search = None
+        QMessageBox.warning(self, "Error", f"The warehouse index could not be updated: {ex}")
+
+    def on_partial_result(self, result):
+        pass
+
+    def cancel(self):
+        ConcurrentWidgetMixin.cancel(self)
+        self.set_busy(False)
+        self.repeat_search = None
+        # The files read before the cancellation stay in the index
+        self.stats_label.setText("Validation cancelled, load again to continue.")
+
+    def onDeleteWidget(self):
+        self.shutdown()
+        super().onDeleteWidget()
+
+    def update_stats_label(self):
+        cache_stats = get_warehouse_service().stats()
+        self.stats_label.setText(f"File Statistics: exp-{self.file_stats['exp']}, "
+                                 f"rel-{self.file_stats['rel']}, calib-{self.file_stats['calib']}\n"
+                                 f"Parsed file cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses")
+
+    def send_core_hours(self, core_hour_records):
+        """Send the core-hours of the registered calibrations by material, template and contact model."""
+        aggregated = warehouseStats.aggregate_core_hours(core_hour_records)
+        self.Outputs.core_hours.send(records_to_orange_table(aggregated) if aggregated else None)
 
     def on_file_type_changed(self, text):
         self.current_file_type = {"Experiment": "exp", "Relational": "rel", "Calibration": "calib"}[text]
@@ -166,26 +274,10 @@ class OWLookupMetadataWarehouse(widget.OWWidget):
         for file in os.listdir(self.metadata_warehouse_directory):
             if file.startswith(self.current_file_type) and file.endswith(".json"):
                 file_path = os.path.join(self.metadata_warehouse_directory, file)
-                with open(file_path, 'r') as json_file:
-                    data = json.load(json_file)
-                    if search_key in data and data[search_key] == search_value:
-                        self.results_list.addItem(file)
+                data = metadataWarehouse.read_metadata_file(file_path)
+                if search_key in data and data[search_key] == search_value:
+                    self.results_list.addItem(file)
     
-    def match_key_value(self, data, key, value):
-        if isinstance(data, dict):
-            for k, v in data.items():
-                if k == key and str(v) == value:
-                    return True
-                elif isinstance(v, (dict, list)):
-                    if self.match_key_value(v, key, value):
-                        return True
-        elif isinstance(data, list):
-            for item in data:
-                if isinstance(item, (dict, list)):
-                    if self.match_key_value(item, key, value):
-                        return True
-        return False
-
     def on_search_clicked(self):
         search_key = self.search_key_combo.currentText()
         search_value = self.search_value_input.text()
@@ -198,32 +290,75 @@ class OWLookupMetadataWarehouse(widget.OWWidget):
             QMessageBox.warning(self, "Warning", "Please provide both search key and value.")
             return
     
-        # Iterate over the files in the selected category
-        for file_name in os.listdir(self.metadata_warehouse_directory):
-            if file_name.startswith(self.current_file_type) and file_name.endswith('.json'):
-                file_path = os.path.join(self.metadata_warehouse_directory, file_name)
-                with open(file_path, 'r') as json_file:
-                    data = json.load(json_file)
-                    if self.match_key_value(data, search_key, search_value):
-                        self.results_list.addItem(file_name)
+        if self.warehouse_index is None:
+            QMessageBox.warning(self, "Warning", "Please load the metadata warehouse first.")
+            return
     
+        # A DOI gives the path of its file directly, in a flat as well as in a sharded warehouse
+        if search_key == "doi" and search_value.startswith(f"{self.current_file_type}-"):
+            self.show_doi_file(search_value)
+            return
+
+        self.show_search_results(self.current_file_type, search_key, search_value)
+        self.refresh_index(partial(self.show_search_results, self.current_file_type, search_key, search_value))
+
+    def show_doi_file(self, doi):
+        file_path = metadataWarehouse.find_doi_file(doi, self.metadata_warehouse_directory)
+        try:
+            document = metadataWarehouse.read_metadata_file(file_path) if file_path else None
+        except (OSError, ValueError):
+            document = None
+        meta_info = document.get("meta_info") if isinstance(document, dict) else None
+        if isinstance(meta_info, dict) and meta_info.get("doi") == doi:
+            self.results_list.addItem(os.path.relpath(file_path, self.metadata_warehouse_directory))
+
+    def show_search_results(self, file_type, search_key, search_value):
+        # Answered from the index as of the last update, the search does not open or list any file
+        self.results_list.clear()
+        self.results_list.addItems(self.warehouse_index.search(file_type, search_key, search_value))
+
+    def on_query_clicked(self):
+        query = self.query_input.text().strip()
+        self.results_list.clear()
+        if not query:
+            QMessageBox.warning(self, "Warning", "Please enter a query.")
+            return
+        if self.warehouse_index is None:
+            QMessageBox.warning(self, "Warning", "Please load the metadata warehouse first.")
+            return
+        if self.task is not None and self.index_updated_at is None:
+            # The first validation still runs, the index is not complete yet
+            return
+
+        if self.show_query_results(self.current_file_type, query):
+            self.refresh_index(partial(self.show_query_results, self.current_file_type, query))
+
+    def show_query_results(self, file_type, query):
+        self.results_list.clear()
+        try:
+            file_names = self.warehouse_index.query(file_type, query)
+        except QueryError as e:
+            QMessageBox.warning(self, "Invalid Query", str(e))
+            return False
+        self.results_list.addItems(file_names)
+        return True
+
     def preview_file(self, item):
         file_name = item.text()
         file_path = os.path.join(self.metadata_warehouse_directory, file_name)
-        with open(file_path, 'r') as file:
-            content = json.load(file)
-            self.file_preview.setText(json.dumps(content, indent=4))
-            self.Outputs.file_content.send(json.dumps(content))
+        content = metadataWarehouse.read_metadata_file(file_path)
+        self.file_preview.setText(json.dumps(content, indent=4))
+        self.Outputs.file_content.send(json.dumps(content))
+        self.update_stats_label()
     
     def display_file_content(self, item):
         file_name = item.text()
         file_path = os.path.join(self.metadata_warehouse_directory, file_name)
         
         try:
-            with open(file_path, 'r') as file:
-                data = json.load(file)
-                pretty_json = json.dumps(data, indent=4, sort_keys=True)
-                self.file_preview.setText(pretty_json)
+            data = metadataWarehouse.read_metadata_file(file_path)
+            pretty_json = json.dumps(data, indent=4, sort_keys=True)
+            self.file_preview.setText(pretty_json)
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to load file: {e}")
     
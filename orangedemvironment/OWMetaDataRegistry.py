@@ -29,6 +29,7 @@ from Orange.widgets.widget import Output
 import os
 import json
 import shutil
+from shared import metadataWarehouse
 
 
 class MetaDataRegistry(widget.OWWidget):
@@ -162,7 +163,8 @@ class MetaDataRegistry(widget.OWWidget):
             return
 
         file_name = self.generate_file_name_from_json_data(json_data)
-        file_path = os.path.join(self.metadata_warehouse_directory, file_name)
+        # Flat or sharded, the path follows from the DOI without listing the warehouse
+        file_path = metadataWarehouse.warehouse_file_path(json_data, self.metadata_warehouse_directory)
 
         if os.path.exists(file_path):
             self.handle_existing_file(file_path, json_data)
@@ -175,18 +177,16 @@ class MetaDataRegistry(widget.OWWidget):
     def get_json_data(self):
         if self.radio_registry_from_dir.isChecked() or self.radio_registry_browse_local.isChecked():
             if self.selected_json_file and os.path.isfile(self.selected_json_file):
-                with open(self.selected_json_file, 'r') as file:
-                    return json.load(file)
+                return metadataWarehouse.read_metadata_file(self.selected_json_file)
         elif self.radio_registry_from_json.isChecked():
             return json.loads(self.received_json_content)
         return None
 
     def is_valid_json_data(self, json_data):
-        return all(key in json_data.get("meta_info", {}) for key in ["version", "doi", "Archived time"])
+        return metadataWarehouse.is_valid_metadata(json_data)
 
     def handle_existing_file(self, existing_file_path, new_json_data):
-        with open(existing_file_path, 'r') as file:
-            existing_data = json.load(file)
+        existing_data = metadataWarehouse.read_metadata_file(existing_file_path)
 
         if new_json_data["meta_info"]["version"] > existing_data["meta_info"]["version"]:
             self.prompt_for_new_version_registration(existing_file_path, new_json_data)
@@ -228,12 +228,10 @@ class MetaDataRegistry(widget.OWWidget):
 
 
     def save_json_data_to_file(self, json_data, file_path):
-        with open(file_path, 'w') as file:
-            json.dump(json_data, file, indent=4)
+        metadataWarehouse.save_json_data_to_file(json_data, file_path)
 
     def generate_file_name_from_json_data(self, json_data):
-        doi = json_data["meta_info"]["doi"]
-        return f"{doi.split('-')[0]}-{doi.split('-')[1][:8]}.json"
+        return metadataWarehouse.warehouse_file_name(json_data)
 
     
     def show_message(self, message, error=False, success=False):
@@ -24,15 +24,111 @@ You should have received a copy of the GNU General Public License along with
  -------------------------------------------------------------------------
 """
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from PyQt5.QtWidgets import QMessageBox, QTreeWidgetItem, QTreeWidget, QVBoxLayout, QLabel, QPushButton, QFileDialog, QLineEdit, QHBoxLayout, QComboBox, QDoubleSpinBox, QTextEdit
 from PyQt5.QtWidgets import QSizePolicy
+from PyQt5.QtCore import QFileSystemWatcher, QTimer
 from Orange.widgets import widget, gui, settings
+from Orange.widgets.utils.concurrent import ConcurrentWidgetMixin, TaskState
 from Orange.data import Table, Domain, StringVariable
-from shared.dictHandler import dict_to_orange_table
-import re
+from shared.dictHandler import dict_to_orange_table, array_to_orange_table, records_to_orange_table
+from shared import aspherixLog, aspherixBatch, aspherixResults, aspherixWorkDir, aspherixCasx, compressedFiles
 import json
 
-class OWReadAspherix(widget.OWWidget):
+def file_signature(file_path):
+    """(path, size, mtime_ns) of a file, None if there is none. Tells whether a file has to be read again."""
+    try:
+        stat = os.stat(file_path)
+    except (OSError, TypeError):
+        return None
+    return file_path, stat.st_size, stat.st_mtime_ns
+
+
+def log_snapshot(log_follower):
+    """The results of the parsed log and its iteration history as (column names, array), None without iterations."""
+    parser = log_follower.parser
+    history_table = parser.history_table() if len(parser.history) else None
+    return log_follower.results(), history_table
+
+
+def refresh_followed_log(log_follower, follow_lock, calibrated_params, results_files, state: TaskState):
+    """
+    Parse the bytes appended to a followed log on a worker thread. Returns
+    None when nothing was appended, otherwise the new snapshot of the log
+    with calibrated_params.txt and the result files. Those two are given as
+    (signature, data) of the previous refresh and only read again when they
+    changed.
+    """
+    with follow_lock:
+        if not log_follower.poll():
+            return None
+        extracted_data, history_table = log_snapshot(log_follower)
+    run_directory = os.path.dirname(log_follower.path)
+
+    calibrated_params_path = compressedFiles.find_file(run_directory, "calibrated_params.txt")
+    signature = file_signature(calibrated_params_path)
+    if signature != calibrated_params[0]:
+        calibrated_params = signature, aspherixLog.load_calibrated_params(calibrated_params_path) if signature else None
+    signature = aspherixResults.results_signature(run_directory)
+    if signature != results_files[0]:
+        results_files = signature, aspherixResults.load_results(run_directory)
+    return {"extracted data": extracted_data, "history table": history_table,
+            "calibrated params": calibrated_params, "results files": results_files}
+
+
+def check_run_directory(directory, state: TaskState):
+    """
+    Look for the files of a run directory on a worker thread, the directory
+    may be on a slow network mount. The run status is read from the end of the log.
+    """
+    log_found = compressedFiles.find_file(directory, "log_aspherix-calibration.txt") is not None
+    return {
+        "directory": directory,
+        "log found": log_found,
+        "calibrated params found": compressedFiles.find_file(directory, "calibrated_params.txt") is not None,
+        "run status": aspherixLog.read_run_status(directory) if log_found else None,
+        "casx path": aspherixCasx.find_casx_file(directory)
+    }
+
+
+def run_extraction(log_file_path, calibrated_params_path, deep_scan, state: TaskState):
+    """
+    Parse the log, calibrated_params.txt and the .casx input deck on a worker thread,
+    reporting progress by bytes read. With deep_scan the solver logs of the workDir
+    are parsed as well.
+    """
+    # The deep scan takes the second half of the progress bar
+    share = 50 if deep_scan else 100
+
+    def progress(done, total):
+        state.set_progress_value(share * done / total)
+        if state.is_interruption_requested():
+            raise InterruptedError("Extraction cancelled.")
+
+    def deep_scan_progress(done, total):
+        progress(total + done, 2 * total)
+
+    state.set_status("Reading the log file...")
+    log_follower = aspherixLog.load_log_follower(log_file_path, progress=progress)
+    snapshot = log_snapshot(log_follower)
+    state.set_status("Reading calibrated_params.txt...")
+    calibrated_params = (file_signature(calibrated_params_path),
+                         aspherixLog.load_calibrated_params(calibrated_params_path))
+    run_directory = os.path.dirname(log_file_path)
+    results_files = aspherixResults.results_signature(run_directory), aspherixResults.load_results(run_directory)
+    casx_path = aspherixCasx.find_casx_file(run_directory)
+    input_deck = aspherixCasx.read_input_deck(casx_path) if casx_path else None
+    performance_records = None
+    if deep_scan:
+        state.set_status("Scanning the solver logs of the workDir...")
+        share = 100
+        performance_records = aspherixWorkDir.scan_run_logs(aspherixWorkDir.find_run_logs(run_directory),
+                                                             progress=deep_scan_progress)
+    return log_follower, snapshot, calibrated_params, results_files, performance_records, input_deck
+
+
+class OWReadAspherix(widget.OWWidget, ConcurrentWidgetMixin):
     name = "Read Aspherix"
     description = "Load data from Aspherix."
     icon = "icons/ReadAspherix.png"
@@ -46,9 +142,28 @@ class OWReadAspherix(widget.OWWidget):
     Target_Flow_State = settings.Setting(0)
     Consolidation_level = settings.Setting(0)
     Consolidation_Pressure = settings.Setting(0.0)
+    follow_log = settings.Setting(False)
+    deep_scan = settings.Setting(False)
+    campaign_directory = settings.Setting("")
+    # Fallback polling interval for file systems that do not report changes
+    follow_interval_ms = 5000
+    # A burst of file change notifications is parsed once, after this quiet time
+    follow_debounce_ms = 500
+    # The directory is checked once typing paused for this long
+    check_debounce_ms = 400
     templates_dict = {}
     templates_meta_info = {}  # Dictionary to store meta_info for each template
     extracted_data = []
+    iteration_history = None
+    history_table = None
+    results_files = {}
+    # (signature, data) of calibrated_params.txt and of the result files, to read them only when they change
+    calibrated_params_state = (None, None)
+    results_files_state = (None, {})
+    displayed_rows = []
+    log_follower = None
+    campaign_executor = None
+    campaign_discovery = None
     # Input signals
     class Inputs:
         user_data = widget.Input("User Data", Table)
@@ -61,14 +176,25 @@ class OWReadAspherix(widget.OWWidget):
         psd = widget.Output("PSD", Table)
         calibrated_parameter_properties = widget.Output("Calibrated Parameter Properties", Table)
         convergence = widget.Output("Convergence", Table)
+        timing = widget.Output("Timing", Table)
+        calibration_cases = widget.Output("Calibration Cases", Table)
         calibrated_parameters = widget.Output("Calibrated Parameters", Table)
         user_data = widget.Output("User Data", Table)
         calibration_case = widget.Output("Calibration Case", Table)
         template_meta_info = widget.Output("Template Meta Info", Table)
+        iteration_history = widget.Output("Iteration History", Table)
+        case_history = widget.Output("Case History", Table)
+        solver_performance = widget.Output("Solver Performance", Table)
+        input_deck_differences = widget.Output("Input Deck Differences", Table)
+        qf_history = widget.Output("QF History", Table)
+        conv_history = widget.Output("Convergence History", Table)
         json_output = widget.Output("JSON Output", str)
+        campaign_runs = widget.Output("Campaign Runs", Table)
+        campaign_json = widget.Output("Campaign JSON Documents", str)
 
     def __init__(self):
-        super().__init__()
+        widget.OWWidget.__init__(self)
+        ConcurrentWidgetMixin.__init__(self)
         
         self.user_info = {}
     
@@ -102,8 +228,12 @@ class OWReadAspherix(widget.OWWidget):
         dir_layout = QHBoxLayout()
         self.directory_input = QLineEdit(self)
         self.directory_input.setText(self.selected_directory)
+        self.check_debounce_timer = QTimer(self)
+        self.check_debounce_timer.setSingleShot(True)
+        self.check_debounce_timer.setInterval(self.check_debounce_ms)
+        self.check_debounce_timer.timeout.connect(self.check_files)
         self.directory_input.editingFinished.connect(self.check_files)
-        self.directory_input.textChanged.connect(self.check_files)
+        self.directory_input.textChanged.connect(lambda _: self.check_debounce_timer.start())
         dir_layout.addWidget(self.directory_input)
         
         self.load_directory_btn = QPushButton("Browse", self)
@@ -115,12 +245,45 @@ class OWReadAspherix(widget.OWWidget):
         # File check labels
         self.log_file_label = gui.widgetLabel(simulation_details_box, "")
         self.params_file_label = gui.widgetLabel(simulation_details_box, "")
+        self.run_status_label = gui.widgetLabel(simulation_details_box, "")
+        self.casx_file_label = gui.widgetLabel(simulation_details_box, "")
         
         # Add a button to extract data
         self.extract_data_btn = QPushButton("Extract Data", self)
         self.extract_data_btn.clicked.connect(self.extract_data)
         simulation_details_box.layout().addWidget(self.extract_data_btn)
         
+        # Follow mode for calibrations that are still running
+        gui.checkBox(simulation_details_box, self, "follow_log", "Follow the log file of a running calibration",
+                     callback=self.on_follow_log_changed)
+        gui.checkBox(simulation_details_box, self, "deep_scan", "Deep scan of the workDir solver logs (logRun.txt)")
+        self.log_watcher = QFileSystemWatcher(self)
+        self.log_watcher.fileChanged.connect(self.on_log_file_changed)
+        self.follow_timer = QTimer(self)
+        self.follow_timer.setInterval(self.follow_interval_ms)
+        self.follow_timer.timeout.connect(self.on_log_file_changed)
+        self.follow_debounce_timer = QTimer(self)
+        self.follow_debounce_timer.setSingleShot(True)
+        self.follow_debounce_timer.setInterval(self.follow_debounce_ms)
+        self.follow_debounce_timer.timeout.connect(self.refresh_followed_log)
+        # The follower is parsed on the worker, one refresh at a time
+        self.follow_lock = threading.Lock()
+        self.task_handlers = None
+        
+        # Campaign Box for the batch ingestion of all run directories below a root
+        campaign_box = gui.widgetBox(self.controlArea, "Campaign (Batch)", orientation="vertical")
+        campaign_hbox = gui.hBox(campaign_box)
+        gui.lineEdit(campaign_hbox, self, "campaign_directory")
+        gui.button(campaign_hbox, self, "Browse", callback=self.browse_campaign_directory)
+        campaign_buttons = gui.hBox(campaign_box)
+        self.extract_campaign_btn = gui.button(campaign_buttons, self, "Extract Campaign", callback=self.extract_campaign)
+        self.cancel_campaign_btn = gui.button(campaign_buttons, self, "Cancel", callback=self.cancel_campaign)
+        self.cancel_campaign_btn.setEnabled(False)
+        self.campaign_label = gui.widgetLabel(campaign_box, "")
+        self.campaign_timer = QTimer(self)
+        self.campaign_timer.setInterval(200)
+        self.campaign_timer.timeout.connect(self.on_campaign_progress)
+        
         # Calibration Reference (Exp./Rel) Metadata Box
         self.calibration_reference_box = gui.widgetBox(self.controlArea, "Calibration Reference (Exp./Rel) Metadata", orientation="vertical")
         self.calibration_reference_entries = {}
@@ -141,6 +304,12 @@ class OWReadAspherix(widget.OWWidget):
         self.mainArea.layout().addWidget(self.data_tree)
         self.adjustSize()
 
+    def onDeleteWidget(self):
+        self.shutdown()
+        self.stop_following()
+        self.cancel_campaign()
+        super().onDeleteWidget()
+
     def update_consolidation_pressure(self, value):
         self.Consolidation_Pressure = value
         
@@ -148,6 +317,10 @@ class OWReadAspherix(widget.OWWidget):
         """Load a directory and update the control area."""
         directory_path = QFileDialog.getExistingDirectory(self, "Select Directory")
         if directory_path:
+            # A new directory needs a new Extract Data before it is followed
+            self.cancel()
+            self.stop_following()
+            self.log_follower = None
             self.selected_directory = directory_path
             self.directory_input.setText(directory_path)
             self.check_files()
@@ -157,14 +330,31 @@ class OWReadAspherix(widget.OWWidget):
             self.repopulate_control_area_based_on_directory(directory_path)
             
     def check_files(self):
-        """Check for the presence of specified files in the directory."""
+        """Check for the presence of specified files in the directory, on the worker, see on_check_done."""
+        self.check_debounce_timer.stop()
         directory = self.directory_input.text().strip()
+        running = self.task_handlers[0] if self.task is not None else None
+        
+        # An extraction of the previous directory is no longer needed
+        if running == self.on_extraction_done and directory != self.selected_directory:
+            self.cancel()
+            running = None
         
         if not directory:
             return
-        
+        # The labels already show this directory, its extraction is not interrupted for a check
+        if running == self.on_extraction_done:
+            return
+        # A follow refresh has already consumed the appended lines, cancelling it would lose
+        # them, so the check waits until it is done
+        if running == self.on_follow_done:
+            self.check_debounce_timer.start()
+            return
+        self.start_task(self.on_check_done, self.on_check_exception, check_run_directory, directory)
+    
+    def on_check_done(self, result):
         # Check for log_aspherix-calibration.txt
-        if os.path.exists(os.path.join(directory, "log_aspherix-calibration.txt")):
+        if result["log found"]:
             self.log_file_label.setText("The Log File was found.")
             self.log_file_label.setStyleSheet('color: green')
         else:
@@ -172,12 +362,32 @@ class OWReadAspherix(widget.OWWidget):
             self.log_file_label.setStyleSheet('color: red')
         
         # Check for calibrated_params.txt
-        if os.path.exists(os.path.join(directory, "calibrated_params.txt")):
+        if result["calibrated params found"]:
             self.params_file_label.setText("The calibrated_params.txt file was found.")
             self.params_file_label.setStyleSheet('color: green')
         else:
             self.params_file_label.setText("The calibrated_params.txt file was not found.")
             self.params_file_label.setStyleSheet('color: red')
+        
+        # Quick status from the end of the log, the log itself is only parsed on Extract Data
+        status = result["run status"]
+        if status is not None:
+            self.run_status_label.setText(f"Converged: {status['isconverged']}, "
+                                          f"last iteration: {status['last iteration']}, "
+                                          f"best iteration: {status['best iteration']} "
+                                          f"(qf {status['best quality function']})")
+        else:
+            self.run_status_label.setText("")
+        
+        # The input deck is optional, it is only used to cross-check the log
+        casx_path = result["casx path"]
+        if casx_path:
+            self.casx_file_label.setText(f"The input deck {os.path.basename(casx_path)} was found.")
+        else:
+            self.casx_file_label.setText("No .casx input deck was found.")
+    
+    def on_check_exception(self, ex):
+        self.run_status_label.setText(f"The directory could not be checked: {ex}")
 
     @Inputs.user_data
     def set_input_data(self, data):
@@ -191,194 +401,104 @@ class OWReadAspherix(widget.OWWidget):
             self.info_label.setStyleSheet('color: red')
     
     def extract_calibration_data(self, logfile_path):
+        # Stream the log file once (or take it from the parse cache) and remember
+        # the parsed byte offset for the follow mode
+        log_follower = aspherixLog.load_log_follower(logfile_path)
+        self.set_log_follower(log_follower, log_snapshot(log_follower))
+    
+    def set_log_follower(self, log_follower, snapshot):
         self.extracted_data = []
-        # Define regular expressions to extract relevant lines
-        variable_pattern = re.compile(r'variable (\w+) string ([\d.e+-]+)')
-        param_calibration_pattern = re.compile(r'param_calibration (\w+) type (\w+) init ([\d.e+-]+) min ([\d.e+-]+) max ([\d.e+-]+)')
-
-        # Initialize dictionaries to store extracted data
-        Aspherix_calibration_software_info = {
-            "version": "",
-            "git commit": "",
-            "attempting to": "",
-            "run mode": ""
-        }
-        calibration_templates = {}
-        models = {
-            "normal_contact_model": "",
-            "tangential_contact_model": "",
-            "cohesion_model": "",
-            "rolling_friction_model": "",
-            "surface_model": "",
-            "coarsegraining_val": 0
-        }
-        input_parameters = {}
-        PSD = {
-            "radii_list": [],
-            "mass_fractions_list": [],
-            "dispersity": 0
-        }
-        calibrated_parameters_property = {}
+        self.stop_following()
+        self.log_follower = log_follower
+        self.follow_lock = threading.Lock()
+        self.update_extracted_data(*snapshot)
 
-        # Function to parse values with scientific notation
-        def parse_value(value_str):
-            try:
-                return int(value_str)
-            except ValueError:
-                try:
-                    return float(value_str)
-                except ValueError:
-                    return value_str
-
-        # Open and read the log file in reverse order
-        with open(logfile_path, 'r') as log_file:
-            lines = log_file.readlines()
-
-            # Check the final line for "ERROR" or anything other than "calibration ended successfully"
-            final_line = lines[-1].strip()
-            if ("ERROR" in final_line) or ("calibration ended successfully" not in final_line):
-                converged = "No"
-            else:
-                converged = "Yes"
-
-            for line in reversed(lines):
-                # Extract values for models using re
-                run_mode_match = re.search(r'run mode (single|sequential)', line)
-                if run_mode_match:
-                    run_mode = run_mode_match.group(1)
-                    Aspherix_calibration_software_info["run mode"] = run_mode
-                    continue
-                
-                if 'calibration_case' in line:
-                    # Extract the template name
-                    template_match = re.search(r'template (\w+)', line)
-                    if template_match:
-                        template_name = template_match.group(1)
-                        # Initialize the list of target parameters for this template
-                        if template_name not in calibration_templates:
-                            calibration_templates[template_name] = []
-    
-                        # Find the section of the line between 'target_param' and 'measfile'
-                        target_params_section = re.search(r'target_param(.*?)measfile', line)
-                        if target_params_section:
-                            # Extract all words in the section
-                            target_params = re.findall(r'(\w+)', target_params_section.group(1))
-                            # Add the target parameters to the template entry
-                            calibration_templates[template_name].extend(target_params)
-                
-                
-                model_match = re.search(r'variable (\w+) string (\S+)', line)
-                if model_match:
-                    name, value = model_match.groups()
-                    if name == "coarsegraining_val":
-                        models[name] = parse_value(value)
-                    elif name in models:
-                        models[name] = value
-                        continue
-
-                variable_match = variable_pattern.search(line)
-                if variable_match:
-                    name, value = variable_match.groups()
-                    if name.startswith("rp"):
-                        PSD["radii_list"].append(parse_value(value))
-                    elif name.startswith("mf"):
-                        PSD["mass_fractions_list"].append(parse_value(value))
-                    PSD["dispersity"] = len(PSD["radii_list"])
-                    input_parameters[name] = parse_value(value)
-                    continue
-
-                param_calibration_match = param_calibration_pattern.search(line)
-                if param_calibration_match:
-                    name, param_type, param_init, param_min, param_max = param_calibration_match.groups()
-
-                    # Create a dictionary to store parameter details
-                    param_details = {
-                        'type': param_type,
-                        'init': parse_value(param_init),
-                        'min': parse_value(param_min),
-                        'max': parse_value(param_max)
-                    }
-
-                    # Add the parameter details to the calibrated_parameters dictionary
-                    calibrated_parameters_property[name] = param_details
-                    continue
-
-                attempting_match = re.search(r'attempting to (run|restart) ', line)
-                if attempting_match:
-                    latest_attempting_to = attempting_match.group(1)
-                    Aspherix_calibration_software_info["attempting to"] = latest_attempting_to
-
-                git_commit_match = re.search(r'git commit (.+)', line)
-                if git_commit_match:
-                    latest_git_commit = git_commit_match.group(1)
-                    Aspherix_calibration_software_info["git commit"] = latest_git_commit
-
-                version_match = re.search(r'This is Aspherix\(R\)calibration version (.+)', line)
-                if version_match:
-                    latest_version = version_match.group(1)
-                    Aspherix_calibration_software_info["version"] = latest_version
-
-            desired_parameters = {
-                "density_p", "young_w", "young_p", "poisson_p", "poisson_w",
-                "rest_coef_pw", "rest_coef_pp", "fric_coef_pp", "fric_coef_pw",
-                "roll_fric_pp", "roll_fric_pw"
-            }
-            if models["normal_contact_model"] == "hooke":
-                desired_parameters.add("char_vel")
-
-            if models["rolling_friction_model"] == "epsd":
-                desired_parameters.update({
-                    "roll_damp_pw", "roll_damp_pp"
-                })
-
-            if models["cohesion_model"] in {"sjkr", "sjkr2"}:
-                desired_parameters.update({
-                    "cohesion_energy_pp", "cohesion_energy_pw"
-                })
-
-            if models["cohesion_model"] == "adaptive":
-                desired_parameters.update({
-                    "init_coh_stress_pw", "init_coh_stress_pp",
-                    "max_coh_stress_pp_0", "max_coh_stress_pp_min", "max_coh_stress_pp_max",
-                    "coh_strength_pp_0", "coh_strength_pp_min", "coh_strength_pp_max"
-                })
-
-            # Create a new dictionary with only the desired parameters
-            filtered_input_parameters = {
-                key: value for key, value in input_parameters.items() if key in desired_parameters
-            }
-
-            # Update the input_parameters dictionary
-            input_parameters = filtered_input_parameters
-            
-        convergence = {"isconverged": converged}
-        
-        self.templates_dict = calibration_templates
         # After extracting data, populate the reference fields
         self.populate_calibration_reference_fields(self.templates_dict)
         self.validate_and_send_data_btn.setEnabled(True)
-        self.extracted_data = [Aspherix_calibration_software_info,calibration_templates, models, input_parameters, PSD, calibrated_parameters_property, convergence]
+        if self.follow_log:
+            self.start_following()
         return 
     
-            
+    def update_extracted_data(self, extracted_data, history_table):
+        """Take over a snapshot of the log parser, taken on the worker."""
+        self.extracted_data = extracted_data
+        self.history_table = history_table
+        self.iteration_history = self.log_follower.parser.history
+        self.templates_dict = self.extracted_data[1]
+    
+    def on_follow_log_changed(self):
+        if self.follow_log and self.log_follower is not None:
+            self.start_following()
+        else:
+            self.stop_following()
+    
+    def start_following(self):
+        """Watch the log file, changes are parsed from the last byte offset on."""
+        if self.log_follower.path not in self.log_watcher.files():
+            self.log_watcher.addPath(self.log_follower.path)
+        self.follow_timer.start()
+        self.on_log_file_changed()
+    
+    def stop_following(self):
+        if self.log_watcher.files():
+            self.log_watcher.removePaths(self.log_watcher.files())
+        self.follow_timer.stop()
+        self.follow_debounce_timer.stop()
+    
+    def on_log_file_changed(self, *_):
+        """Debounce the change notifications, the refresh runs once the log is quiet for a moment."""
+        if self.log_follower is not None:
+            self.follow_debounce_timer.start()
+    
+    def refresh_followed_log(self):
+        """Parse the bytes appended to the log on the worker, see on_follow_done."""
+        if self.log_follower is None:
+            return
+        # Files that are replaced instead of appended drop out of the watcher
+        if self.log_follower.path not in self.log_watcher.files() and os.path.exists(self.log_follower.path):
+            self.log_watcher.addPath(self.log_follower.path)
+        # An extraction or a previous refresh is still running, the follow timer tries again
+        if self.task is not None:
+            return
+        self.start_task(self.on_follow_done, self.on_follow_exception, refresh_followed_log, self.log_follower,
+                        self.follow_lock, self.calibrated_params_state, self.results_files_state)
+    
+    def on_follow_done(self, result):
+        """Refresh the views whose data changed with the appended part of the log."""
+        if result is None:
+            return
+        self.error()
+        templates_dict = self.templates_dict
+        self.update_extracted_data(result["extracted data"], result["history table"])
+        if self.templates_dict != templates_dict:
+            self.populate_calibration_reference_fields(self.templates_dict)
+        
+        self.calibrated_params_state = result["calibrated params"]
+        data_list = [self.user_info, self.prepare_calibration_case_data()]
+        data_list.extend(self.extracted_data)
+        if self.calibrated_params_state[1] is not None:
+            data_list.append(self.calibrated_params_state[1])
+        self.refresh_data_list(data_list)
+        self.send_iteration_history()
+        results_files_changed = result["results files"] is not self.results_files_state
+        self.results_files_state = result["results files"]
+        self.results_files = self.results_files_state[1]
+        if results_files_changed or self.results_files.get(aspherixResults.QF_HISTORY_FILE_NAME) is None \
+                or self.results_files.get(aspherixResults.CONV_FILE_NAME) is None:
+            self.send_results_history()
+    
+    def on_follow_exception(self, ex):
+        self.error(f"An error occurred while following the log file: {ex}")
+    
     def read_calibrated_params(self,file_path):
-        calibrated_parameters = {}
-        with open(file_path, 'r') as file:
-            lines = file.readlines()
-            for line in lines[1:]:  # Skip the header line
-                parts = line.strip().split()
-                if len(parts) >= 2:
-                    param_name = parts[0]
-                    param_value = float(parts[1])
-                    calibrated_parameters[param_name] = param_value
-        return calibrated_parameters
+        return aspherixLog.load_calibrated_params(file_path)
     
     def extract_data(self):
         """Extract data from the user info, log and calibrated_params files."""
-        log_file_path = os.path.join(self.selected_directory, "log_aspherix-calibration.txt")
-        calibrated_params_path = os.path.join(self.selected_directory, "calibrated_params.txt")
-        dict_names =["User Info","Calibration Case","Aspherix_Info", "Templates and Target Calibrated Parameters","Models_info", "Input_parameters", "PSD", "Calibrated_parameter_properties", "Convergence","Calibrated_parameters"]
-        
+        # Archived runs may only have compressed (.gz, .xz, .bz2) copies of the files
+        log_file_path = compressedFiles.find_file(self.selected_directory, "log_aspherix-calibration.txt")
+        calibrated_params_path = compressedFiles.find_file(self.selected_directory, "calibrated_params.txt")
         data_list = []
     
         
@@ -409,37 +529,157 @@ class OWReadAspherix(widget.OWWidget):
         }
         data_list.append(calibration_case_data)
         
-        if os.path.exists(log_file_path):
-            self.extract_calibration_data(log_file_path)
-            data_list.extend(self.extracted_data)
-        else:
+        if not log_file_path:
             self.warning("The log_aspherix-calibration.txt file was not found in the selected directory.")
             return
+        if not calibrated_params_path:
+            self.warning("The calibrated_params.txt file was not found in the selected directory.")
+            return
         # Clear previous warnings
         self.warning()
+        self.error()
         
-        if os.path.exists(calibrated_params_path):
-            calibrated_params_data = self.read_calibrated_params(calibrated_params_path)
-            data_list.append(calibrated_params_data)
-        else:
-            self.warning("The calibrated_params.txt file was not found in the selected directory.")
-            return
-
+        # The files are parsed on a worker, the results arrive in on_done
+        self.pending_data_list = data_list
+        self.extract_data_btn.setEnabled(False)
+        self.start_task(self.on_extraction_done, self.on_extraction_exception, run_extraction,
+                        log_file_path, calibrated_params_path, self.deep_scan)
+    
+    def start_task(self, on_done, on_exception, task, *args):
+        """Run a task on the worker, its result or exception is handed to the given callbacks."""
+        self.task_handlers = on_done, on_exception
+        self.start(task, *args)
+    
+    def on_done(self, result):
+        self.task_handlers[0](result)
+    
+    def on_exception(self, ex):
+        self.task_handlers[1](ex)
+        
+    def on_extraction_done(self, result):
+        """Deliver the extracted data to the tree and the outputs once the worker finished."""
+        log_follower, snapshot, self.calibrated_params_state, self.results_files_state, performance_records, \
+            input_deck = result
+        self.results_files = self.results_files_state[1]
+        self.extract_data_btn.setEnabled(True)
+        self.set_log_follower(log_follower, snapshot)
+        
+        data_list = self.pending_data_list
+        data_list.extend(self.extracted_data)
+        data_list.append(self.calibrated_params_state[1])
         
         # Display the extracted data in the QTreeWidget
+        self.display_data_list(data_list)
+        
+        self.send_iteration_history()
+        self.send_results_history()
+        self.send_solver_performance(performance_records)
+        self.send_input_deck_differences(input_deck)
+        
+    def on_extraction_exception(self, ex):
+        self.extract_data_btn.setEnabled(True)
+        self.error(f"An error occurred while extracting the data: {ex}")
+        
+    def on_partial_result(self, result):
+        pass
+        
+    def cancel(self):
+        ConcurrentWidgetMixin.cancel(self)
+        self.extract_data_btn.setEnabled(True)
+        
+    def display_data_list(self, data_list):
+        """Display the extracted data in the QTreeWidget."""
+        dict_names =["User Info","Calibration Case","Aspherix_Info", "Templates and Target Calibrated Parameters","Models_info", "Input_parameters", "PSD", "Calibrated_parameter_properties", "Convergence", "Timing", "Calibration_cases", "Calibrated_parameters"]
         self.data_tree.clear()
+        self.displayed_rows = []
         for idx, data_dict in enumerate(data_list):
             top_item = QTreeWidgetItem(self.data_tree)
             top_item.setText(0, dict_names[idx])
-            for key, value in data_dict.items():
-                child_item = QTreeWidgetItem(top_item)
-                child_item.setText(0, key)
-                child_item.setText(1, str(value))
+            rows = [(key, str(value)) for key, value in data_dict.items()]
+            self.add_tree_rows(top_item, rows)
+            self.displayed_rows.append(rows)
             self.data_tree.addTopLevelItem(top_item)
+        if self.templates_meta_info:
+            self.update_templates_meta_info_view()
+    
+    def add_tree_rows(self, top_item, rows):
+        for key, value in rows:
+            child_item = QTreeWidgetItem(top_item)
+            child_item.setText(0, key)
+            child_item.setText(1, value)
+    
+    def refresh_data_list(self, data_list):
+        """Update the tree in place, only the sections whose rows changed are rebuilt."""
+        if len(data_list) != len(self.displayed_rows):
+            self.display_data_list(data_list)
+            return
+        for idx, data_dict in enumerate(data_list):
+            rows = [(key, str(value)) for key, value in data_dict.items()]
+            if rows == self.displayed_rows[idx]:
+                continue
+            top_item = self.data_tree.topLevelItem(idx)
+            top_item.takeChildren()
+            self.add_tree_rows(top_item, rows)
+            self.displayed_rows[idx] = rows
         
-        # Update the main area display
-        self.update_main_area()
-        #self.validate_and_send_data_btn.setEnabled(True)
+    def send_iteration_history(self):
+        """Send the optimizer steps of the log as a numeric table, one row per iteration."""
+        if self.history_table is None:
+            self.Outputs.iteration_history.send(None)
+            return
+        table = array_to_orange_table(*self.history_table)
+        self.Outputs.iteration_history.send(table)
+        self.send_case_history()
+        
+    def send_case_history(self):
+        """Send the iterations of all calibration cases as one table with a case column."""
+        records = []
+        for case, case_data in self.extracted_data[8].items():
+            records.extend({"case": case, **record} for record in case_data["iterations"])
+        self.Outputs.case_history.send(records_to_orange_table(records) if records else None)
+        
+    def send_results_history(self):
+        """
+        Send qf_history.dat and conv.dat of calibration/results. When they do not
+        exist, the same histories are taken from the iteration history of the log.
+        """
+        qf_history = self.results_files.get(aspherixResults.QF_HISTORY_FILE_NAME)
+        conv_history = self.results_files.get(aspherixResults.CONV_FILE_NAME)
+        if self.history_table is not None:
+            log_history = self.history_table
+            if qf_history is None:
+                qf_history = log_history
+            if conv_history is None:
+                conv_history = aspherixResults.best_quality_function_history(*log_history)
+        self.Outputs.qf_history.send(array_to_orange_table(*qf_history) if qf_history is not None else None)
+        self.Outputs.conv_history.send(array_to_orange_table(*conv_history) if conv_history is not None else None)
+        
+    def send_solver_performance(self, performance_records):
+        """Send one row per solver log, together with the parameter set of its iteration."""
+        if not performance_records:
+            self.Outputs.solver_performance.send(None)
+            return
+        parameter_sets = {}
+        if self.history_table is not None:
+            for row in self.history_table[1]:
+                parameter_sets[int(row[0])] = dict(zip(self.iteration_history.parameters, row[1:]))
+        records = []
+        for record in performance_records:
+            records.append({**record, **parameter_sets.get(record["iteration"], {})})
+        self.Outputs.solver_performance.send(records_to_orange_table(records))
+        
+    def send_input_deck_differences(self, input_deck):
+        """Send the differences between the .casx input deck and the setup echoed in the log."""
+        if input_deck is None:
+            self.Outputs.input_deck_differences.send(None)
+            return
+        differences = aspherixCasx.cross_check(input_deck, self.extracted_data)
+        if differences:
+            keys = ", ".join(sorted({difference["key"] for difference in differences}))
+            self.warning(f"The .casx input deck differs from the log in: {keys}")
+            self.Outputs.input_deck_differences.send(records_to_orange_table(differences))
+        else:
+            self.Outputs.input_deck_differences.send(None)
         
     def validate_data(self):
         """Check the required data before transmitting."""
@@ -465,13 +705,11 @@ class OWReadAspherix(widget.OWWidget):
             errors.append(f"The selected directory '{self.selected_directory}' does not exist.")
         else:
             # Check for log file
-            log_file_path = os.path.join(self.selected_directory, "log_aspherix-calibration.txt")
-            if not os.path.isfile(log_file_path):
+            if not compressedFiles.find_file(self.selected_directory, "log_aspherix-calibration.txt"):
                 errors.append("The log_aspherix-calibration.txt file was not found in the selected directory.")
 
         # Check for calibrated parameters file
-        calibrated_params_path = os.path.join(self.selected_directory, "calibrated_params.txt")
-        if not os.path.isfile(calibrated_params_path):
+        if not compressedFiles.find_file(self.selected_directory, "calibrated_params.txt"):
             errors.append("The calibrated_params.txt file was not found in the selected directory.")
         # Check if JSON file path fields are filled correctly
         for key, (label, line_edit, button) in self.calibration_reference_entries.items():
@@ -594,22 +832,11 @@ class OWReadAspherix(widget.OWWidget):
             QMessageBox.critical(self, "Validation Error", f"Cannot transmit data due to the following errors:\n{error_message}")
             return
         
-        calibrated_params_path = os.path.join(self.selected_directory, "calibrated_params.txt")
-        data_list = []
-        data_list.extend([
-                    ("Aspherix Info", self.extracted_data[0]),
-                    ("Templates Info", self.extracted_data[1]),
-                    ("Models Info", self.extracted_data[2]),
-                    ("Input Parameters", self.extracted_data[3]),
-                    ("PSD", self.extracted_data[4]),
-                    ("Calibrated Parameter Properties", self.extracted_data[5]),
-                    ("Convergence", self.extracted_data[6])
-                    
-                ])
-            
-        if os.path.exists(calibrated_params_path):
+        calibrated_params_path = compressedFiles.find_file(self.selected_directory, "calibrated_params.txt")
+        calibrated_params_data = None
+        if calibrated_params_path:
             calibrated_params_data = self.read_calibrated_params(calibrated_params_path)
-            data_list.append(("Calibrated Parameters", calibrated_params_data))
+        data_list = aspherixLog.calibration_sections(self.extracted_data, calibrated_params_data)
             
         # If validation passes, prepare the data for transmission
         try:
@@ -626,13 +853,8 @@ class OWReadAspherix(widget.OWWidget):
             self.send_data("template_meta_info", self.flatten_meta_info(self.templates_meta_info))
     
             # Prepare and send the JSON output
-            all_data = {
-                "User Data": self.user_info,
-                "Calibration Case": calibration_case_data
-            }
-            for name, data_dict in data_list:
-                all_data[name] = data_dict
-            all_data["Template Meta Info"] = self.templates_meta_info
+            all_data = aspherixLog.calibration_document(self.user_info, calibration_case_data,
+                                                        data_list, self.templates_meta_info)
             
             json_output = json.dumps(all_data, indent=4)
             self.Outputs.json_output.send(json_output)
@@ -640,6 +862,100 @@ class OWReadAspherix(widget.OWWidget):
         except Exception as e:
             QMessageBox.critical(self, "Transmission Error", f"An error occurred while transmitting data: {e}")
     
+    def browse_campaign_directory(self):
+        directory_path = QFileDialog.getExistingDirectory(self, "Select Campaign Root Directory", self.campaign_directory)
+        if directory_path:
+            self.campaign_directory = directory_path
+    
+    def extract_campaign(self):
+        """Find all run directories below the campaign root and parse them in a process pool."""
+        if not self.user_info:
+            self.warning("Please first connect the user data from the User widget.")
+            return
+        if not os.path.isdir(self.campaign_directory):
+            self.warning(f"The campaign directory '{self.campaign_directory}' does not exist.")
+            return
+        self.warning()
+        
+        # The campaign tree may be large or on a network mount, it is walked on a thread
+        discovery_executor = ThreadPoolExecutor(max_workers=1)
+        self.campaign_discovery = discovery_executor.submit(aspherixBatch.find_run_directories, self.campaign_directory)
+        discovery_executor.shutdown(wait=False)
+        self.campaign_label.setText("Looking for calibration run directories...")
+        self.extract_campaign_btn.setEnabled(False)
+        self.cancel_campaign_btn.setEnabled(True)
+        self.progressBarInit()
+        self.campaign_timer.start()
+    
+    def submit_campaign_runs(self):
+        """Start parsing the runs once the discovery of the run directories is done."""
+        discovery, self.campaign_discovery = self.campaign_discovery, None
+        try:
+            self.campaign_run_directories = discovery.result()
+        except OSError as e:
+            self.stop_campaign()
+            self.campaign_label.setText(f"The campaign directory could not be read: {e}")
+            return
+        if not self.campaign_run_directories:
+            self.stop_campaign()
+            self.campaign_label.setText("No calibration run directories were found.")
+            return
+        self.campaign_executor, self.campaign_futures = aspherixBatch.submit_runs(self.campaign_run_directories)
+        self.campaign_label.setText(f"Extracting {len(self.campaign_run_directories)} runs...")
+    
+    def on_campaign_progress(self):
+        if self.campaign_discovery is not None:
+            if self.campaign_discovery.done():
+                self.submit_campaign_runs()
+            return
+        done = sum(future.done() for future in self.campaign_futures)
+        self.progressBarSet(100 * done / len(self.campaign_futures))
+        if done == len(self.campaign_futures):
+            self.finish_campaign()
+    
+    def stop_campaign(self):
+        self.campaign_timer.stop()
+        # A discovery that is still running is left to finish, its result is dropped
+        self.campaign_discovery = None
+        if self.campaign_executor is not None:
+            self.campaign_executor.shutdown(wait=False, cancel_futures=True)
+            self.campaign_executor = None
+        self.progressBarFinished()
+        self.extract_campaign_btn.setEnabled(True)
+        self.cancel_campaign_btn.setEnabled(False)
+    
+    def cancel_campaign(self):
+        if self.campaign_executor is None and self.campaign_discovery is None:
+            return
+        self.stop_campaign()
+        self.campaign_label.setText("Campaign extraction cancelled.")
+    
+    def finish_campaign(self):
+        """Send one table row and one JSON document (ready for DOI assignment) per run."""
+        self.stop_campaign()
+        records = []
+        documents = []
+        failed = []
+        for directory, future in zip(self.campaign_run_directories, self.campaign_futures):
+            try:
+                sections = future.result()
+            except Exception:
+                failed.append(directory)
+                continue
+            calibration_case_data = self.prepare_calibration_case_data()
+            run_name = os.path.relpath(directory, self.campaign_directory)
+            calibration_case_data["Case Name"] = f"{self.Case_Name} {run_name}".strip()
+            calibration_case_data["Local Directory"] = directory
+            documents.append(aspherixLog.calibration_document(self.user_info, calibration_case_data,
+                                                              sections.items(), {}))
+            records.append(aspherixBatch.flatten_record({"Calibration Case": calibration_case_data, **sections}))
+        
+        self.campaign_label.setText(f"{len(records)} runs extracted.")
+        if failed:
+            self.warning(f"{len(failed)} run directories could not be parsed: {', '.join(failed)}")
+        self.Outputs.campaign_runs.send(records_to_orange_table(records) if records else None)
+        self.Outputs.campaign_json.send(json.dumps(documents, indent=4) if documents else None)
+    
     def prepare_calibration_case_data(self):
         # This function prepares the calibration case data dictionary
         return {
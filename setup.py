@@ -39,11 +39,13 @@ setup(name=NAME,
       author=AUTHOR,
       author_email=AUTHOR_EMAIL,
       description=DESCRIPTION,
-      packages=["orangedemvironment"],
+      packages=["orangedemvironment", "shared"],
       version=VERSION,
       package_data={"orangedemvironment": ["icons\*.png"]},
       classifiers=["Example :: Invalid"],
       # Declare orangedemo package to contain widgets for the "Demo" category
-      entry_points={"orange.widgets": "DEMvironment = orangedemvironment"},
+      entry_points={"orange.widgets": "DEMvironment = orangedemvironment",
+                    # Headless extraction without Qt and Orange, e.g. on batch servers
+                    "console_scripts": "demvironment-extract = shared.aspherixCli:main"},
       )# -*- coding: utf-8 -*-
 
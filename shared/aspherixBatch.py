@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""
+This file is part of the "DEMvironment" Add-on package for Orange3, that
+facilitates the data management of the DEM parameter calibration, Mainly using
+Aspherix(c) as a DEM calibration tool.
+DEMvironment add-on is a free software: you can redistribute it
+and/or modify it under the  terms of the GNU General Public License as
+published by the Free Software  Foundation, either version 3 of the License,
+or (at your option) any later version.
+
+DEMvironment add-on is distributed in the hope that it will be useful, but WITHOUT ANY
+ WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR
+ A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License along with
+ PP-SBSC. If not, see <https://www.gnu.org/licenses/>.
+
+ -------------------------------------------------------------------------
+    Contributing author and copyright for this file:
+
+        Copyright (c) 2023    Nazanin Ghods (TU Graz)
+        Copyright (c) 2023    Richard Amering (TU Graz)
+        Copyright (c) 2023    Stefan Radl (TU Graz)
+ -------------------------------------------------------------------------
+"""
+import json
+import os
+
+from shared import aspherixLog, compressedFiles
+
+
+def find_run_directories(root, require_calibrated_params=True):
+    """
+    Walk the campaign root with os.scandir and return every directory that
+    contains both the calibration log and calibrated_params.txt, plain or compressed.
+    Without require_calibrated_params the log alone is enough, e.g. for runs
+    that have just started.
+    """
+    run_directories = []
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        names = set()
+        subdirectories = []
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirectories.append(entry.path)
+                    else:
+                        names.add(entry.name)
+        except OSError:
+            continue
+        if (not names.isdisjoint(compressedFiles.variants(aspherixLog.LOG_FILE_NAME))
+                and (not require_calibrated_params
+                     or not names.isdisjoint(compressedFiles.variants(aspherixLog.CALIBRATED_PARAMS_FILE_NAME)))):
+            run_directories.append(directory)
+        stack.extend(sorted(subdirectories, reverse=True))
+    return run_directories
+
+
+def extract_run(directory):
+    """
+    Parse one run directory and return its sections as used in the calibration
+    JSON. Runs in the worker processes, so it only uses GUI-free modules.
+    """
+    logfile_path = compressedFiles.find_file(directory, aspherixLog.LOG_FILE_NAME)
+    calibrated_params_path = compressedFiles.find_file(directory, aspherixLog.CALIBRATED_PARAMS_FILE_NAME)
+    extracted_data = aspherixLog.load_log_follower(logfile_path).results()
+    calibrated_params = aspherixLog.load_calibrated_params(calibrated_params_path)
+    return dict(aspherixLog.calibration_sections(extracted_data, calibrated_params))
+
+
+def flatten_record(data, parent_key=""):
+    """
+    Flatten nested dictionaries to "Section.key" paths. Lists are kept as
+    JSON strings so every value fits into one table cell.
+    """
+    flat = {}
+    for key, value in data.items():
+        path = f"{parent_key}.{key}" if parent_key else str(key)
+        if isinstance(value, dict):
+            flat.update(flatten_record(value, path))
+        elif isinstance(value, list):
+            flat[path] = json.dumps(value)
+        else:
+            flat[path] = value
+    return flat
+
+
+def submit_runs(run_directories, max_workers=None):
+    """
+    Submit the run directories to a process pool. Returns the executor and the
+    futures, so the caller can report progress and cancel the pending runs.
+    """
+    # Imported here, multiprocessing is only needed once runs are submitted
+    from concurrent.futures import ProcessPoolExecutor
+    executor = ProcessPoolExecutor(max_workers=max_workers)
+    futures = [executor.submit(extract_run, directory) for directory in run_directories]
+    return executor, futures
@@ -0,0 +1,302 @@
+# -*- coding: utf-8 -*-
+"""
+This file is part of the "DEMvironment" Add-on package for Orange3, that
+facilitates the data management of the DEM parameter calibration, Mainly using
+Aspherix(c) as a DEM calibration tool.
+DEMvironment add-on is a free software: you can redistribute it
+and/or modify it under the  terms of the GNU General Public License as
+published by the Free Software  Foundation, either version 3 of the License,
+or (at your option) any later version.
+
+DEMvironment add-on is distributed in the hope that it will be useful, but WITHOUT ANY
+ WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR
+ A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License along with
+ PP-SBSC. If not, see <https://www.gnu.org/licenses/>.
+
+ -------------------------------------------------------------------------
+    Contributing author and copyright for this file:
+
+        Copyright (c) 2023    Nazanin Ghods (TU Graz)
+        Copyright (c) 2023    Richard Amering (TU Graz)
+        Copyright (c) 2023    Stefan Radl (TU Graz)
+ -------------------------------------------------------------------------
+"""
+import glob
+import os
+import re
+import threading
+
+from shared import aspherixLog
+
+CASX_EXTENSION = ".casx"
+
+# Keywords of the param_*, particle_distribution and calibration_case commands
+COMMAND_KEYWORDS = {"type", "value", "init", "min", "max", "density", "radius", "mass_fraction",
+                    "template", "target_param", "measfile", "parameter_overrides"}
+
+variable_reference_pattern = re.compile(r'\$\{(\w+)\}')
+
+# Parsed include files, shared by all input decks that use the same settings directory
+_include_cache = {}
+_include_cache_lock = threading.Lock()
+
+
+def find_casx_file(directory):
+    """Return the .casx input deck of a run directory, None if there is none."""
+    casx_files = sorted(glob.glob(os.path.join(glob.escape(directory), "*" + CASX_EXTENSION)))
+    return casx_files[0] if casx_files else None
+
+
+def logical_lines(file_path):
+    """
+    Read an input file into its commands: comments are removed and lines
+    ending with "&" are joined with the next one.
+    """
+    commands = []
+    pending = ""
+    with open(file_path, 'r', errors='replace') as file:
+        for line in file:
+            line = line.split("#", 1)[0].strip()
+            if line.endswith("&"):
+                pending += line[:-1] + " "
+                continue
+            line = (pending + line).strip()
+            pending = ""
+            if line:
+                commands.append(line)
+    if pending.strip():
+        commands.append(pending.strip())
+    return commands
+
+
+def read_include_file(file_path):
+    """logical_lines of an include file, memoized as long as the file is unchanged."""
+    path = os.path.abspath(file_path)
+    stat = os.stat(path)
+    key = (stat.st_size, stat.st_mtime_ns)
+    with _include_cache_lock:
+        cached = _include_cache.get(path)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    commands = tuple(logical_lines(path))
+    with _include_cache_lock:
+        _include_cache[path] = (key, commands)
+    return commands
+
+
+def split_keywords(words):
+    """Map each keyword of a command to the list of values that follow it."""
+    keywords = {}
+    values = None
+    for word in words:
+        if values is None or word in COMMAND_KEYWORDS:
+            values = keywords[word] = []
+        else:
+            values.append(word)
+    return keywords
+
+
+def clear_include_cache():
+    with _include_cache_lock:
+        _include_cache.clear()
+
+
+class InputDeck:
+    """
+    Calibration setup read directly from a .casx input deck and its
+    include_file settings, without running the calibration.
+
+    Commands are evaluated in file order. ${var} references are resolved
+    against the variables defined so far; resolved values are memoized until
+    one of the variables is redefined.
+    """
+
+    def __init__(self):
+        self.variables = {}
+        self.fixed_parameters = {}
+        self.calibrated_parameters_property = {}
+        self.particle_distributions = {}
+        self.optimizer_settings = {}
+        self.calibration_cases = {}
+        self.include_files = []
+        self.run_mode = ""
+        self._resolved = {}
+        self._handlers = {
+            "variable": self._variable,
+            "param_fixed": self._param_fixed,
+            "param_calibration": self._param_calibration,
+            "particle_distribution": self._particle_distribution,
+            "optimizer_setting": self._optimizer_setting,
+            "calibration_case": self._calibration_case,
+            "run": self._run,
+        }
+
+    def variable(self, name):
+        """Value of a variable with all its ${var} references resolved, None if undefined."""
+        if name in self._resolved:
+            return self._resolved[name]
+        if name not in self.variables:
+            return None
+        # Mark the variable while resolving it, so self references do not recurse
+        self._resolved[name] = self.variables[name]
+        value = self.resolve(self.variables[name])
+        self._resolved[name] = value
+        return value
+
+    def resolve(self, text):
+        """Substitute ${var} references, undefined variables are left as they are."""
+        if "${" not in text:
+            return text
+
+        def substitute(match):
+            value = self.variable(match.group(1))
+            return match.group(0) if value is None else value
+        return variable_reference_pattern.sub(substitute, text)
+
+    def read(self, casx_path):
+        """Evaluate a .casx file, include files are read relative to its directory."""
+        base_directory = os.path.dirname(os.path.abspath(casx_path))
+        self._evaluate(logical_lines(casx_path), base_directory)
+        return self
+
+    def _evaluate(self, commands, base_directory):
+        for command in commands:
+            words = command.split()
+            if words[0] == "include_file" and len(words) > 1:
+                include_path = os.path.join(base_directory, self.resolve(words[1]))
+                self.include_files.append(include_path)
+                self._evaluate(read_include_file(include_path), base_directory)
+                continue
+            handler = self._handlers.get(words[0])
+            if handler is not None:
+                handler(words[1:])
+
+    def _variable(self, words):
+        # variable <name> string <value>
+        if len(words) >= 3 and words[1] == "string":
+            self.variables[words[0]] = " ".join(words[2:])
+            self._resolved.clear()
+
+    def _param_fixed(self, words):
+        # param_fixed <name> type scalar value <value>
+        keywords = split_keywords(words[1:])
+        if keywords.get("value"):
+            self.fixed_parameters[words[0]] = aspherixLog.parse_value(self.resolve(keywords["value"][0]))
+
+    def _param_calibration(self, words):
+        # param_calibration <name> type <type> init <init> min <min> max <max>
+        keywords = split_keywords(words[1:])
+        self.calibrated_parameters_property[words[0]] = {
+            key: aspherixLog.parse_value(self.resolve(keywords[key][0])) if key != "type" else keywords[key][0]
+            for key in ("type", "init", "min", "max") if keywords.get(key)
+        }
+
+    def _particle_distribution(self, words):
+        # particle_distribution <name> density <d> radius <r1> ... mass_fraction <f1> ...
+        keywords = split_keywords(words[1:])
+        self.particle_distributions[words[0]] = {
+            key: [aspherixLog.parse_value(self.resolve(value)) for value in values]
+            for key, values in keywords.items()
+        }
+
+    def _optimizer_setting(self, words):
+        if len(words) >= 2:
+            self.optimizer_settings[words[0]] = aspherixLog.parse_value(self.resolve(words[1]))
+
+    def _calibration_case(self, words):
+        # calibration_case <name> template <t> type <type> target_param <p1> ... measfile <f>
+        #     parameter_overrides <key> <value> ...
+        keywords = split_keywords(words[1:])
+        overrides = [self.resolve(word) for word in keywords.get("parameter_overrides", [])]
+        self.calibration_cases[words[0]] = {
+            "template": keywords.get("template", [""])[0],
+            "type": keywords.get("type", [""])[0],
+            "target_param": keywords.get("target_param", []),
+            "measfile": self.resolve(keywords.get("measfile", [""])[0]),
+            "parameter_overrides": dict(zip(overrides[0::2], overrides[1::2]))
+        }
+
+    def _run(self, words):
+        if words:
+            self.run_mode = words[0]
+
+    def models(self):
+        """The models in the layout of the log parser."""
+        models = {}
+        for name in ("normal_contact_model", "tangential_contact_model", "cohesion_model",
+                     "rolling_friction_model", "surface_model"):
+            models[name] = self.variable(name) or ""
+        models["coarsegraining_val"] = aspherixLog.parse_value(self.variable("coarsegraining_val") or "0")
+        return models
+
+    def input_parameters(self):
+        """The numeric variables that are relevant for the chosen models."""
+        numeric = {}
+        for name in self.variables:
+            value = aspherixLog.parse_value(self.variable(name))
+            if isinstance(value, (int, float)):
+                numeric[name] = value
+        return aspherixLog.select_input_parameters(numeric, self.models())
+
+    def psd(self):
+        radii_list = []
+        mass_fractions_list = []
+        for distribution in self.particle_distributions.values():
+            radii_list.extend(distribution.get("radius", []))
+            mass_fractions_list.extend(distribution.get("mass_fraction", []))
+        return {
+            "radii_list": radii_list,
+            "mass_fractions_list": mass_fractions_list,
+            "dispersity": len(radii_list)
+        }
+
+    def calibration_templates(self):
+        calibration_templates = {}
+        for case in self.calibration_cases.values():
+            calibration_templates.setdefault(case["template"], []).extend(case["target_param"])
+        return calibration_templates
+
+    def sections(self):
+        """The sections that can be derived before the calibration has started."""
+        return [
+            ("Templates Info", self.calibration_templates()),
+            ("Models Info", self.models()),
+            ("Input Parameters", self.input_parameters()),
+            ("PSD", self.psd()),
+            ("Calibrated Parameter Properties", dict(self.calibrated_parameters_property))
+        ]
+
+
+def read_input_deck(casx_path):
+    """Evaluate a .casx input deck and its include files."""
+    return InputDeck().read(casx_path)
+
+
+def cross_check(input_deck, extracted_data):
+    """
+    Compare the input deck with the data extracted from the calibration log
+    and return one record per difference. The log shows the setup the
+    calibration actually ran with, so differences mean the input deck or
+    its settings were edited afterwards.
+    """
+    log_sections = dict(aspherixLog.calibration_sections(extracted_data))
+    differences = []
+    for section, deck_data in input_deck.sections():
+        log_data = log_sections.get(section, {})
+        for key in list(deck_data) + [key for key in log_data if key not in deck_data]:
+            deck_value = deck_data.get(key)
+            log_value = log_data.get(key)
+            # The log parser lists the PSD in reverse file order. Lists are compared sorted but
+            # with their duplicates, a value listed more often on one side is a difference
+            if isinstance(deck_value, list) and isinstance(log_value, list):
+                deck_value, log_value = sorted(deck_value), sorted(log_value)
+            if deck_value != log_value:
+                differences.append({
+                    "section": section,
+                    "key": key,
+                    "input deck": "" if deck_value is None else str(deck_value),
+                    "log": "" if log_value is None else str(log_value)
+                })
+    return differences
@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+"""
+This file is part of the "DEMvironment" Add-on package for Orange3, that
+facilitates the data management of the DEM parameter calibration, Mainly using
+Aspherix(c) as a DEM calibration tool.
+DEMvironment add-on is a free software: you can redistribute it
+and/or modify it under the  terms of the GNU General Public License as
+published by the Free Software  Foundation, either version 3 of the License,
+or (at your option) any later version.
+
+DEMvironment add-on is distributed in the hope that it will be useful, but WITHOUT ANY
+ WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR
+ A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License along with
+ PP-SBSC. If not, see <https://www.gnu.org/licenses/>.
+
+ -------------------------------------------------------------------------
+    Contributing author and copyright for this file:
+
+        Copyright (c) 2023    Nazanin Ghods (TU Graz)
+        Copyright (c) 2023    Richard Amering (TU Graz)
+        Copyright (c) 2023    Stefan Radl (TU Graz)
+ -------------------------------------------------------------------------
+"""
+# Headless extraction of Aspherix calibration runs, the same JSON as the Read
+# Aspherix widget without Qt or Orange:
+#
+#     python -m shared.aspherixCli RUN_DIR --user user.json --case-name "hydrogel" \
+#         --template-meta granuDrum=measurements/exp-88a536f2.json --assign-doi --warehouse WAREHOUSE_DIR
+#     demvironment-extract --file-list runs.txt --user user.json --workers 8 --output campaign.json
+import argparse
+import json
+import os
+import sys
+
+from shared import aspherixLog, aspherixBatch, metadataWarehouse, compressedFiles
+
+COHESIVITY = ["cohesionless", "cohesive"]
+TARGET_FLOW_STATES = ["Quasi-static", "Intermediate", "Rapid"]
+CONSOLIDATION_LEVELS = ["low", "high"]
+REQUIRED_USER_INFO_KEYS = ['First Name', 'Last Name', 'Email', 'Affiliation']
+
+
+def read_file_list(file_path):
+    """Run directories listed in a file, one per line. Empty lines and # comments are skipped."""
+    with open(file_path, 'r') as file:
+        return [line.strip() for line in file if line.strip() and not line.lstrip().startswith("#")]
+
+
+def read_user_info(file_path):
+    """Read the user data as a JSON object with the fields of the User widget."""
+    with open(file_path, 'r') as file:
+        user_info = json.load(file)
+    missing_keys = [key for key in REQUIRED_USER_INFO_KEYS if not user_info.get(key)]
+    if missing_keys:
+        raise ValueError(f"Missing user information for the following fields: {', '.join(missing_keys)}")
+    return {key: str(value) for key, value in user_info.items()}
+
+
+def read_templates_meta_info(assignments):
+    """Read the meta_info of the calibration references given as TEMPLATE=JSON_FILE."""
+    templates_meta_info = {}
+    for assignment in assignments:
+        template, separator, file_path = assignment.partition("=")
+        if not separator:
+            raise ValueError(f"Expected TEMPLATE=JSON_FILE, got '{assignment}'.")
+        with open(file_path, 'r') as file:
+            data = json.load(file)
+        if not metadataWarehouse.is_valid_metadata(data):
+            raise ValueError(f"The JSON file of '{template}' does not have the required format or misses 'meta_info'.")
+        templates_meta_info[template] = data["meta_info"]
+    return templates_meta_info
+
+
+def calibration_case_data(args, directory):
+    """The Calibration Case section, as entered in the Calibration Case box of the widget."""
+    directory = os.path.abspath(directory)
+    return {
+        "Case Name": args.case_name or os.path.basename(directory),
+        "Cohesivity": args.cohesivity,
+        "Target Flow State": args.target_flow_state,
+        "Consolidation level": args.consolidation_level,
+        "Consolidation Pressure": args.consolidation_pressure,
+        "Local Directory": directory
+    }
+
+
+def validate_run_directory(directory):
+    """Return the errors that prevent the extraction of a run directory."""
+    if not os.path.isdir(directory):
+        return [f"The directory '{directory}' does not exist."]
+    errors = []
+    for file_name in (aspherixLog.LOG_FILE_NAME, aspherixLog.CALIBRATED_PARAMS_FILE_NAME):
+        if not compressedFiles.find_file(directory, file_name):
+            errors.append(f"The {file_name} file was not found in '{directory}'.")
+    return errors
+
+
+def extract_sections(directories, workers):
+    """
+    Yield (directory, sections, error) for every run directory, in order. More
+    than one directory is parsed in a process pool.
+    """
+    if workers == 1 or len(directories) == 1:
+        for directory in directories:
+            try:
+                yield directory, aspherixBatch.extract_run(directory), None
+            except Exception as e:
+                yield directory, None, e
+        return
+    executor, futures = aspherixBatch.submit_runs(directories, max_workers=workers)
+    with executor:
+        for directory, future in zip(directories, futures):
+            try:
+                yield directory, future.result(), None
+            except Exception as e:
+                yield directory, None, e
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="demvironment-extract",
+        description="Extract the metadata of Aspherix calibration runs without the Orange canvas.")
+    parser.add_argument("directories", nargs="*", help="run directories with the log and calibrated_params.txt")
+    parser.add_argument("--file-list", help="file with one run directory per line")
+    parser.add_argument("--user", required=True, help="JSON file with First Name, Last Name, Email and Affiliation")
+    parser.add_argument("--case-name", default="", help="case name, the name of the run directory by default")
+    parser.add_argument("--cohesivity", choices=COHESIVITY, default=COHESIVITY[0])
+    parser.add_argument("--target-flow-state", choices=TARGET_FLOW_STATES, default=TARGET_FLOW_STATES[0])
+    parser.add_argument("--consolidation-level", choices=CONSOLIDATION_LEVELS, default=CONSOLIDATION_LEVELS[0])
+    parser.add_argument("--consolidation-pressure", type=float, default=0.0, help="consolidation pressure [Pa]")
+    parser.add_argument("--template-meta", action="append", default=[], metavar="TEMPLATE=JSON_FILE",
+                        help="metadata file of the calibration reference of a template, can be repeated")
+    parser.add_argument("--output", help="write the JSON documents to this file instead of stdout")
+    parser.add_argument("--assign-doi", action="store_true",
+                        help="assign a DOI and save the metadata file in every run directory")
+    parser.add_argument("--new-version", action="store_true",
+                        help="with --assign-doi, save a new version of an existing metadata file instead")
+    parser.add_argument("--warehouse", help="register the metadata files in this metadata warehouse directory")
+    parser.add_argument("--overwrite", action="store_true",
+                        help="overwrite registered files of the same or a higher version")
+    parser.add_argument("--workers", type=int, default=None, help="number of worker processes")
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    directories = list(args.directories)
+    if args.file_list:
+        directories.extend(read_file_list(args.file_list))
+    if not directories:
+        parser.error("no run directories were given")
+    if args.warehouse and not args.assign_doi:
+        parser.error("--warehouse needs --assign-doi, only documents with a DOI can be registered")
+    if args.warehouse and not os.path.isdir(args.warehouse):
+        parser.error(f"the metadata warehouse directory '{args.warehouse}' does not exist")
+    try:
+        user_info = read_user_info(args.user)
+        templates_meta_info = read_templates_meta_info(args.template_meta)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+
+    failed = 0
+    valid_directories = []
+    for directory in directories:
+        errors = validate_run_directory(directory)
+        if errors:
+            failed += 1
+            print("\n".join(errors), file=sys.stderr)
+        else:
+            valid_directories.append(directory)
+
+    documents = []
+    for directory, sections, error in extract_sections(valid_directories, args.workers):
+        if error is not None:
+            failed += 1
+            print(f"{directory}: {error}", file=sys.stderr)
+            continue
+        missing_templates = [template for template in sections["Templates Info"] if template not in templates_meta_info]
+        if missing_templates:
+            failed += 1
+            print(f"{directory}: no --template-meta for {', '.join(missing_templates)}", file=sys.stderr)
+            continue
+        document = aspherixLog.calibration_document(
+            user_info, calibration_case_data(args, directory), sections.items(),
+            {template: templates_meta_info[template] for template in sections["Templates Info"]})
+        if args.assign_doi:
+            existing_files = metadataWarehouse.existing_metadata_files(directory, "calib")
+            if args.new_version and existing_files:
+                existing_file = max(existing_files, key=os.path.getmtime)
+                document, file_path = metadataWarehouse.assign_new_version(document, existing_file)
+            else:
+                document, file_path = metadataWarehouse.assign_doi(document)
+            print(f"{directory}: {document['meta_info']['doi']} saved to {file_path}", file=sys.stderr)
+            if args.warehouse:
+                status = metadataWarehouse.register_metadata(document, args.warehouse, args.overwrite)
+                print(f"{directory}: {status} in {args.warehouse}", file=sys.stderr)
+        documents.append(document)
+
+    json_output = json.dumps(documents[0] if len(directories) == 1 and documents else documents, indent=4)
+    if args.output:
+        with open(args.output, 'w') as file:
+            file.write(json_output)
+    elif not args.assign_doi:
+        print(json_output)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,1034 @@
+# -*- coding: utf-8 -*-
+"""
+This file is part of the "DEMvironment" Add-on package for Orange3, that
+facilitates the data management of the DEM parameter calibration, Mainly using
+Aspherix(c) as a DEM calibration tool.
+DEMvironment add-on is a free software: you can redistribute it
+and/or modify it under the  terms of the GNU General Public License as
+published by the Free Software  Foundation, either version 3 of the License,
+or (at your option) any later version.
+
+DEMvironment add-on is distributed in the hope that it will be useful, but WITHOUT ANY
+ WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR
+ A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License along with
+ PP-SBSC. If not, see <https://www.gnu.org/licenses/>.
+
+ -------------------------------------------------------------------------
+    Contributing author and copyright for this file:
+
+        Copyright (c) 2023    Nazanin Ghods (TU Graz)
+        Copyright (c) 2023    Richard Amering (TU Graz)
+        Copyright (c) 2023    Stefan Radl (TU Graz)
+ -------------------------------------------------------------------------
+"""
+import bisect
+import collections
+import math
+import os
+import re
+from array import array
+from shared.parseCache import get_parse_cache, file_fingerprint
+from shared import compressedFiles
+from shared.aspherixRecords import ParameterDefinition, PSDClasses, float_column
+
+# Increase when the parsed state changes, so cached results are not reused
+PARSER_VERSION = 8
+
+LOG_FILE_NAME = "log_aspherix-calibration.txt"
+CALIBRATED_PARAMS_FILE_NAME = "calibrated_params.txt"
+# Names of the extracted dictionaries in the JSON output, in the order of results()
+SECTION_NAMES = [
+    "Aspherix Info",
+    "Templates Info",
+    "Models Info",
+    "Input Parameters",
+    "PSD",
+    "Calibrated Parameter Properties",
+    "Convergence",
+    "Timing",
+    "Calibration Cases"
+]
+
+# Every log line starts with "- HH:MM:SS " followed by a 9 character marker
+TIMESTAMP_START = 2
+TIMESTAMP_END = 10
+MARKER_START = 11
+MARKER_END = 20
+PAYLOAD_START = 21
+COMMAND_MARKER = "COMMAND :"
+INFO_MARKER = "INFO    :"
+# Size of the blocks read by LogFollower
+READ_BLOCK_SIZE = 1 << 20
+# Size of the blocks read backwards from the end of a file and the default
+# limit of bytes read_run_status looks at before giving up
+REVERSE_BLOCK_SIZE = 1 << 13
+REVERSE_SCAN_LIMIT = 1 << 22
+SECONDS_PER_DAY = 86400
+SECONDS_PER_HOUR = 3600
+# Placeholder of values that were not reported
+NAN = float("nan")
+
+# Precompiled regular expressions, only run after a cheap substring check
+run_mode_pattern = re.compile(r'run mode (single|sequential)')
+template_pattern = re.compile(r'template (\w+)')
+calibration_case_pattern = re.compile(r'calibration_case (\w+)')
+case_type_pattern = re.compile(r' type (\w+)')
+measfile_pattern = re.compile(r'measfile (\S+)')
+target_params_pattern = re.compile(r'target_param(.*?)measfile')
+word_pattern = re.compile(r'(\w+)')
+model_pattern = re.compile(r'variable (\w+) string (\S+)')
+variable_pattern = re.compile(r'variable (\w+) string ([\d.e+-]+)')
+param_calibration_pattern = re.compile(r'param_calibration (\w+) type (\w+) init ([\d.e+-]+) min ([\d.e+-]+) max ([\d.e+-]+)')
+attempting_pattern = re.compile(r'attempting to (run|restart) ')
+git_commit_pattern = re.compile(r'git commit (.+)')
+version_pattern = re.compile(r'This is Aspherix\(R\)calibration version (.+)')
+iteration_pattern = re.compile(r'iteration (\d+)\s*$')
+setting_parameter_pattern = re.compile(r'setting parameter (\w+) to value (\S+)')
+case_pattern = re.compile(r'case (\w+)')
+quality_function_pattern = re.compile(r'calibration case (\w+) returned with value \S+ - quality function: (\S+) - scaled qf: (\S+)')
+total_quality_function_pattern = re.compile(r'total quality function (\S+)')
+optimizer_max_eval_pattern = re.compile(r'optimizer_setting maxFunctionEval (\S+)')
+variable_reference_pattern = re.compile(r'\$\{(\w+)\}')
+worker_pool_pattern = re.compile(r'added (\d+) jobs to worker pool\. will run them using (\d+) workers')
+chunks_pattern = re.compile(r'nChunks (\S+)')
+cores_per_chunk_pattern = re.compile(r'coresPerChunk (\S+)')
+response_pattern = re.compile(r'([A-Za-z][\w -]*): ([-+]?[\d.]+(?:[eE][-+]?\d+)?)\s*$')
+
+
+def parse_value(value_str):
+    """Parse values with scientific notation, falling back to the raw string."""
+    try:
+        return int(value_str)
+    except ValueError:
+        try:
+            return float(value_str)
+        except ValueError:
+            return value_str
+
+
+def select_input_parameters(input_parameters, models):
+    """Keep only the input parameters that are relevant for the chosen models."""
+    desired_parameters = {
+        "density_p", "young_w", "young_p", "poisson_p", "poisson_w",
+        "rest_coef_pw", "rest_coef_pp", "fric_coef_pp", "fric_coef_pw",
+        "roll_fric_pp", "roll_fric_pw"
+    }
+    if models["normal_contact_model"] == "hooke":
+        desired_parameters.add("char_vel")
+
+    if models["rolling_friction_model"] == "epsd":
+        desired_parameters.update({
+            "roll_damp_pw", "roll_damp_pp"
+        })
+
+    if models["cohesion_model"] in {"sjkr", "sjkr2"}:
+        desired_parameters.update({
+            "cohesion_energy_pp", "cohesion_energy_pw"
+        })
+
+    if models["cohesion_model"] == "adaptive":
+        desired_parameters.update({
+            "init_coh_stress_pw", "init_coh_stress_pp",
+            "max_coh_stress_pp_0", "max_coh_stress_pp_min", "max_coh_stress_pp_max",
+            "coh_strength_pp_0", "coh_strength_pp_min", "coh_strength_pp_max"
+        })
+
+    return {key: value for key, value in input_parameters.items() if key in desired_parameters}
+
+
+def check_convergence(final_line):
+    """Check the final line for "ERROR" or anything other than "calibration ended successfully"."""
+    final_line = final_line.strip()
+    if ("ERROR" in final_line) or ("calibration ended successfully" not in final_line):
+        return {"isconverged": "No"}
+    return {"isconverged": "Yes"}
+
+
+def _move_to_end(data, key, value):
+    """Keep the first value of key but record it as the most recently seen one."""
+    data[key] = data.pop(key, value)
+
+
+def timestamp_seconds(stamp):
+    """Seconds since midnight of a "HH:MM:SS" timestamp, None if it is not one."""
+    try:
+        return int(stamp[0:2]) * 3600 + int(stamp[3:5]) * 60 + int(stamp[6:8])
+    except ValueError:
+        return None
+
+
+def _to_float(value_str):
+    try:
+        return float(value_str)
+    except ValueError:
+        return NAN
+
+
+class IterationHistory:
+    """
+    Column-wise collector of the optimizer steps written to the calibration log.
+
+    Every "iteration N" line opens a new row. Calibrated parameter values,
+    measured responses and quality functions of that iteration fill the
+    columns, values that were not reported stay NaN. The simulation duration
+    is the wall-clock time from the first "direct running script" to the last
+    successful simulation run of the iteration.
+
+    Every "attempting to run/restart" line starts a new segment of the log.
+    A restarted calibration repeats the iterations that were interrupted, a
+    repeated iteration replaces the row of its earlier run, so the segments
+    merge into one history without duplicate iterations.
+    """
+
+    def __init__(self):
+        self.iterations = array('q')
+        self.current_case = ""
+        # (case, name) -> list of floats, one entry per row
+        self.parameters = {}
+        self.responses = {}
+        self.quality_functions = {}
+        self.total_quality_function = array('d')
+        self.simulation_duration = array('d')
+        # Jobs added to the worker pool and workers running them, per row
+        self.jobs = array('d')
+        self.workers = array('d')
+        self.first_iteration_clock = None
+        self.last_completion_clock = None
+        self._simulation_start = None
+        # case -> indices of the rows in which the case was run
+        self.case_rows = {}
+        # "attempting to", first and last iteration of every segment of the log
+        self.segments = []
+        # (row, duration, jobs, workers) of the runs replaced after a restart
+        self.replaced_runs = []
+        # Whether the iteration numbers increase row by row, rows are then found by bisection
+        self._increasing = True
+        # Row the current iteration writes to, None until its "iteration N" line
+        self._row = None
+
+    def __len__(self):
+        return len(self.iterations)
+
+    @property
+    def restarts(self):
+        return sum(segment["attempting to"] == "restart" for segment in self.segments)
+
+    def _set(self, columns, key, value):
+        column = columns.get(key)
+        if column is None:
+            column = columns[key] = float_column(len(self.iterations))
+        column[self._row] = value
+
+    def start_segment(self, attempt):
+        """An "attempting to run/restart" line starts a new segment of the log."""
+        self.segments.append({"attempting to": attempt, "first iteration": None, "last iteration": None})
+        # Whatever the interrupted iteration was doing is not continued
+        self._row = None
+        self._simulation_start = None
+        self.current_case = ""
+
+    def new_iteration(self, number):
+        if self.segments:
+            segment = self.segments[-1]
+            if segment["first iteration"] is None:
+                segment["first iteration"] = number
+            segment["last iteration"] = number
+        self._simulation_start = None
+        row = self._find_row(number)
+        if row is not None:
+            self._replace_row(row)
+            return
+        if self.iterations and number < self.iterations[-1]:
+            self._increasing = False
+        self._row = len(self.iterations)
+        self.iterations.append(number)
+        self.total_quality_function.append(NAN)
+        self.simulation_duration.append(NAN)
+        self.jobs.append(NAN)
+        self.workers.append(NAN)
+        for columns in (self.parameters, self.responses, self.quality_functions):
+            for column in columns.values():
+                column.append(NAN)
+
+    def _find_row(self, number):
+        """Row of an iteration that was already logged, None for a new one."""
+        iterations = self.iterations
+        if not iterations or (self._increasing and number > iterations[-1]):
+            return None
+        if self._increasing:
+            row = bisect.bisect_left(iterations, number)
+            return row if row < len(iterations) and iterations[row] == number else None
+        # Searched from the end, a restart repeats the last iterations
+        for row in range(len(iterations) - 1, -1, -1):
+            if iterations[row] == number:
+                return row
+        return None
+
+    def _replace_row(self, row):
+        """An iteration is run again after a restart, its row is cleared for the new run."""
+        if not math.isnan(self.simulation_duration[row]):
+            self.replaced_runs.append((row, self.simulation_duration[row], self.jobs[row], self.workers[row]))
+        self._row = row
+        for values in (self.total_quality_function, self.simulation_duration, self.jobs, self.workers):
+            values[row] = NAN
+        for columns in (self.parameters, self.responses, self.quality_functions):
+            for column in columns.values():
+                column[row] = NAN
+
+    def _mark_case(self, case):
+        rows = self.case_rows.get(case)
+        if rows is None:
+            rows = self.case_rows[case] = array('l')
+        if not rows or rows[-1] < self._row:
+            rows.append(self._row)
+        elif rows[-1] != self._row and self._row not in rows:
+            bisect.insort(rows, self._row)
+
+    def start_simulation(self, clock):
+        """A "direct running script" command was issued at clock."""
+        if self._row is not None and self._simulation_start is None:
+            self._simulation_start = clock
+
+    def feed(self, payload, clock=None):
+        """Collect the iteration data of one INFO payload logged at clock."""
+        if payload.startswith("iteration "):
+            iteration_match = iteration_pattern.match(payload)
+            if iteration_match:
+                self.new_iteration(int(iteration_match.group(1)))
+                if self.first_iteration_clock is None:
+                    self.first_iteration_clock = clock
+                return
+        if payload.startswith("attempting to "):
+            attempting_match = attempting_pattern.match(payload)
+            if attempting_match:
+                self.start_segment(attempting_match.group(1))
+                return
+        if self._row is None:
+            return
+        if payload.startswith("direct simulation run of case "):
+            if payload.endswith(" succeeded") and self._simulation_start is not None and clock is not None:
+                self.simulation_duration[self._row] = clock - self._simulation_start
+                self.last_completion_clock = clock
+        elif payload.startswith("setting parameter "):
+            parameter_match = setting_parameter_pattern.match(payload)
+            if parameter_match:
+                name, value = parameter_match.groups()
+                self._set(self.parameters, name, _to_float(value))
+        elif payload.startswith("total quality function "):
+            total_match = total_quality_function_pattern.match(payload)
+            if total_match:
+                self.total_quality_function[self._row] = _to_float(total_match.group(1))
+        elif "quality function: " in payload:
+            qf_match = quality_function_pattern.search(payload)
+            if qf_match:
+                case, qf, scaled_qf = qf_match.groups()
+                self._mark_case(case)
+                self._set(self.quality_functions, (case, "quality function"), _to_float(qf))
+                self._set(self.quality_functions, (case, "scaled qf"), _to_float(scaled_qf))
+        elif payload.startswith("added "):
+            worker_pool_match = worker_pool_pattern.match(payload)
+            if worker_pool_match:
+                self.jobs[self._row] = float(worker_pool_match.group(1))
+                self.workers[self._row] = float(worker_pool_match.group(2))
+        elif payload.startswith(("running iteration for case", "iteration of case")):
+            case_match = case_pattern.search(payload)
+            if case_match:
+                self.current_case = case_match.group(1)
+                self._mark_case(self.current_case)
+        elif ": " in payload:
+            response_match = response_pattern.match(payload)
+            if response_match:
+                name, value = response_match.groups()
+                self._set(self.responses, (self.current_case, name), _to_float(value))
+
+    def column_names(self):
+        """Names of the columns returned by to_array."""
+        cases = {case for case, _ in self.responses} | {case for case, _ in self.quality_functions}
+        def label(case, name):
+            # Only name the case when several cases share one log
+            return f"{case} {name}" if len(cases) > 1 else name
+        return (["iteration"] + list(self.parameters)
+                + [label(case, name) for case, name in self.responses]
+                + [label(case, name) for case, name in self.quality_functions]
+                + ["total quality function", "simulation duration [s]", "core hours"])
+
+    def case_records(self, case, parameters=None):
+        """
+        One dictionary per iteration in which the case was run, with the values
+        of the given calibrated parameters (all set ones by default), the
+        responses and the quality functions of the case. Missing values are None.
+        """
+        def value(column, row):
+            return None if math.isnan(column[row]) else column[row]
+        parameter_columns = {name: column for name, column in self.parameters.items()
+                             if parameters is None or name in parameters}
+        response_columns = {name: column for (response_case, name), column in self.responses.items()
+                            if response_case == case}
+        qf_columns = {name: column for (qf_case, name), column in self.quality_functions.items() if qf_case == case}
+        records = []
+        for row in self.case_rows.get(case, []):
+            record = {"iteration": self.iterations[row]}
+            for name, column in parameter_columns.items():
+                # Without target params only the parameters set in this iteration are listed
+                if parameters is not None or not math.isnan(column[row]):
+                    record[name] = value(column, row)
+            for columns in (response_columns, qf_columns):
+                for name, column in columns.items():
+                    record[name] = value(column, row)
+            records.append(record)
+        return records
+
+    def core_hours(self, cores_per_simulation):
+        """
+        Core-hours of every row: the simulation duration times the cores kept
+        busy, i.e. the jobs running in parallel on the worker pool times the
+        cores of one simulation. The runs replaced after a restart used the
+        cores as well and are added to their row. NaN while the iteration has
+        not finished.
+        """
+        def run_core_hours(duration, jobs, workers):
+            parallel_jobs = 1 if math.isnan(jobs) else max(min(jobs, workers), 1)
+            return duration * parallel_jobs * cores_per_simulation / SECONDS_PER_HOUR
+
+        core_hours = [run_core_hours(*run) for run in zip(self.simulation_duration, self.jobs, self.workers)]
+        for row, *run in self.replaced_runs:
+            replaced = run_core_hours(*run)
+            core_hours[row] = replaced if math.isnan(core_hours[row]) else core_hours[row] + replaced
+        return core_hours
+
+    def to_array(self, cores_per_simulation=1):
+        """
+        Return the history as a float array with one row per iteration, the
+        core-hours of every iteration (see core_hours) in the last column.
+        """
+        columns = ([self.iterations] + list(self.parameters.values())
+                   + list(self.responses.values()) + list(self.quality_functions.values())
+                   + [self.total_quality_function, self.simulation_duration])
+        # numpy is only imported when a table is requested, parsing does not need it
+        import numpy
+        values = numpy.empty((len(self.iterations), len(columns) + 1))
+        for index, column in enumerate(columns):
+            values[:, index] = numpy.frombuffer(column, dtype=column.typecode)
+        values[:, -1] = self.core_hours(cores_per_simulation)
+        return values
+
+
+class CalibrationLogParser:
+    """
+    Single-pass parser for log_aspherix-calibration.txt.
+
+    Lines are fed one at a time, so files of any size are parsed in constant
+    memory. The output is identical to the former reverse scan of the whole
+    file: for repeated entries the first occurrence in the file wins, while
+    dictionary and list ordering follows the reverse file order.
+    """
+
+    def __init__(self):
+        self.software_info = {
+            "version": "",
+            "git commit": "",
+            "attempting to": "",
+            "run mode": ""
+        }
+        self.models = {
+            "normal_contact_model": "",
+            "tangential_contact_model": "",
+            "cohesion_model": "",
+            "rolling_friction_model": "",
+            "surface_model": "",
+            "coarsegraining_val": 0
+        }
+        self.input_parameters = {}
+        # All string variables, numeric or not, to resolve ${var} references
+        self.variables = {}
+        # name -> ParameterDefinition
+        self.calibrated_parameters_property = {}
+        self.psd = PSDClasses()
+        self.template_chunks = {}
+        # case -> template, type, target params and measfile of its calibration_case command
+        self.calibration_cases = {}
+        # case -> unresolved nChunks and coresPerChunk overrides of its calibration_case command
+        self.case_chunks = {}
+        self.last_line = ""
+        self.max_function_eval = ""
+        # Wall clock in seconds since midnight of the first day, midnight rollovers included
+        self.clock = None
+        self.start_clock = None
+        self._stamp = ""
+        self._day_offset = 0
+        self.history = IterationHistory()
+        self._seen = set()
+        self._handlers = {
+            COMMAND_MARKER: self._handle_command,
+            INFO_MARKER: self._handle_info,
+        }
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_handlers']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._handlers = {
+            COMMAND_MARKER: self._handle_command,
+            INFO_MARKER: self._handle_info,
+        }
+
+    def feed(self, line):
+        """Dispatch one log line to its handler based on the line marker."""
+        self.last_line = line
+        handler = self._handlers.get(line[MARKER_START:MARKER_END])
+        if handler is None:
+            self._handle_other(line)
+            return
+        if line[TIMESTAMP_START:TIMESTAMP_END] != self._stamp:
+            self._update_clock(line[TIMESTAMP_START:TIMESTAMP_END])
+        handler(line)
+
+    def _update_clock(self, stamp):
+        seconds = timestamp_seconds(stamp)
+        if seconds is None:
+            return
+        self._stamp = stamp
+        # The log only has the time of day, a jump back by more than half a day is a new day
+        if self.clock is not None and seconds + self._day_offset < self.clock - SECONDS_PER_DAY / 2:
+            self._day_offset += SECONDS_PER_DAY
+        self.clock = seconds + self._day_offset
+        if self.start_clock is None:
+            self.start_clock = self.clock
+
+    def feed_file(self, log_file):
+        """Feed all lines of an open text file."""
+        for line in log_file:
+            self.feed(line)
+
+    def _set_once(self, target, key, value):
+        # The software info and model keys are disjoint, one set covers both
+        if key not in self._seen:
+            self._seen.add(key)
+            target[key] = value
+
+    def _handle_command(self, line):
+        if line.startswith("direct running script", PAYLOAD_START):
+            self.history.start_simulation(self.clock)
+            return
+        if line.startswith("optimizer_setting ", PAYLOAD_START):
+            max_eval_match = optimizer_max_eval_pattern.search(line)
+            if max_eval_match and not self.max_function_eval:
+                self.max_function_eval = max_eval_match.group(1)
+        if 'calibration_case' in line:
+            self._parse_calibration_case(line)
+        if 'variable ' in line and self._parse_variable(line):
+            return
+        if 'param_calibration ' in line:
+            self._parse_param_calibration(line)
+
+    def _handle_info(self, line):
+        self.history.feed(line[PAYLOAD_START:].rstrip(), self.clock)
+        if 'run mode ' in line:
+            run_mode_match = run_mode_pattern.search(line)
+            if run_mode_match:
+                self._set_once(self.software_info, "run mode", run_mode_match.group(1))
+                return
+        self._parse_software_info(line)
+
+    def _handle_other(self, line):
+        # Continuation lines (e.g. "git commit ...") and unknown markers get the full check
+        if 'run mode ' in line:
+            run_mode_match = run_mode_pattern.search(line)
+            if run_mode_match:
+                self._set_once(self.software_info, "run mode", run_mode_match.group(1))
+                return
+        if 'calibration_case' in line:
+            self._parse_calibration_case(line)
+        if 'variable ' in line and self._parse_variable(line):
+            return
+        if 'param_calibration ' in line and self._parse_param_calibration(line):
+            return
+        self._parse_software_info(line)
+
+    def _parse_calibration_case(self, line):
+        template_match = template_pattern.search(line)
+        if template_match:
+            case_match = calibration_case_pattern.search(line)
+            # Restarts repeat the calibration_case commands, only the first one of a case is used
+            if case_match and case_match.group(1) in self.calibration_cases:
+                return
+            template_name = template_match.group(1)
+            chunks = self.template_chunks.pop(template_name, [])
+            self.template_chunks[template_name] = chunks
+            # Find the section of the line between 'target_param' and 'measfile'
+            target_params_section = target_params_pattern.search(line)
+            target_params = word_pattern.findall(target_params_section.group(1)) if target_params_section else []
+            if target_params_section:
+                chunks.append(target_params)
+            if case_match:
+                case_type_match = case_type_pattern.search(line, template_match.end())
+                measfile_match = measfile_pattern.search(line)
+                self.calibration_cases[case_match.group(1)] = {
+                    "template": template_name,
+                    "type": case_type_match.group(1) if case_type_match else "",
+                    "target params": target_params,
+                    "measfile": measfile_match.group(1) if measfile_match else ""
+                }
+                chunks_match = chunks_pattern.search(line)
+                cores_per_chunk_match = cores_per_chunk_pattern.search(line)
+                self.case_chunks[case_match.group(1)] = (chunks_match.group(1) if chunks_match else "${num_chunks}",
+                                                         cores_per_chunk_match.group(1) if cores_per_chunk_match
+                                                         else "${cores_per_chunk}")
+
+    def _parse_variable(self, line):
+        """Parse a variable line, returns True if no further checks are needed."""
+        model_match = model_pattern.search(line)
+        if model_match:
+            name, value = model_match.groups()
+            self.variables.setdefault(name, value)
+            if name == "coarsegraining_val":
+                self._set_once(self.models, name, parse_value(value))
+            elif name in self.models:
+                self._set_once(self.models, name, value)
+                return True
+
+        variable_match = variable_pattern.search(line)
+        if variable_match:
+            name, value = variable_match.groups()
+            # Restarts repeat the variables, a PSD class is only added by the first definition
+            if name not in self.input_parameters:
+                if name.startswith("rp"):
+                    self.psd.radii.append(parse_value(value))
+                elif name.startswith("mf"):
+                    self.psd.mass_fractions.append(parse_value(value))
+            _move_to_end(self.input_parameters, name, parse_value(value))
+            return True
+        return False
+
+    def _parse_param_calibration(self, line):
+        param_calibration_match = param_calibration_pattern.search(line)
+        if param_calibration_match:
+            name, param_type, param_init, param_min, param_max = param_calibration_match.groups()
+            param_details = ParameterDefinition(param_type, parse_value(param_init), parse_value(param_min),
+                                                parse_value(param_max))
+            _move_to_end(self.calibrated_parameters_property, name, param_details)
+            return True
+        return False
+
+    def _parse_software_info(self, line):
+        if 'attempting to ' in line:
+            attempting_match = attempting_pattern.search(line)
+            if attempting_match:
+                self._set_once(self.software_info, "attempting to", attempting_match.group(1))
+        if 'git commit ' in line:
+            git_commit_match = git_commit_pattern.search(line)
+            if git_commit_match:
+                self._set_once(self.software_info, "git commit", git_commit_match.group(1))
+        if 'This is Aspherix' in line:
+            version_match = version_pattern.search(line)
+            if version_match:
+                self._set_once(self.software_info, "version", version_match.group(1))
+
+    def calibration_templates(self):
+        """Templates and their target parameters in reverse file order."""
+        calibration_templates = {}
+        for template_name in reversed(list(self.template_chunks)):
+            target_params = []
+            for chunk in reversed(self.template_chunks[template_name]):
+                target_params.extend(chunk)
+            calibration_templates[template_name] = target_params
+        return calibration_templates
+
+    def convergence(self):
+        return check_convergence(self.last_line)
+
+    def resolve(self, value):
+        """Substitute ${var} references with the values of the logged variables."""
+        return variable_reference_pattern.sub(lambda match: self.variables.get(match.group(1), match.group(0)), value)
+
+    def timing(self, converged="No"):
+        """
+        Wall-clock statistics of the calibration: simulation durations per
+        iteration, throughput and the estimated time to reach maxFunctionEval.
+        """
+        durations = [duration for duration in self.history.simulation_duration if not math.isnan(duration)]
+        timing = {
+            "start time": self._format_clock(self.start_clock),
+            "elapsed time [h]": self._hours(self.clock - self.start_clock) if self.clock is not None else 0.0,
+            "completed iterations": len(durations),
+            "mean simulation duration [s]": math.fsum(durations) / len(durations) if durations else None,
+            "min simulation duration [s]": float(min(durations)) if durations else None,
+            "max simulation duration [s]": float(max(durations)) if durations else None,
+            "throughput [iterations/h]": None,
+            "max function evaluations": None,
+            "remaining iterations": None,
+            "ETA [h]": None
+        }
+        history = self.history
+        if durations and history.last_completion_clock is not None:
+            span = history.last_completion_clock - history.first_iteration_clock
+            if span > 0:
+                timing["throughput [iterations/h]"] = len(durations) / self._hours(span)
+
+        max_function_eval = parse_value(self.resolve(self.max_function_eval))
+        if isinstance(max_function_eval, int):
+            timing["max function evaluations"] = max_function_eval
+            last_iteration = max(history.iterations) if history.iterations else 0
+            remaining = 0 if converged == "Yes" else max(max_function_eval - last_iteration, 0)
+            timing["remaining iterations"] = remaining
+            if remaining == 0:
+                timing["ETA [h]"] = 0.0
+            elif timing["throughput [iterations/h]"]:
+                timing["ETA [h]"] = remaining / timing["throughput [iterations/h]"]
+        return timing
+
+    def segments(self):
+        """Number of restarts and the iteration range of every segment of the log."""
+        return {
+            "restarts": self.history.restarts,
+            "segments": [dict(segment) for segment in self.history.segments]
+        }
+
+    def cores_per_simulation(self):
+        """
+        Cores of one simulation, nChunks times coresPerChunk of the calibration
+        cases (the largest case counts), num_chunks times cores_per_chunk of
+        settings/general.txt without case overrides, 1 if neither was logged.
+        """
+        chunk_settings = list(self.case_chunks.values()) or [("${num_chunks}", "${cores_per_chunk}")]
+        cores = 1
+        for chunks, cores_per_chunk in chunk_settings:
+            chunks = parse_value(self.resolve(chunks))
+            cores_per_chunk = parse_value(self.resolve(cores_per_chunk))
+            if isinstance(chunks, int) and isinstance(cores_per_chunk, int):
+                cores = max(cores, chunks * cores_per_chunk)
+        return cores
+
+    def core_hours(self):
+        """
+        Total core-hours of the finished iterations, together with the cores per
+        simulation and the workers they are based on. The core-hours of every
+        iteration are a column of the iteration history (see history_table).
+        """
+        cores_per_simulation = self.cores_per_simulation()
+        history = self.history
+        core_hours = [core_hours for core_hours in history.core_hours(cores_per_simulation)
+                      if not math.isnan(core_hours)]
+        workers = [workers for workers in history.workers if not math.isnan(workers)]
+        return {
+            "cores per simulation": cores_per_simulation,
+            "workers": int(max(workers)) if workers else None,
+            "core hours": round(math.fsum(core_hours), 4)
+        }
+
+    def history_table(self):
+        """Column names and array of the iteration history, with the core-hours of every iteration."""
+        return self.history.column_names(), self.history.to_array(self.cores_per_simulation())
+
+    @staticmethod
+    def _hours(seconds):
+        return round(seconds / 3600, 4)
+
+    @staticmethod
+    def _format_clock(clock):
+        if clock is None:
+            return ""
+        return f"{clock // 3600 % 24:02d}:{clock // 60 % 60:02d}:{clock % 60:02d}"
+
+    def case_index(self):
+        """
+        Per-case view of the calibration: template, type, target params,
+        measfile and the iterations of each case, in the order of the log.
+        """
+        case_index = {}
+        for case in list(self.calibration_cases) + [case for case in self.history.case_rows
+                                                    if case not in self.calibration_cases]:
+            case_data = dict(self.calibration_cases.get(case, {"template": "", "type": "", "target params": [],
+                                                               "measfile": ""}))
+            case_data["measfile"] = self.resolve(case_data["measfile"])
+            case_data["iterations"] = self.history.case_records(case, case_data["target params"] or None)
+            case_index[case] = case_data
+        return case_index
+
+    def results(self):
+        """Return the extracted dictionaries in the order used by the widgets."""
+        convergence = self.convergence()
+        # The PSD classes and the parameters are listed last to first, as in the former reverse scan
+        PSD = self.psd.to_dict(reverse=True)
+        input_parameters = dict(reversed(list(self.input_parameters.items())))
+        calibrated_parameters_property = {name: param_details.to_dict() for name, param_details
+                                          in reversed(list(self.calibrated_parameters_property.items()))}
+        return [
+            {**self.software_info, **self.segments(), **self.core_hours()},
+            self.calibration_templates(),
+            dict(self.models),
+            select_input_parameters(input_parameters, self.models),
+            PSD,
+            calibrated_parameters_property,
+            convergence,
+            self.timing(convergence["isconverged"]),
+            self.case_index()
+        ]
+
+
+def parse_calibration_log(logfile_path):
+    """Stream the calibration log through a CalibrationLogParser and return it."""
+    parser = CalibrationLogParser()
+    with compressedFiles.open_file(logfile_path, 'r') as log_file:
+        parser.feed_file(log_file)
+    return parser
+
+
+class LogFollower:
+    """
+    Incrementally parse a calibration log that is still being written.
+
+    The byte offset of the parsed part is remembered, every poll only reads the
+    bytes appended since the previous one and feeds the complete lines to the
+    same CalibrationLogParser. A file that became shorter than the offset was
+    rewritten and is parsed again from the start.
+
+    Compressed (archived) logs are decompressed while they are read, the offset
+    then counts compressed bytes and a changed file is always parsed again.
+    """
+
+    def __init__(self, logfile_path):
+        self.path = logfile_path
+        self.reset()
+
+    def reset(self):
+        self.parser = CalibrationLogParser()
+        self.offset = 0
+        self._pending = b""
+
+    def poll(self, progress=None):
+        """
+        Parse the newly appended bytes, returns the number of new complete lines.
+        progress(offset, size) is called after every block, it may raise to abort.
+        """
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            return 0
+        if size < self.offset:
+            self.reset()
+        if size == self.offset:
+            return 0
+        compressed = compressedFiles.is_compressed(self.path)
+        if compressed and self.offset:
+            self.reset()
+
+        new_lines = 0
+        with open(self.path, 'rb') as raw_file:
+            raw_file.seek(self.offset)
+            log_file = compressedFiles.decompressing_reader(self.path, raw_file)
+            for block in iter(lambda: log_file.read(READ_BLOCK_SIZE), b""):
+                self.offset = raw_file.tell() if compressed else self.offset + len(block)
+                data = self._pending + block
+                end = data.rfind(b"\n") + 1
+                # An incomplete last line is kept until the rest of it is written
+                self._pending = data[end:]
+                if not end:
+                    continue
+                lines = data[:end].decode('utf-8', 'replace').replace('\r\n', '\n').split('\n')
+                lines.pop()
+                for line in lines:
+                    self.parser.feed(line)
+                new_lines += len(lines)
+                if progress is not None:
+                    progress(self.offset, size)
+        return new_lines
+
+    def last_line(self):
+        """Final line of the parsed part, an incomplete last line counts as the final line."""
+        if self._pending.strip():
+            return self._pending.decode('utf-8', 'replace')
+        return self.parser.last_line
+
+    def convergence(self):
+        return check_convergence(self.last_line())
+
+    def results(self):
+        """Extracted dictionaries of the parsed part, see CalibrationLogParser.results."""
+        results = self.parser.results()
+        if self._pending.strip():
+            convergence = self.convergence()
+            results[SECTION_NAMES.index("Convergence")] = convergence
+            results[SECTION_NAMES.index("Timing")] = self.parser.timing(convergence["isconverged"])
+        return results
+
+
+def reverse_lines(file_path, block_size=REVERSE_BLOCK_SIZE):
+    """
+    Yield the lines of a file from the last to the first one without the
+    line ending, reading fixed-size blocks backwards from the end of the file.
+    Compressed files can not be read backwards, their last lines up to
+    REVERSE_SCAN_LIMIT bytes are collected in a forward pass instead.
+    """
+    if compressedFiles.is_compressed(file_path):
+        yield from reversed(tail_lines(file_path, REVERSE_SCAN_LIMIT))
+        return
+    with open(file_path, 'rb') as file:
+        position = file.seek(0, os.SEEK_END)
+        tail = b""
+        first_block = True
+        while position > 0:
+            step = min(block_size, position)
+            position -= step
+            file.seek(position)
+            block = file.read(step) + tail
+            if first_block and block.endswith(b"\n"):
+                # The line ending of the last line does not start a new line
+                block = block[:-1]
+            first_block = False
+            lines = block.split(b"\n")
+            # The first part may continue in the previous block
+            tail = lines.pop(0)
+            for line in reversed(lines):
+                yield line.rstrip(b"\r").decode('utf-8', 'replace')
+        if not first_block:
+            yield tail.rstrip(b"\r").decode('utf-8', 'replace')
+
+
+def tail_lines(file_path, limit):
+    """Return the last lines of a file, about limit bytes, without their line endings."""
+    lines = collections.deque()
+    size = 0
+    with compressedFiles.open_file(file_path, 'r', errors='replace') as file:
+        for line in file:
+            line = line.rstrip('\r\n')
+            lines.append(line)
+            size += len(line) + 1
+            while size > limit and len(lines) > 1:
+                size -= len(lines.popleft()) + 1
+    return list(lines)
+
+
+def read_best_iteration(file_path):
+    """Read the best quality function and its function evaluation from calibrated_params.txt."""
+    with compressedFiles.open_file(file_path, 'r') as file:
+        next(file, None)  # Skip the header line
+        for line in file:
+            parts = line.split()
+            if len(parts) >= 4:
+                return _to_float(parts[2]), int(parts[3])
+    return None, None
+
+
+def read_run_status(directory, scan_limit=REVERSE_SCAN_LIMIT):
+    """
+    Return the status of a calibration run directory without parsing the whole
+    log: convergence is decided from the last non-empty line, the last iteration
+    and its total quality function are searched backwards from the end of the
+    file and the best iteration is taken from calibrated_params.txt.
+    """
+    status = {
+        "isconverged": "No",
+        "last iteration": None,
+        "final quality function": None,
+        "best iteration": None,
+        "best quality function": None
+    }
+    logfile_path = compressedFiles.find_file(directory, LOG_FILE_NAME)
+    if logfile_path:
+        scanned = 0
+        final_line = None
+        for line in reverse_lines(logfile_path):
+            scanned += len(line) + 1
+            if final_line is None:
+                if not line.strip():
+                    continue
+                final_line = line
+                status.update(check_convergence(final_line))
+            payload = line[PAYLOAD_START:].rstrip()
+            if status["final quality function"] is None and payload.startswith("total quality function "):
+                total_match = total_quality_function_pattern.match(payload)
+                if total_match:
+                    status["final quality function"] = _to_float(total_match.group(1))
+            elif payload.startswith("iteration "):
+                iteration_match = iteration_pattern.match(payload)
+                if iteration_match:
+                    status["last iteration"] = int(iteration_match.group(1))
+                    break
+            if scanned > scan_limit:
+                break
+
+    calibrated_params_path = compressedFiles.find_file(directory, CALIBRATED_PARAMS_FILE_NAME)
+    if calibrated_params_path:
+        status["best quality function"], status["best iteration"] = read_best_iteration(calibrated_params_path)
+    return status
+
+
+def extract_calibration_data(logfile_path):
+    """
+    Stream the calibration log and return the Aspherix info, templates, models,
+    input parameters, PSD, calibrated parameter properties and convergence.
+    """
+    return parse_calibration_log(logfile_path).results()
+
+
+def extract_iteration_history(logfile_path):
+    """Return the column names and the per-iteration array of the calibration log."""
+    return parse_calibration_log(logfile_path).history_table()
+
+
+def read_calibrated_params(file_path):
+    """Read the best values of the calibrated parameters from calibrated_params.txt."""
+    calibrated_parameters = {}
+    with compressedFiles.open_file(file_path, 'r') as file:
+        next(file, None)  # Skip the header line
+        for line in file:
+            parts = line.strip().split()
+            if len(parts) >= 2:
+                calibrated_parameters[parts[0]] = float(parts[1])
+    return calibrated_parameters
+
+
+def calibration_sections(extracted_data, calibrated_params=None):
+    """Pair the extracted dictionaries with their section names in the JSON output."""
+    sections = list(zip(SECTION_NAMES, extracted_data))
+    if calibrated_params is not None:
+        sections.append(("Calibrated Parameters", calibrated_params))
+    return sections
+
+
+def calibration_document(user_info, calibration_case, sections, templates_meta_info):
+    """Assemble the calibration metadata document sent by the Read Aspherix widget."""
+    all_data = {
+        "User Data": user_info,
+        "Calibration Case": calibration_case
+    }
+    for name, data_dict in sections:
+        all_data[name] = data_dict
+    all_data["Template Meta Info"] = templates_meta_info
+    return all_data
+
+
+def load_log_follower(logfile_path, cache=None, progress=None):
+    """
+    Return a LogFollower that parsed the whole log, restored from the parse
+    cache when the file did not change since it was stored. progress is passed
+    on to LogFollower.poll.
+    """
+    cache = cache or get_parse_cache()
+    kind = f"calibration_log:{PARSER_VERSION}"
+    if cache is not None:
+        fingerprint = file_fingerprint(logfile_path)
+        follower = cache.get(kind, logfile_path, fingerprint)
+        if follower is not None:
+            follower.path = logfile_path
+            return follower
+    follower = LogFollower(logfile_path)
+    follower.poll(progress)
+    # A log that grew while it was parsed is stored on the next call
+    if cache is not None and follower.offset == fingerprint[0]:
+        cache.put(kind, logfile_path, follower, fingerprint)
+    return follower
+
+
+def load_calibrated_params(file_path, cache=None):
+    """read_calibrated_params backed by the parse cache."""
+    cache = cache or get_parse_cache()
+    if cache is None:
+        return read_calibrated_params(file_path)
+    return cache.cached(f"calibrated_params:{PARSER_VERSION}", file_path, read_calibrated_params)
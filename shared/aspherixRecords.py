@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""
+This file is part of the "DEMvironment" Add-on package for Orange3, that
+facilitates the data management of the DEM parameter calibration, Mainly using
+Aspherix(c) as a DEM calibration tool.
+DEMvironment add-on is a free software: you can redistribute it
+and/or modify it under the  terms of the GNU General Public License as
+published by the Free Software  Foundation, either version 3 of the License,
+or (at your option) any later version.
+
+DEMvironment add-on is distributed in the hope that it will be useful, but WITHOUT ANY
+ WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR
+ A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License along with
+ PP-SBSC. If not, see <https://www.gnu.org/licenses/>.
+
+ -------------------------------------------------------------------------
+    Contributing author and copyright for this file:
+
+        Copyright (c) 2023    Nazanin Ghods (TU Graz)
+        Copyright (c) 2023    Richard Amering (TU Graz)
+        Copyright (c) 2023    Stefan Radl (TU Graz)
+ -------------------------------------------------------------------------
+"""
+# Compact containers for the parsed log data. Holding the parsed histories of
+# thousands of runs in one process is dominated by the per-object overhead of
+# dicts, lists and float objects, so numeric series are kept in array('d')
+# buffers and records use __slots__. Every container serializes back to the
+# JSON shape of the calibration document.
+from array import array
+from dataclasses import dataclass
+
+
+@dataclass
+class ParameterDefinition:
+    """A param_calibration command: the type, initial value and bounds of a calibrated parameter."""
+    __slots__ = ("type", "init", "min", "max")
+    type: str
+    init: object
+    min: object
+    max: object
+
+    def to_dict(self):
+        return {'type': self.type, 'init': self.init, 'min': self.min, 'max': self.max}
+
+
+class NumberSeries:
+    """
+    Numbers in an array('d'). Values that are not floats (ints or unparsable
+    strings) are remembered by index, so to_list returns them unchanged.
+    """
+    __slots__ = ("values", "exact")
+
+    def __init__(self):
+        self.values = array('d')
+        self.exact = None
+
+    def __len__(self):
+        return len(self.values)
+
+    def append(self, value):
+        if type(value) is not float:
+            if self.exact is None:
+                self.exact = {}
+            self.exact[len(self.values)] = value
+            value = float(value) if isinstance(value, int) else float("nan")
+        self.values.append(value)
+
+    def to_list(self, reverse=False):
+        values = self.values.tolist()
+        if self.exact:
+            for index, value in self.exact.items():
+                values[index] = value
+        return values[::-1] if reverse else values
+
+
+class PSDClasses:
+    """Radii and mass fractions of the particle size classes, in the order they were added."""
+    __slots__ = ("radii", "mass_fractions")
+
+    def __init__(self):
+        self.radii = NumberSeries()
+        self.mass_fractions = NumberSeries()
+
+    def to_dict(self, reverse=False):
+        """The PSD section of the calibration document, reverse lists the classes last to first."""
+        radii_list = self.radii.to_list(reverse)
+        return {
+            "radii_list": radii_list,
+            "mass_fractions_list": self.mass_fractions.to_list(reverse),
+            "dispersity": len(radii_list)
+        }
+
+
+def float_column(length, value=float("nan")):
+    """An array('d') column of the given length filled with value."""
+    return array('d', [value]) * length
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""
+This file is part of the "DEMvironment" Add-on package for Orange3, that
+facilitates the data management of the DEM parameter calibration, Mainly using
+Aspherix(c) as a DEM calibration tool.
+DEMvironment add-on is a free software: you can redistribute it
+and/or modify it under the  terms of the GNU General Public License as
+published by the Free Software  Foundation, either version 3 of the License,
+or (at your option) any later version.
+
+DEMvironment add-on is distributed in the hope that it will be useful, but WITHOUT ANY
+ WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR
+ A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License along with
+ PP-SBSC. If not, see <https://www.gnu.org/licenses/>.
+
+ -------------------------------------------------------------------------
+    Contributing author and copyright for this file:
+
+        Copyright (c) 2023    Nazanin Ghods (TU Graz)
+        Copyright (c) 2023    Richard Amering (TU Graz)
+        Copyright (c) 2023    Stefan Radl (TU Graz)
+ -------------------------------------------------------------------------
+"""
+import io
+import os
+import warnings
+import numpy
+
+from shared import compressedFiles
+
+# Result files written by Aspherix(R) calibration, relative to the run directory
+RESULTS_DIRECTORY = os.path.join("calibration", "results")
+QF_HISTORY_FILE_NAME = "qf_history.dat"
+CONV_FILE_NAME = "conv.dat"
+
+
+def results_file_path(directory, file_name):
+    """Path of a results file or of its compressed copy, None if neither exists."""
+    return compressedFiles.find_file(os.path.join(directory, RESULTS_DIRECTORY), file_name)
+
+
+def results_signature(directory):
+    """(path, size, mtime_ns) of every results file of a run directory, changes whenever one of them is written."""
+    signature = []
+    for file_name in (QF_HISTORY_FILE_NAME, CONV_FILE_NAME):
+        file_path = results_file_path(directory, file_name)
+        try:
+            stat = os.stat(file_path) if file_path else None
+        except OSError:
+            stat = None
+        signature.append((file_path, stat.st_size, stat.st_mtime_ns) if stat else None)
+    return tuple(signature)
+
+
+def read_complete_rows(file_path):
+    """
+    Bytes of a results file up to the end of its last complete line. A running
+    calibration appends to its results files, so a last line without a line
+    break may be a row that is still being written and is cut off.
+    """
+    with compressedFiles.open_file(file_path, 'rb') as file:
+        data = file.read()
+    return data[:data.rfind(b"\n") + 1]
+
+
+def read_header(data):
+    """Return the column names of the last comment line before the data, if any."""
+    header = []
+    # Only the lines up to the first row are split off
+    for line in io.BytesIO(data):
+        stripped = line.strip()
+        if not stripped:
+            continue
+        if not stripped.startswith(b"#"):
+            break
+        header = stripped.lstrip(b"#").decode(errors="replace").split()
+    return header
+
+
+def load_results_file(file_path):
+    """
+    Load the complete rows of a whitespace separated Aspherix results file
+    (e.g. qf_history.dat or conv.dat) in one bulk numpy.loadtxt call. Returns
+    the column names and a 2D float array, the names are taken from the
+    comment header when it matches the number of columns. Raises ValueError
+    if the rows do not form a table.
+    """
+    data = read_complete_rows(file_path)
+    with warnings.catch_warnings():
+        # An empty file is a valid result of a calibration that just started
+        warnings.simplefilter("ignore", UserWarning)
+        values = numpy.loadtxt(io.BytesIO(data), comments="#", ndmin=2)
+    header = read_header(data)
+    if not len(values):
+        values = numpy.empty((0, len(header)))
+    if len(header) != values.shape[1]:
+        header = [f"column {index + 1}" for index in range(values.shape[1])]
+    return header, values
+
+
+def load_results(directory):
+    """
+    Load qf_history.dat and conv.dat of a run directory. Files that are
+    missing, can not be read or have no rows yet give None, so the histories
+    are taken from the log instead.
+    """
+    results = {}
+    for file_name in (QF_HISTORY_FILE_NAME, CONV_FILE_NAME):
+        file_path = results_file_path(directory, file_name)
+        try:
+            header, values = load_results_file(file_path) if file_path else (None, None)
+        except (OSError, ValueError):
+            header, values = None, None
+        results[file_name] = (header, values) if values is not None and len(values) else None
+    return results
+
+
+def best_quality_function_history(column_names, values):
+    """
+    Derive the history of the best quality function (the content of conv.dat)
+    from an iteration history with a "total quality function" column.
+    """
+    iterations = values[:, column_names.index("iteration")]
+    total_qf = values[:, column_names.index("total quality function")]
+    best_qf = numpy.fmin.accumulate(total_qf) if len(total_qf) else total_qf
+    return ["iteration", "best quality function"], numpy.column_stack((iterations, best_qf))
@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""
+This file is part of the "DEMvironment" Add-on package for Orange3, that
+facilitates the data management of the DEM parameter calibration, Mainly using
+Aspherix(c) as a DEM calibration tool.
+DEMvironment add-on is a free software: you can redistribute it
+and/or modify it under the  terms of the GNU General Public License as
+published by the Free Software  Foundation, either version 3 of the License,
+or (at your option) any later version.
+
+DEMvironment add-on is distributed in the hope that it will be useful, but WITHOUT ANY
+ WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR
+ A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License along with
+ PP-SBSC. If not, see <https://www.gnu.org/licenses/>.
+
+ -------------------------------------------------------------------------
+    Contributing author and copyright for this file:
+
+        Copyright (c) 2023    Nazanin Ghods (TU Graz)
+        Copyright (c) 2023    Richard Amering (TU Graz)
+        Copyright (c) 2023    Stefan Radl (TU Graz)
+ -------------------------------------------------------------------------
+"""
+import os
+import re
+
+from shared import compressedFiles
+
+# calibration\workDir\workDir.N\Aspherix\<case>\logRun.txt, relative to the run directory
+WORK_DIRECTORY = os.path.join("calibration", "workDir")
+RUN_LOG_FILE_NAME = "logRun.txt"
+
+loop_time_pattern = re.compile(r'Loop time of ([\d.eE+-]+) on (\d+) procs for (\d+) steps with (\d+) (?:atoms|particles)')
+wall_time_pattern = re.compile(r'Total wall time: (\d+):(\d+):(\d+)')
+performance_pattern = re.compile(r'([\d.eE+-]+) timesteps/s')
+
+
+def find_run_logs(directory):
+    """
+    Return (iteration, case, path) of every solver log below calibration/workDir,
+    the iteration is the N of its workDir.N directory.
+    """
+    run_logs = []
+    try:
+        work_dirs = [entry for entry in os.scandir(os.path.join(directory, WORK_DIRECTORY))
+                     if entry.is_dir() and entry.name.startswith("workDir.")]
+    except OSError:
+        return run_logs
+    for work_dir in work_dirs:
+        try:
+            iteration = int(work_dir.name.split(".", 1)[1])
+        except ValueError:
+            continue
+        try:
+            cases = [entry for entry in os.scandir(os.path.join(work_dir.path, "Aspherix")) if entry.is_dir()]
+        except OSError:
+            continue
+        for case in cases:
+            path = compressedFiles.find_file(case.path, RUN_LOG_FILE_NAME)
+            if path:
+                run_logs.append((iteration, case.name, path))
+    return sorted(run_logs)
+
+
+def parse_run_log(path):
+    """
+    Stream one solver log and collect its performance summary. All "Loop time
+    of ..." lines of the log are summed up, the particle count is the largest
+    one reported.
+    """
+    particles = 0
+    timesteps = 0
+    loop_time = 0.0
+    processors = 0
+    wall_time = None
+    reported_steps_per_second = None
+    with compressedFiles.open_file(path, 'r', errors='replace') as run_log:
+        for line in run_log:
+            if line.startswith("Loop time of "):
+                loop_match = loop_time_pattern.match(line)
+                if loop_match:
+                    loop_time += float(loop_match.group(1))
+                    processors = max(processors, int(loop_match.group(2)))
+                    timesteps += int(loop_match.group(3))
+                    particles = max(particles, int(loop_match.group(4)))
+            elif line.startswith("Total wall time:"):
+                wall_match = wall_time_pattern.match(line)
+                if wall_match:
+                    hours, minutes, seconds = (int(value) for value in wall_match.groups())
+                    wall_time = hours * 3600 + minutes * 60 + seconds
+            elif line.startswith("Performance:"):
+                performance_match = performance_pattern.search(line)
+                if performance_match:
+                    reported_steps_per_second = float(performance_match.group(1))
+
+    if loop_time > 0:
+        steps_per_second = timesteps / loop_time
+    else:
+        steps_per_second = reported_steps_per_second
+    return {
+        "particles": particles or None,
+        "timesteps": timesteps or None,
+        "processors": processors or None,
+        "loop time [s]": loop_time or None,
+        "wall time [s]": wall_time,
+        "steps per second": steps_per_second
+    }
+
+
+def scan_run_logs(run_logs, max_workers=None, progress=None):
+    """
+    Parse the solver logs found by find_run_logs in a process pool and return
+    one record per log. progress(done, total) is called after every finished
+    log, it may raise to cancel the pending ones.
+    """
+    records = [None] * len(run_logs)
+    if not run_logs:
+        return records
+    # Imported here, multiprocessing is only needed once logs are submitted
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(parse_run_log, path): index for index, (_, _, path) in enumerate(run_logs)}
+        try:
+            for done, future in enumerate(as_completed(futures), 1):
+                index = futures[future]
+                iteration, case, path = run_logs[index]
+                record = {"iteration": iteration, "case": case}
+                try:
+                    record.update(future.result())
+                except OSError:
+                    pass
+                records[index] = record
+                if progress is not None:
+                    progress(done, len(run_logs))
+        except BaseException:
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+    return records
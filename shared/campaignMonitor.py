@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+"""
+This file is part of the "DEMvironment" Add-on package for Orange3, that
+facilitates the data management of the DEM parameter calibration, Mainly using
+Aspherix(c) as a DEM calibration tool.
+DEMvironment add-on is a free software: you can redistribute it
+and/or modify it under the  terms of the GNU General Public License as
+published by the Free Software  Foundation, either version 3 of the License,
+or (at your option) any later version.
+
+DEMvironment add-on is distributed in the hope that it will be useful, but WITHOUT ANY
+ WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR
+ A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License along with
+ PP-SBSC. If not, see <https://www.gnu.org/licenses/>.
+
+ -------------------------------------------------------------------------
+    Contributing author and copyright for this file:
+
+        Copyright (c) 2023    Nazanin Ghods (TU Graz)
+        Copyright (c) 2023    Richard Amering (TU Graz)
+        Copyright (c) 2023    Stefan Radl (TU Graz)
+ -------------------------------------------------------------------------
+"""
+import math
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from shared import aspherixBatch, aspherixLog, compressedFiles
+
+# Threads polling the logs, reading is I/O bound and parsing holds the GIL anyway
+DEFAULT_POLL_WORKERS = 4
+# A running log that did not grow for this long, and for twice its last
+# iteration, is reported as stalled
+STALL_SECONDS = 3600
+
+STATUS_NO_LOG = "no log"
+STATUS_STARTING = "starting"
+STATUS_RUNNING = "running"
+STATUS_STALLED = "stalled"
+STATUS_CONVERGED = "converged"
+STATUS_FAILED = "failed"
+STATUS_UNREADABLE = "unreadable"
+
+
+def _nan_to_none(value):
+    return None if value is None or math.isnan(value) else value
+
+
+class RunMonitor:
+    """
+    Live status of one calibration run. The log is followed with a
+    LogFollower, so every poll only parses the bytes appended since the
+    previous one. The first poll restores the follower from the parse cache
+    when the log did not change since it was parsed last.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.follower = None
+        # Set to the modification time of the log once it is found, so a run that stopped
+        # before the monitor was started is not reported as active
+        self.last_growth = time.time()
+        # An abandoned poll may still be running when the next one starts
+        self._lock = threading.Lock()
+
+    def poll(self):
+        """
+        Parse the appended part of the log and return the status record of the
+        run. A log that cannot be read or parsed gives an "unreadable" record
+        with the error, so one broken run does not stop the poll of the others.
+        """
+        with self._lock:
+            try:
+                if self.follower is None:
+                    logfile_path = compressedFiles.find_file(self.directory, aspherixLog.LOG_FILE_NAME)
+                    if logfile_path:
+                        self.last_growth = os.path.getmtime(logfile_path)
+                        self.follower = aspherixLog.load_log_follower(logfile_path)
+                elif self.follower.poll():
+                    self.last_growth = time.time()
+                return self.status()
+            except Exception as e:
+                # The follower may have stopped in the middle of a line, the log is read again next time
+                self.follower = None
+                return {**self.status(), "status": STATUS_UNREADABLE, "error": f"{type(e).__name__}: {e}"}
+
+    def status(self):
+        record = {
+            "status": STATUS_NO_LOG,
+            "iteration": None,
+            "completed iterations": 0,
+            "best quality function": None,
+            "last iteration duration [s]": None,
+            "ETA [h]": None,
+            "idle time [s]": None,
+            "directory": self.directory
+        }
+        if self.follower is None:
+            return record
+        parser = self.follower.parser
+        history = parser.history
+        final_line = self.follower.last_line()
+        convergence = aspherixLog.check_convergence(final_line)
+        timing = parser.timing(convergence["isconverged"])
+        durations = [duration for duration in history.simulation_duration if not math.isnan(duration)]
+        total_qfs = [qf for qf in history.total_quality_function if not math.isnan(qf)]
+        idle_time = time.time() - self.last_growth
+        record.update({
+            "iteration": history.iterations[-1] if history.iterations else None,
+            "completed iterations": timing["completed iterations"],
+            "best quality function": min(total_qfs) if total_qfs else None,
+            "last iteration duration [s]": _nan_to_none(durations[-1]) if durations else None,
+            "ETA [h]": timing["ETA [h]"],
+            "idle time [s]": round(idle_time)
+        })
+        if convergence["isconverged"] == "Yes":
+            record["status"] = STATUS_CONVERGED
+        elif "ERROR" in final_line:
+            record["status"] = STATUS_FAILED
+        elif idle_time > max(STALL_SECONDS, 2 * (durations[-1] if durations else 0)):
+            record["status"] = STATUS_STALLED
+        elif not history.iterations:
+            record["status"] = STATUS_STARTING
+        else:
+            record["status"] = STATUS_RUNNING
+        return record
+
+
+class CampaignMonitor:
+    """
+    Follow the logs of many calibration runs at once. The runs are the given
+    directories and every directory with a calibration log below the campaign
+    root, which is scanned again by rescan() to pick up new runs. poll() reads
+    the appended part of all logs in a small thread pool.
+    """
+
+    def __init__(self, directories=(), root="", max_workers=DEFAULT_POLL_WORKERS):
+        self.root = root
+        self.runs = {}
+        for directory in directories:
+            self.add_run(directory)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="campaign-monitor")
+
+    def add_run(self, directory):
+        directory = os.path.normpath(directory)
+        if directory not in self.runs:
+            self.runs[directory] = RunMonitor(directory)
+
+    def rescan(self):
+        """Add the run directories below the campaign root that are not monitored yet."""
+        if self.root and os.path.isdir(self.root):
+            for directory in aspherixBatch.find_run_directories(self.root, require_calibrated_params=False):
+                self.add_run(directory)
+
+    def run_name(self, directory):
+        if self.root and os.path.normpath(directory).startswith(os.path.normpath(self.root)):
+            return os.path.relpath(directory, self.root)
+        return directory
+
+    def poll(self, progress=None):
+        """
+        Poll all runs and return one status record per run, in the order they
+        were added. progress(done, total) is called after every polled run, it
+        may raise to abandon the poll.
+        """
+        runs = list(self.runs.values())
+        records = []
+        for done, record in enumerate(self._executor.map(RunMonitor.poll, runs), 1):
+            records.append({"run": self.run_name(record["directory"]), **record})
+            if progress is not None:
+                progress(done, len(runs))
+        return records
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""
+This file is part of the "DEMvironment" Add-on package for Orange3, that
+facilitates the data management of the DEM parameter calibration, Mainly using
+Aspherix(c) as a DEM calibration tool.
+DEMvironment add-on is a free software: you can redistribute it
+and/or modify it under the  terms of the GNU General Public License as
+published by the Free Software  Foundation, either version 3 of the License,
+or (at your option) any later version.
+
+DEMvironment add-on is distributed in the hope that it will be useful, but WITHOUT ANY
+ WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR
+ A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License along with
+ PP-SBSC. If not, see <https://www.gnu.org/licenses/>.
+
+ -------------------------------------------------------------------------
+    Contributing author and copyright for this file:
+
+        Copyright (c) 2023    Nazanin Ghods (TU Graz)
+        Copyright (c) 2023    Richard Amering (TU Graz)
+        Copyright (c) 2023    Stefan Radl (TU Graz)
+ -------------------------------------------------------------------------
+"""
+import bz2
+import gzip
+import lzma
+import os
+
+# Archived calibration directories may hold compressed copies of the log and result files.
+# Extension -> (open function, reader of an already opened binary file)
+COMPRESSED_EXTENSIONS = {
+    ".gz": (gzip.open, lambda raw_file: gzip.GzipFile(fileobj=raw_file, mode='rb')),
+    ".xz": (lzma.open, lzma.LZMAFile),
+    ".bz2": (bz2.open, bz2.BZ2File)
+}
+
+
+def is_compressed(file_path):
+    return os.path.splitext(file_path)[1] in COMPRESSED_EXTENSIONS
+
+
+def variants(file_name):
+    """The plain file name followed by the names of its compressed copies."""
+    return [file_name] + [file_name + extension for extension in COMPRESSED_EXTENSIONS]
+
+
+def find_file(directory, file_name):
+    """Return the path of file_name in directory or of a compressed copy of it, None if there is none."""
+    for name in variants(file_name):
+        path = os.path.join(directory, name)
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+def decompressing_reader(file_path, raw_file):
+    """
+    Wrap an open binary file in a reader that decompresses it on the fly, if
+    file_path has a compressed extension. The position of raw_file tells how
+    much of the compressed file was read.
+    """
+    extension = os.path.splitext(file_path)[1]
+    if extension not in COMPRESSED_EXTENSIONS:
+        return raw_file
+    return COMPRESSED_EXTENSIONS[extension][1](raw_file)
+
+
+def open_file(file_path, mode='r', **kwargs):
+    """open() that transparently decompresses .gz, .xz and .bz2 files while they are read."""
+    if not is_compressed(file_path):
+        return open(file_path, mode, **kwargs)
+    if 'b' not in mode and 't' not in mode:
+        mode += 't'
+    return COMPRESSED_EXTENSIONS[os.path.splitext(file_path)[1]][0](file_path, mode, **kwargs)
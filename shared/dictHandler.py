@@ -23,11 +23,13 @@ You should have received a copy of the GNU General Public License along with
         Copyright (c) 2023    Stefan Radl (TU Graz)
  -------------------------------------------------------------------------
 """
-from Orange.data import Table, Domain, StringVariable
+# Orange (and numpy) are imported inside the table conversions, so the
+# headless tools can import this module without Orange installed
 import json
 
 def dict_to_orange_table(data_dict):
     """Converts a dictionary to an Orange data table."""
+    from Orange.data import Table, Domain, StringVariable
     
     # Flatten the dictionary by converting nested dictionaries to JSON strings
     flat_dict = {}
@@ -44,13 +46,45 @@ def dict_to_orange_table(data_dict):
     
     return Table.from_list(domain, data)
 
+def array_to_orange_table(column_names, values):
+    """Converts a 2D numeric array with named columns to an Orange data table."""
+    from Orange.data import Table, Domain, ContinuousVariable
+    domain = Domain([ContinuousVariable(str(name)) for name in column_names])
+    return Table.from_numpy(domain, values)
+
+def records_to_orange_table(records):
+    """
+    Converts a list of flat dictionaries to an Orange data table with one row
+    per dictionary. Keys with only numeric values become ContinuousVariables,
+    all other keys become StringVariable metas.
+    """
+    import numpy
+    from Orange.data import Table, Domain, StringVariable, ContinuousVariable
+    keys = []
+    for record in records:
+        keys.extend(key for key in record if key not in keys)
+
+    def is_numeric(key):
+        return all(isinstance(record.get(key), (int, float, type(None))) and not isinstance(record.get(key), bool)
+                   for record in records)
+    numeric_keys = [key for key in keys if is_numeric(key)]
+    string_keys = [key for key in keys if key not in numeric_keys]
+
+    domain = Domain([ContinuousVariable(str(key)) for key in numeric_keys],
+                    metas=[StringVariable(str(key)) for key in string_keys])
+    X = numpy.array([[numpy.nan if record.get(key) is None else record[key] for key in numeric_keys]
+                     for record in records], dtype=float).reshape(len(records), len(numeric_keys))
+    metas = numpy.array([["" if record.get(key) is None else str(record[key]) for key in string_keys]
+                         for record in records], dtype=object).reshape(len(records), len(string_keys))
+    return Table.from_numpy(domain, X, metas=metas)
+
 def format_dict_as_text(data_dict,title):
     """Formats the dictionary as colored and formatted HTML string."""
     
     entries = [f'<font color="blue">"{key}"</font>: <font color="green">"{value}"</font>' for key, value in data_dict.items() if value]
     return f'<b>{title}</b><br/>{ "{" }<br/>' + ',<br/>'.join(entries) + '<br/>{ "}" }'
 
-def orange_table_to_dict(table: Table) -> dict:
+def orange_table_to_dict(table: "Table") -> dict:
     """
     Convert an Orange data table to a dictionary.
     
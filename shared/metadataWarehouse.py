@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+"""
+This file is part of the "DEMvironment" Add-on package for Orange3, that
+facilitates the data management of the DEM parameter calibration, Mainly using
+Aspherix(c) as a DEM calibration tool.
+DEMvironment add-on is a free software: you can redistribute it
+and/or modify it under the  terms of the GNU General Public License as
+published by the Free Software  Foundation, either version 3 of the License,
+or (at your option) any later version.
+
+DEMvironment add-on is distributed in the hope that it will be useful, but WITHOUT ANY
+ WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR
+ A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License along with
+ PP-SBSC. If not, see <https://www.gnu.org/licenses/>.
+
+ -------------------------------------------------------------------------
+    Contributing author and copyright for this file:
+
+        Copyright (c) 2023    Nazanin Ghods (TU Graz)
+        Copyright (c) 2023    Richard Amering (TU Graz)
+        Copyright (c) 2023    Stefan Radl (TU Graz)
+ -------------------------------------------------------------------------
+"""
+import glob
+import json
+import os
+import uuid
+from datetime import datetime
+
+from shared import warehouseLayout
+from shared.warehouseService import get_warehouse_service
+
+# Prefix of the DOI and of the metadata file name, by the section that identifies the source widget
+WIDGET_INDICATORS = {
+    "Data Info": "exp",
+    "Correlation Info": "rel",
+    "Calibration Case": "calib"
+}
+META_INFO_KEYS = ["version", "doi", "Archived time"]
+
+
+def widget_indicator(document):
+    """Return "exp", "rel" or "calib" for a metadata document, "" if the source is unknown."""
+    for section, indicator in WIDGET_INDICATORS.items():
+        if section in document:
+            return indicator
+    return ""
+
+
+def document_directory(document):
+    """The directory of the data described by a metadata document, the DOI file is saved there."""
+    if "Data Info" in document:
+        return os.path.dirname(document["Data Info"].get("File location/Links", ""))
+    if "Correlation Info" in document:
+        return os.path.dirname(document["Correlation Info"].get("Python file path", ""))
+    if "Calibration Case" in document:
+        return document["Calibration Case"].get("Local Directory", "")
+    return ""
+
+
+def existing_metadata_files(directory, indicator):
+    """Return the metadata files of the given kind in a directory."""
+    return glob.glob(os.path.join(glob.escape(directory), f"{indicator}-*.json"))
+
+
+def save_json_data_to_file(json_data, file_path):
+    # The shard directory of a sharded warehouse is created with its first file
+    directory = os.path.dirname(os.path.abspath(file_path))
+    os.makedirs(directory, exist_ok=True)
+    # Written next to the file and moved into place: a reader never sees half a file, and a
+    # rewrite changes the modification time of the directory like a new file does, which is
+    # what the warehouse index checks before it scans (see WarehouseIndex.directory_signature)
+    temp_path = os.path.join(directory, f".{os.path.basename(file_path)}.tmp")
+    with open(temp_path, 'w') as file:
+        json.dump(json_data, file, indent=4)
+    os.replace(temp_path, file_path)
+    get_warehouse_service().invalidate(file_path)
+
+
+def read_metadata_file(file_path, store=True):
+    """Parsed content of a metadata file, shared through the warehouse service. Do not modify it."""
+    return get_warehouse_service().read(file_path, store)
+
+
+def _write_metadata(document, directory, indicator, unique_doi, version):
+    meta_info = {
+        "Archived time": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        "doi": f"{indicator}-{unique_doi}",
+        "version": version
+    }
+    combined_data = {"meta_info": meta_info, **document}
+    file_path = os.path.join(directory, f"{indicator}-{unique_doi[:8]}.json")
+    save_json_data_to_file(combined_data, file_path)
+    return combined_data, file_path
+
+
+def assign_doi(document, directory=None):
+    """
+    Assign a new DOI (version 0) to a metadata document and save it next to its
+    data, as the DOI.json widget does. Returns the document with its meta_info
+    and the path of the saved file.
+    """
+    indicator = widget_indicator(document)
+    directory = document_directory(document) if directory is None else directory
+    return _write_metadata(document, directory, indicator, str(uuid.uuid4()), 0)
+
+
+def assign_new_version(document, existing_file_path):
+    """
+    Save a metadata document as the next version of an existing metadata file.
+    The DOI is kept and the existing file is renamed to <file>.v<version>.bak.
+    """
+    indicator = widget_indicator(document)
+    meta_info = read_metadata_file(existing_file_path)["meta_info"]
+    unique_doi = meta_info["doi"].replace(f"{indicator}-", "", 1)
+    os.rename(existing_file_path, existing_file_path + f".v{meta_info['version']}.bak")
+    return _write_metadata(document, os.path.dirname(existing_file_path), indicator, unique_doi,
+                           meta_info["version"] + 1)
+
+
+def is_valid_metadata(json_data):
+    return all(key in json_data.get("meta_info", {}) for key in META_INFO_KEYS)
+
+
+def warehouse_file_name(json_data):
+    doi = json_data["meta_info"]["doi"]
+    return f"{doi.split('-')[0]}-{doi.split('-')[1][:8]}.json"
+
+
+def warehouse_file_path(json_data, warehouse_directory):
+    """
+    Path of the warehouse file of a metadata document: the registered file if
+    there is one, otherwise where the layout of the warehouse places it.
+    """
+    file_name = warehouse_file_name(json_data)
+    layout = warehouseLayout.warehouse_layout(warehouse_directory)
+    return (warehouseLayout.find_warehouse_file(warehouse_directory, file_name, layout)
+            or warehouseLayout.warehouse_file_path(warehouse_directory, file_name, layout))
+
+
+def find_doi_file(doi, warehouse_directory):
+    """Path of the registered file of a DOI, None if it is not in the warehouse."""
+    if doi.split("-")[0] not in WIDGET_INDICATORS.values() or "-" not in doi:
+        return None
+    return warehouseLayout.find_warehouse_file(warehouse_directory, warehouse_file_name({"meta_info": {"doi": doi}}))
+
+
+def register_metadata(json_data, warehouse_directory, overwrite=False):
+    """
+    Register a metadata document in the metadata warehouse without asking, as
+    the Metadata Registry widget would with its default answers: a higher
+    version replaces the registered file (kept as <file>.bak), the same or a
+    lower version is only written with overwrite. Returns "registered",
+    "new version", "overwritten" or "exists".
+    """
+    if not is_valid_metadata(json_data):
+        raise ValueError("Invalid JSON metadata, the meta_info needs a version, a doi and an archived time.")
+    file_path = warehouse_file_path(json_data, warehouse_directory)
+    if not os.path.exists(file_path):
+        save_json_data_to_file(json_data, file_path)
+        return "registered"
+
+    existing_data = read_metadata_file(file_path)
+    if json_data["meta_info"]["version"] > existing_data["meta_info"]["version"]:
+        backup_file_path = file_path + ".bak"
+        if os.path.exists(backup_file_path):
+            os.remove(backup_file_path)
+        os.rename(file_path, backup_file_path)
+        save_json_data_to_file(json_data, file_path)
+        return "new version"
+    if overwrite:
+        save_json_data_to_file(json_data, file_path)
+        return "overwritten"
+    return "exists"
+
+
+def read_warehouse_documents(warehouse_directory):
+    """
+    Read the registered metadata files of the warehouse (exp-, rel- and
+    calib-*.json, in any layout) and return them by DOI. Files that are no
+    valid metadata are skipped.
+    """
+    documents = {}
+    relative_paths = sorted((relative_path for relative_path, _ in warehouseLayout.scan_warehouse_files(warehouse_directory)),
+                            key=os.path.basename)
+    for relative_path in relative_paths:
+        try:
+            json_data = read_metadata_file(os.path.join(warehouse_directory, relative_path), store=False)
+        except (OSError, ValueError):
+            continue
+        if isinstance(json_data, dict) and is_valid_metadata(json_data):
+            documents[json_data["meta_info"]["doi"]] = json_data
+    return documents
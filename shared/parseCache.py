@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+"""
+This file is part of the "DEMvironment" Add-on package for Orange3, that
+facilitates the data management of the DEM parameter calibration, Mainly using
+Aspherix(c) as a DEM calibration tool.
+DEMvironment add-on is a free software: you can redistribute it
+and/or modify it under the  terms of the GNU General Public License as
+published by the Free Software  Foundation, either version 3 of the License,
+or (at your option) any later version.
+
+DEMvironment add-on is distributed in the hope that it will be useful, but WITHOUT ANY
+ WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR
+ A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License along with
+ PP-SBSC. If not, see <https://www.gnu.org/licenses/>.
+
+ -------------------------------------------------------------------------
+    Contributing author and copyright for this file:
+
+        Copyright (c) 2023    Nazanin Ghods (TU Graz)
+        Copyright (c) 2023    Richard Amering (TU Graz)
+        Copyright (c) 2023    Stefan Radl (TU Graz)
+ -------------------------------------------------------------------------
+"""
+import hashlib
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from contextlib import closing
+
+CACHE_FILE_NAME = "parse_cache.sqlite"
+DEFAULT_MAX_BYTES = 256 << 20
+# Bytes hashed at the start and at the end of a file for its fingerprint
+FINGERPRINT_SAMPLE_SIZE = 1 << 16
+
+
+def default_cache_dir():
+    """Per-user cache directory, can be overridden with DEMVIRONMENT_CACHE_DIR."""
+    if os.environ.get("DEMVIRONMENT_CACHE_DIR"):
+        return os.environ["DEMVIRONMENT_CACHE_DIR"]
+    if os.name == "nt":
+        base = os.environ.get("LOCALAPPDATA", os.path.expanduser("~"))
+        return os.path.join(base, "DEMvironment", "cache")
+    base = os.environ.get("XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache"))
+    return os.path.join(base, "demvironment")
+
+
+def file_fingerprint(file_path):
+    """
+    Return (size, mtime_ns, digest) of a file. The digest hashes the first and
+    the last FINGERPRINT_SAMPLE_SIZE bytes, so it is cheap for large logs and
+    still catches rewrites that keep the size and the modification time.
+    """
+    stat = os.stat(file_path)
+    digest = hashlib.blake2b(digest_size=16)
+    with open(file_path, 'rb') as file:
+        digest.update(file.read(FINGERPRINT_SAMPLE_SIZE))
+        if stat.st_size > 2 * FINGERPRINT_SAMPLE_SIZE:
+            file.seek(-FINGERPRINT_SAMPLE_SIZE, os.SEEK_END)
+        digest.update(file.read(FINGERPRINT_SAMPLE_SIZE))
+    return stat.st_size, stat.st_mtime_ns, digest.hexdigest()
+
+
+class ParseCache:
+    """
+    On-disk cache of parsed files, stored in a SQLite database.
+
+    Entries are keyed on the kind of data and the absolute file path and are
+    only returned while the size, the modification time and the content digest
+    of the file are unchanged. The least recently used entries are evicted
+    once the stored data exceeds max_bytes.
+
+    The cache is only an optimization: when the database is locked by another
+    process for longer than the timeout, or the disk is full or read-only,
+    get() reports a miss and put() skips the store instead of raising.
+    """
+
+    def __init__(self, cache_dir=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir or default_cache_dir()
+        self.db_path = os.path.join(self.cache_dir, CACHE_FILE_NAME)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with self._connect() as conn:
+            # The batch extraction reads and writes the cache from many worker processes at
+            # once, in WAL mode readers do not wait for a writer and writers only for each other
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""CREATE TABLE IF NOT EXISTS entries (
+                                kind TEXT, path TEXT, size INTEGER, mtime_ns INTEGER, digest TEXT,
+                                value BLOB, nbytes INTEGER, last_used REAL,
+                                PRIMARY KEY (kind, path))""")
+
+    def _connect(self):
+        # One short-lived connection per call keeps the cache usable from worker threads
+        return closing(sqlite3.connect(self.db_path, timeout=10, isolation_level=None))
+
+    def get(self, kind, file_path, fingerprint=None):
+        """Return the cached value for the file, or None if missing or outdated."""
+        path = os.path.abspath(file_path)
+        fingerprint = fingerprint or file_fingerprint(path)
+        try:
+            with self._lock, self._connect() as conn:
+                row = conn.execute("SELECT size, mtime_ns, digest, value FROM entries WHERE kind=? AND path=?",
+                                   (kind, path)).fetchone()
+                if row is None:
+                    return None
+                if tuple(row[:3]) != tuple(fingerprint):
+                    conn.execute("DELETE FROM entries WHERE kind=? AND path=?", (kind, path))
+                    return None
+                conn.execute("UPDATE entries SET last_used=? WHERE kind=? AND path=?", (time.time(), kind, path))
+        except sqlite3.Error:
+            return None
+        try:
+            return pickle.loads(row[3])
+        except Exception:
+            return None
+
+    def put(self, kind, file_path, value, fingerprint=None):
+        """Store the value for the current state of the file."""
+        path = os.path.abspath(file_path)
+        size, mtime_ns, digest = fingerprint or file_fingerprint(path)
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        if len(blob) > self.max_bytes:
+            return
+        try:
+            with self._lock, self._connect() as conn:
+                conn.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                             (kind, path, size, mtime_ns, digest, blob, len(blob), time.time()))
+                self._evict(conn)
+        except sqlite3.Error:
+            # The value is still returned to the caller, it is just not stored
+            pass
+
+    def _evict(self, conn):
+        total = conn.execute("SELECT COALESCE(SUM(nbytes), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for kind, path, nbytes in conn.execute("SELECT kind, path, nbytes FROM entries ORDER BY last_used").fetchall():
+            conn.execute("DELETE FROM entries WHERE kind=? AND path=?", (kind, path))
+            total -= nbytes
+            if total <= self.max_bytes:
+                break
+
+    def cached(self, kind, file_path, loader):
+        """Return the cached value of the file or compute it with loader(file_path) and store it."""
+        fingerprint = file_fingerprint(file_path)
+        value = self.get(kind, file_path, fingerprint)
+        if value is None:
+            value = loader(file_path)
+            self.put(kind, file_path, value, fingerprint)
+        return value
+
+    def clear(self):
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM entries")
+
+
+_default_cache = None
+
+
+def get_parse_cache():
+    """Process-wide cache in the default cache directory, None if it can not be created."""
+    global _default_cache
+    if _default_cache is None:
+        try:
+            _default_cache = ParseCache()
+        except (OSError, sqlite3.Error):
+            return None
+    return _default_cache
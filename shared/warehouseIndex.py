@@ -0,0 +1,342 @@
+# -*- coding: utf-8 -*-
+"""
+This file is part of the "DEMvironment" Add-on package for Orange3, that
+facilitates the data management of the DEM parameter calibration, Mainly using
+Aspherix(c) as a DEM calibration tool.
+DEMvironment add-on is a free software: you can redistribute it
+and/or modify it under the  terms of the GNU General Public License as
+published by the Free Software  Foundation, either version 3 of the License,
+or (at your option) any later version.
+
+DEMvironment add-on is distributed in the hope that it will be useful, but WITHOUT ANY
+ WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR
+ A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License along with
+ PP-SBSC. If not, see <https://www.gnu.org/licenses/>.
+
+ -------------------------------------------------------------------------
+    Contributing author and copyright for this file:
+
+        Copyright (c) 2023    Nazanin Ghods (TU Graz)
+        Copyright (c) 2023    Richard Amering (TU Graz)
+        Copyright (c) 2023    Stefan Radl (TU Graz)
+ -------------------------------------------------------------------------
+"""
+import json
+import os
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import closing
+
+from shared.warehouseLayout import FILE_PREFIXES, LAYOUT_FILE_NAME, metadata_file_prefix, scan_warehouse_files
+from shared.warehouseQuery import QueryPlanner
+
+INDEX_FILE_NAME = "warehouse_index.sqlite"
+# Increase when the indexed entries change, the index is then rebuilt
+INDEX_VERSION = 2
+# Threads reading the changed files, on network file systems the latency of
+# every open and read dominates, so the files are read concurrently
+DEFAULT_READ_WORKERS = 16
+READ_BATCH_SIZE = 32
+# Read files stored per transaction, searches can use the index between two of them. Every
+# commit costs a sync, 1024 files take about 0.3 s to store and cost 15 % over one transaction
+STORE_BATCH_SIZE = 1024
+
+
+def numeric_value(value):
+    """The value as a float for numeric comparisons, None if it is no number (booleans and NaN are none)."""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        number = float(value)
+    elif isinstance(value, str):
+        try:
+            number = float(value)
+        except ValueError:
+            return None
+    else:
+        return None
+    return None if number != number else number
+
+
+def flatten_entries(data, parent_path=""):
+    """
+    Yield (key, key path, value, number) for every key of a metadata
+    document. The value is the string of the value as compared by the lookup
+    search, None for nested dictionaries, and number is the value as a float
+    if it is numeric (see numeric_value). Dictionaries inside lists are walked
+    as well.
+    """
+    if isinstance(data, dict):
+        for key, value in data.items():
+            path = f"{parent_path}.{key}" if parent_path else str(key)
+            if isinstance(value, dict):
+                yield str(key), path, None, None
+                yield from flatten_entries(value, path)
+            else:
+                yield str(key), path, str(value), numeric_value(value)
+                if isinstance(value, list):
+                    yield from flatten_entries(value, path)
+    elif isinstance(data, list):
+        for item in data:
+            yield from flatten_entries(item, parent_path)
+
+
+class WarehouseIndex:
+    """
+    Inverted index of a metadata warehouse, stored in a SQLite database in
+    the warehouse directory.
+
+    Every key of the exp-, rel- and calib-*.json files is stored with its key
+    path, its value and the file it is found in. update() only reads the files
+    that were added or changed (by size and modification time) since the
+    previous update and drops the removed ones, so searches never open the
+    JSON files. The key paths of every kind of file are stored once and
+    referenced by id, which keeps the index small for warehouses with tens of
+    thousands of files. Files are stored by their path relative to the
+    warehouse directory, so flat and sharded warehouses are indexed alike.
+    """
+
+    def __init__(self, warehouse_directory):
+        self.warehouse_directory = warehouse_directory
+        self.db_path = os.path.join(warehouse_directory, INDEX_FILE_NAME)
+        self._lock = threading.Lock()
+        # directory_signature() of the last completed update
+        self._signature = None
+        with self._lock, self._connect() as conn:
+            if conn.execute("PRAGMA user_version").fetchone()[0] != INDEX_VERSION:
+                for table in ("entries", "files", "paths"):
+                    conn.execute(f"DROP TABLE IF EXISTS {table}")
+                conn.execute(f"PRAGMA user_version = {INDEX_VERSION}")
+            conn.execute("""CREATE TABLE IF NOT EXISTS files (
+                                id INTEGER PRIMARY KEY, file TEXT UNIQUE, prefix TEXT, doi TEXT,
+                                size INTEGER, mtime_ns INTEGER)""")
+            conn.execute("""CREATE TABLE IF NOT EXISTS paths (
+                                id INTEGER PRIMARY KEY, prefix TEXT, key TEXT, path TEXT, UNIQUE (prefix, path))""")
+            conn.execute("CREATE TABLE IF NOT EXISTS entries (file_id INTEGER, path_id INTEGER, value TEXT, number REAL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS paths_key ON paths (prefix, key)")
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_path_value ON entries (path_id, value)")
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_path_number ON entries (path_id, number)")
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_file ON entries (file_id)")
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=10, isolation_level=None)
+        # The journal is kept instead of deleted after every transaction, creating and deleting it
+        # would change the modification time of the warehouse directory, see directory_signature
+        conn.execute("PRAGMA journal_mode=PERSIST")
+        return closing(conn)
+
+    def directory_signature(self):
+        """
+        Modification times of the warehouse directory, its layout file and its
+        shard directories. Adding, removing, moving or replacing a metadata
+        file changes the modification time of its directory, so the warehouse
+        is unchanged as long as the signature is. Nothing is opened and only the
+        shard directories are listed.
+        """
+        def mtime(path):
+            try:
+                return os.stat(path).st_mtime_ns
+            except FileNotFoundError:
+                return None
+
+        signature = [mtime(self.warehouse_directory),
+                     mtime(os.path.join(self.warehouse_directory, LAYOUT_FILE_NAME))]
+        for prefix in FILE_PREFIXES:
+            prefix_directory = os.path.join(self.warehouse_directory, prefix)
+            signature.append((prefix, mtime(prefix_directory)))
+            try:
+                with os.scandir(prefix_directory) as entries:
+                    shards = sorted((entry.name, entry.stat().st_mtime_ns) for entry in entries if entry.is_dir())
+            except FileNotFoundError:
+                continue
+            signature.extend(shards)
+        return tuple(signature)
+
+    def _scan(self):
+        """
+        (size, mtime_ns) of the metadata files of the warehouse, by path
+        relative to the warehouse directory. The stat results of os.scandir
+        are reused, the files are not opened.
+        """
+        files = {}
+        for relative_path, entry in scan_warehouse_files(self.warehouse_directory):
+            stat = entry.stat()
+            files[relative_path] = (stat.st_size, stat.st_mtime_ns)
+        return files
+
+    def _read(self, file_name):
+        """Return the DOI and the entries of a metadata file, a file that can not be read has none."""
+        try:
+            with open(os.path.join(self.warehouse_directory, file_name), 'r') as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            return None, []
+        doi = data.get("meta_info", {}).get("doi") if isinstance(data, dict) else None
+        return doi, list(flatten_entries(data))
+
+    def _read_batch(self, file_names):
+        return [(file_name, self._read(file_name)) for file_name in file_names]
+
+    def _read_files(self, file_names, max_workers):
+        """
+        Yield (file name, (doi, entries)) of the files as soon as a pool thread
+        has read them. The files are handed out in small batches, one future
+        per file costs more than reading a small JSON file.
+        """
+        executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="warehouse-index")
+        try:
+            futures = [executor.submit(self._read_batch, file_names[start:start + READ_BATCH_SIZE])
+                       for start in range(0, len(file_names), READ_BATCH_SIZE)]
+            for future in as_completed(futures):
+                yield from future.result()
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _store(self, conn, file, prefix, stat, doi, entries, path_ids):
+        # The file may have been indexed by an earlier update, or meanwhile by another one
+        old_file = conn.execute("SELECT id FROM files WHERE file=?", (file,)).fetchone()
+        if old_file is not None:
+            conn.execute("DELETE FROM entries WHERE file_id=?", old_file)
+            conn.execute("DELETE FROM files WHERE id=?", old_file)
+        file_id = conn.execute("INSERT INTO files (file, prefix, doi, size, mtime_ns) VALUES (?, ?, ?, ?, ?)",
+                               (file, prefix, doi, *stat)).lastrowid
+        rows = []
+        for key, path, value, number in entries:
+            path_id = path_ids.get((prefix, path))
+            if path_id is None:
+                conn.execute("INSERT OR IGNORE INTO paths (prefix, key, path) VALUES (?, ?, ?)", (prefix, key, path))
+                path_id = path_ids[prefix, path] = conn.execute(
+                    "SELECT id FROM paths WHERE prefix=? AND path=?", (prefix, path)).fetchone()[0]
+            rows.append((file_id, path_id, value, number))
+        conn.executemany("INSERT INTO entries VALUES (?, ?, ?, ?)", rows)
+
+    def _store_batch(self, batch, files, path_ids):
+        """Store read files in one transaction, the lock is only held meanwhile."""
+        with self._lock, self._connect() as conn:
+            conn.execute("BEGIN")
+            try:
+                for file, (doi, entries) in batch:
+                    self._store(conn, file, metadata_file_prefix(file), files[file], doi, entries, path_ids)
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    def update(self, max_workers=DEFAULT_READ_WORKERS, progress=None, only_if_changed=False):
+        """
+        Bring the index up to date with the warehouse directory, the added and
+        changed files are read by a pool of threads. Returns the number of
+        added, changed (moved ones included) and removed files. progress(done, total) is called after
+        every read file, it may raise to cancel; the files read until then
+        are stored and the next update continues with the rest.
+
+        With only_if_changed the directories are not scanned when their
+        directory_signature() did not change since the last update. The read
+        files are stored in batches of STORE_BATCH_SIZE, searches and queries
+        wait for one batch at most.
+        """
+        signature = self.directory_signature()
+        if only_if_changed and signature == self._signature:
+            return 0, 0, 0
+        files = self._scan()
+        with self._lock, self._connect() as conn:
+            indexed = {file: (file_id, (size, mtime_ns)) for file_id, file, size, mtime_ns
+                       in conn.execute("SELECT id, file, size, mtime_ns FROM files")}
+            changed = [file for file, stat in files.items() if file not in indexed or indexed[file][1] != stat]
+            removed = [file for file in indexed if file not in files]
+            # Files moved by resharding keep their name, size and modification time, only their path changes
+            removed_by_name = {(os.path.basename(file), indexed[file][1]): file for file in removed}
+            moved = {}
+            for file in changed:
+                source = None if file in indexed else removed_by_name.pop((os.path.basename(file), files[file]), None)
+                if source is not None:
+                    moved[file] = source
+            changed = [file for file in changed if file not in moved]
+            moved_sources = set(moved.values())
+            removed = [file for file in removed if file not in moved_sources]
+            path_ids = {(prefix, path): path_id for path_id, prefix, path
+                        in conn.execute("SELECT id, prefix, path FROM paths")}
+            if removed or moved:
+                conn.execute("BEGIN")
+                for file in removed:
+                    conn.execute("DELETE FROM entries WHERE file_id=?", (indexed[file][0],))
+                    conn.execute("DELETE FROM files WHERE id=?", (indexed[file][0],))
+                for file, source in moved.items():
+                    conn.execute("UPDATE files SET file=? WHERE id=?", (file, indexed[source][0]))
+                conn.execute("COMMIT")
+        batch = []
+        try:
+            for done, read_file in enumerate(self._read_files(changed, max_workers), 1):
+                batch.append(read_file)
+                if len(batch) == STORE_BATCH_SIZE:
+                    self._store_batch(batch, files, path_ids)
+                    batch = []
+                if progress is not None:
+                    progress(done, len(changed))
+        finally:
+            # On cancellation the files read so far are stored as well
+            if batch:
+                self._store_batch(batch, files, path_ids)
+        self._signature = signature
+        added = sum(file not in indexed for file in changed)
+        return added, len(changed) - added + len(moved), len(removed)
+
+    def path_values(self, prefix, path_pattern):
+        """(doi, key path, key, value) of the key paths of one kind that match a GLOB pattern."""
+        with self._lock, self._connect() as conn:
+            return conn.execute(
+                """SELECT files.doi, paths.path, paths.key, entries.value FROM paths
+                       JOIN entries ON entries.path_id = paths.id
+                       JOIN files ON files.id = entries.file_id
+                   WHERE paths.prefix = ? AND paths.path GLOB ? AND files.doi IS NOT NULL
+                   ORDER BY files.file""", (prefix, path_pattern)).fetchall()
+
+    def file_counts(self):
+        """Number of indexed files per prefix."""
+        counts = {prefix: 0 for prefix in FILE_PREFIXES}
+        with self._lock, self._connect() as conn:
+            for prefix, count in conn.execute("SELECT prefix, COUNT(*) FROM files GROUP BY prefix"):
+                counts[prefix] = count
+        return counts
+
+    def keys(self, prefix):
+        """All keys found in the files of one kind."""
+        with self._lock, self._connect() as conn:
+            return [key for key, in conn.execute(
+                """SELECT DISTINCT key FROM paths
+                   WHERE prefix = ? AND EXISTS (SELECT 1 FROM entries WHERE entries.path_id = paths.id)
+                   ORDER BY key""", (prefix,))]
+
+    def _search(self, prefix, path_condition, name, value):
+        with self._lock, self._connect() as conn:
+            return [file for file, in conn.execute(
+                f"""SELECT DISTINCT files.file FROM paths
+                        JOIN entries ON entries.path_id = paths.id
+                        JOIN files ON files.id = entries.file_id
+                    WHERE paths.prefix = ? AND paths.{path_condition} = ? AND entries.value = ?
+                    ORDER BY files.file""", (prefix, name, str(value)))]
+
+    def search(self, prefix, key, value):
+        """Files of one kind in which key (at any depth) has the given value, compared as strings."""
+        return self._search(prefix, "key", key, value)
+
+    def search_path(self, prefix, path, value):
+        """Files of one kind in which the key path (e.g. "Particle Info.Particle's Material") has the value."""
+        return self._search(prefix, "path", path, value)
+
+    def query(self, prefix, query):
+        """
+        Files of one kind matching a typed query such as
+        "young_p between 1e4 and 1e6 and cohesion_model == sjkr", see
+        shared.warehouseQuery. Raises QueryError for an invalid query.
+        """
+        with self._lock, self._connect() as conn:
+            return QueryPlanner(conn, prefix).run(query)
+
+    def doi_files(self):
+        """File name of every indexed DOI."""
+        with self._lock, self._connect() as conn:
+            return dict(conn.execute("SELECT doi, file FROM files WHERE doi IS NOT NULL"))
@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+"""
+This file is part of the "DEMvironment" Add-on package for Orange3, that
+facilitates the data management of the DEM parameter calibration, Mainly using
+Aspherix(c) as a DEM calibration tool.
+DEMvironment add-on is a free software: you can redistribute it
+and/or modify it under the  terms of the GNU General Public License as
+published by the Free Software  Foundation, either version 3 of the License,
+or (at your option) any later version.
+
+DEMvironment add-on is distributed in the hope that it will be useful, but WITHOUT ANY
+ WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR
+ A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License along with
+ PP-SBSC. If not, see <https://www.gnu.org/licenses/>.
+
+ -------------------------------------------------------------------------
+    Contributing author and copyright for this file:
+
+        Copyright (c) 2023    Nazanin Ghods (TU Graz)
+        Copyright (c) 2023    Richard Amering (TU Graz)
+        Copyright (c) 2023    Stefan Radl (TU Graz)
+ -------------------------------------------------------------------------
+"""
+# Directory layout of a metadata warehouse. The flat layout keeps every file
+# in the warehouse directory, the sharded layout spreads them over one
+# directory per kind of file and per first two characters of the DOI:
+#
+#     calib-b8dd112e.json            (flat)
+#     calib/b8/calib-b8dd112e.json   (sharded)
+#
+# Reshard an existing warehouse (files registered meanwhile are still found):
+#
+#     python -m shared.warehouseLayout WAREHOUSE_DIR
+#     python -m shared.warehouseLayout WAREHOUSE_DIR --layout flat
+import argparse
+import json
+import os
+import re
+import sys
+
+LAYOUT_FILE_NAME = "warehouse_layout.json"
+FLAT = "flat"
+SHARDED = "sharded"
+LAYOUTS = (FLAT, SHARDED)
+# Kinds of metadata files, the prefix of their file names
+FILE_PREFIXES = ("exp", "rel", "calib")
+# Characters of the DOI that name the shard directory, 256 shards per kind
+SHARD_WIDTH = 2
+
+# <prefix>-<doi>.json and its backups <prefix>-<doi>.json.bak / .json.v<N>.bak
+warehouse_file_pattern = re.compile(r'(exp|rel|calib)-([^.]+)\.json(\.[^/\\]*)?')
+
+
+def metadata_file_prefix(file_name):
+    """"exp", "rel" or "calib" for a metadata file name (or path), None for any other file."""
+    file_name = os.path.basename(file_name)
+    if not file_name.endswith(".json"):
+        return None
+    prefix = file_name.split("-")[0]
+    return prefix if prefix in FILE_PREFIXES else None
+
+
+def warehouse_layout(warehouse_directory):
+    """Layout of a warehouse as recorded in its layout file, flat without one."""
+    try:
+        with open(os.path.join(warehouse_directory, LAYOUT_FILE_NAME), 'r') as file:
+            layout = json.load(file).get("layout", FLAT)
+    except FileNotFoundError:
+        return FLAT
+    if layout not in LAYOUTS:
+        raise ValueError(f"Unknown metadata warehouse layout '{layout}'.")
+    return layout
+
+
+def set_warehouse_layout(warehouse_directory, layout):
+    if layout not in LAYOUTS:
+        raise ValueError(f"Unknown metadata warehouse layout '{layout}'.")
+    with open(os.path.join(warehouse_directory, LAYOUT_FILE_NAME), 'w') as file:
+        json.dump({"layout": layout}, file, indent=4)
+
+
+def relative_file_path(file_name, layout):
+    """Path of a warehouse file (or of its backup) relative to the warehouse directory."""
+    match = warehouse_file_pattern.fullmatch(file_name)
+    if layout == FLAT or not match:
+        return file_name
+    return os.path.join(match.group(1), match.group(2)[:SHARD_WIDTH], file_name)
+
+
+def warehouse_file_path(warehouse_directory, file_name, layout=None):
+    """Path a warehouse file is registered at, computed without listing any directory."""
+    layout = layout or warehouse_layout(warehouse_directory)
+    return os.path.join(warehouse_directory, relative_file_path(file_name, layout))
+
+
+def find_warehouse_file(warehouse_directory, file_name, layout=None):
+    """
+    Path of a registered warehouse file, None if it is not registered. The
+    path of the warehouse layout is checked first, then the one of the other
+    layout, so files of a warehouse that is being resharded are found as well.
+    """
+    layout = layout or warehouse_layout(warehouse_directory)
+    for candidate_layout in (layout, *(other for other in LAYOUTS if other != layout)):
+        file_path = warehouse_file_path(warehouse_directory, file_name, candidate_layout)
+        if os.path.isfile(file_path):
+            return file_path
+    return None
+
+
+def _scan_directory(directory, relative_directory, include_backups):
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if include_backups:
+                    matched = warehouse_file_pattern.fullmatch(entry.name)
+                else:
+                    matched = metadata_file_prefix(entry.name)
+                if matched and entry.is_file():
+                    yield os.path.join(relative_directory, entry.name) if relative_directory else entry.name, entry
+    except FileNotFoundError:
+        return
+
+
+def scan_warehouse_files(warehouse_directory, include_backups=False):
+    """
+    Yield (path relative to the warehouse directory, os.DirEntry) of every
+    registered metadata file, in the warehouse directory and in the shard
+    directories, whatever the layout of the warehouse is.
+    """
+    yield from _scan_directory(warehouse_directory, "", include_backups)
+    for prefix in FILE_PREFIXES:
+        try:
+            with os.scandir(os.path.join(warehouse_directory, prefix)) as entries:
+                shards = [entry.name for entry in entries if entry.is_dir()]
+        except FileNotFoundError:
+            continue
+        for shard in sorted(shards):
+            relative_directory = os.path.join(prefix, shard)
+            yield from _scan_directory(os.path.join(warehouse_directory, relative_directory), relative_directory,
+                                       include_backups)
+
+
+def reshard_warehouse(warehouse_directory, layout=SHARDED, progress=None):
+    """
+    Move the files of a warehouse, backups included, to their place in the
+    given layout and return the number of moved files. The layout file is
+    written first, so files registered meanwhile already use the new layout,
+    and an interrupted run can simply be repeated. progress(done, total) is
+    called after every moved file.
+    """
+    set_warehouse_layout(warehouse_directory, layout)
+    moves = [(relative_path, relative_file_path(entry.name, layout)) for relative_path, entry
+             in scan_warehouse_files(warehouse_directory, include_backups=True)]
+    moves = [(source, target) for source, target in moves if source != target]
+    for done, (source, target) in enumerate(moves, 1):
+        target_path = os.path.join(warehouse_directory, target)
+        os.makedirs(os.path.dirname(target_path), exist_ok=True)
+        os.replace(os.path.join(warehouse_directory, source), target_path)
+        if progress is not None:
+            progress(done, len(moves))
+    if layout == FLAT:
+        for prefix in FILE_PREFIXES:
+            _remove_empty_shards(os.path.join(warehouse_directory, prefix))
+    return len(moves)
+
+
+def _remove_empty_shards(prefix_directory):
+    if not os.path.isdir(prefix_directory):
+        return
+    for shard in os.listdir(prefix_directory):
+        try:
+            os.rmdir(os.path.join(prefix_directory, shard))
+        except OSError:
+            pass
+    try:
+        os.rmdir(prefix_directory)
+    except OSError:
+        pass
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Reshard the files of a metadata warehouse.")
+    parser.add_argument("warehouse", help="metadata warehouse directory")
+    parser.add_argument("--layout", choices=LAYOUTS, default=SHARDED,
+                        help=f"target layout (default: {SHARDED})")
+    args = parser.parse_args(argv)
+    if not os.path.isdir(args.warehouse):
+        parser.error(f"the metadata warehouse directory '{args.warehouse}' does not exist")
+
+    moved = reshard_warehouse(args.warehouse, args.layout)
+    print(f"{moved} files moved, {args.warehouse} uses the {args.layout} layout.", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,382 @@
+# -*- coding: utf-8 -*-
+"""
+This file is part of the "DEMvironment" Add-on package for Orange3, that
+facilitates the data management of the DEM parameter calibration, Mainly using
+Aspherix(c) as a DEM calibration tool.
+DEMvironment add-on is a free software: you can redistribute it
+and/or modify it under the  terms of the GNU General Public License as
+published by the Free Software  Foundation, either version 3 of the License,
+or (at your option) any later version.
+
+DEMvironment add-on is distributed in the hope that it will be useful, but WITHOUT ANY
+ WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR
+ A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License along with
+ PP-SBSC. If not, see <https://www.gnu.org/licenses/>.
+
+ -------------------------------------------------------------------------
+    Contributing author and copyright for this file:
+
+        Copyright (c) 2023    Nazanin Ghods (TU Graz)
+        Copyright (c) 2023    Richard Amering (TU Graz)
+        Copyright (c) 2023    Stefan Radl (TU Graz)
+ -------------------------------------------------------------------------
+"""
+# Typed queries over the key paths of a WarehouseIndex, e.g.
+#
+#     young_p between 1e4 and 1e6 and cohesion_model == sjkr
+#     (fric_coef_pp ~= 0.5 +- 10% or rest_coef_pp < 0.3) and not surface_model == default
+#     "Archived time" between 2024-01-01 and 2024-06-30 and "Case Name" startswith Granudrum
+#     "Particle Info.Particle's Material" matches "^(sand|glass)"
+#
+# A key is a key name (found at any depth) or a full key path. Unquoted
+# numbers are compared numerically, dates (YYYY-MM-DD, optionally with a
+# quoted time) as timestamps and everything else as strings. Operators:
+# == != < <= > >=, between ... and ..., ~= value +- tolerance (absolute, or
+# relative with %), startswith, matches (regular expression), combined with
+# and, or, not and parentheses.
+#
+#     python -m shared.warehouseQuery WAREHOUSE_DIR calib "young_p > 1e5"
+import argparse
+import re
+import sys
+from dataclasses import dataclass
+from datetime import datetime
+from functools import lru_cache
+
+token_pattern = re.compile(r'''\s*(?:(?P<string>"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')
+                                    |(?P<operator>==|!=|<=|>=|~=|\+-|[()<>=%])
+                                    |(?P<word>[^\s()"'=!<>~%]+))''', re.VERBOSE)
+date_pattern = re.compile(r'\d{4}-\d{2}-\d{2}(?: \d{2}:\d{2}(?::\d{2})?)?')
+KEYWORDS = {"and", "or", "not", "between", "startswith", "matches"}
+COMPARISON_OPERATORS = {"==": "=", "=": "=", "!=": "!=", "<": "<", "<=": "<=", ">": ">", ">=": ">="}
+# Rough cost of the comparisons, the planner evaluates the cheapest operand of an "and" first
+OPERATOR_COSTS = {"=": 0, "~=": 0, "between": 1, "<": 2, "<=": 2, ">": 2, ">=": 2, "startswith": 2, "!=": 3,
+                  "matches": 4}
+# Up to this many candidate files the remaining operands of an "and" only look at the candidates
+CANDIDATE_LIMIT = 20000
+
+
+class QueryError(ValueError):
+    pass
+
+
+@dataclass
+class Token:
+    __slots__ = ("kind", "text", "position")
+    kind: str
+    text: str
+    position: int
+
+
+@dataclass
+class Comparison:
+    """key <operator> value. The values are floats (numbers), strings or (low, high) for between and ~=."""
+    __slots__ = ("key", "operator", "value", "numeric")
+    key: str
+    operator: str
+    value: object
+    numeric: bool
+
+
+@dataclass
+class BooleanOperation:
+    __slots__ = ("operator", "operands")
+    operator: str
+    operands: list
+
+
+def tokenize(text):
+    tokens = []
+    position = 0
+    text = text.rstrip()
+    while position < len(text):
+        match = token_pattern.match(text, position)
+        if not match:
+            position = len(text) - len(text[position:].lstrip())
+            raise QueryError(f"Unexpected character '{text[position]}' at position {position}.")
+        kind = match.lastgroup
+        value = match.group(kind)
+        start = match.start(kind)
+        if kind == "string":
+            value = re.sub(r'\\(.)', r'\1', value[1:-1])
+        elif kind == "word" and value.lower() in KEYWORDS:
+            kind, value = "keyword", value.lower()
+        tokens.append(Token(kind, value, start))
+        position = match.end()
+    return tokens
+
+
+class _Parser:
+    def __init__(self, text):
+        self.tokens = tokenize(text)
+        self.index = 0
+
+    def peek(self, kind=None, text=None):
+        if self.index >= len(self.tokens):
+            return None
+        token = self.tokens[self.index]
+        if (kind and token.kind != kind) or (text and token.text != text):
+            return None
+        return token
+
+    def take(self, kind=None, text=None, expected=None):
+        token = self.peek(kind, text)
+        if token is None:
+            found = self.tokens[self.index] if self.index < len(self.tokens) else None
+            where = f"'{found.text}' at position {found.position}" if found else "the end of the query"
+            raise QueryError(f"Expected {expected or text or kind}, found {where}.")
+        self.index += 1
+        return token
+
+    def parse(self):
+        if not self.tokens:
+            raise QueryError("The query is empty.")
+        expression = self.parse_or()
+        if self.index < len(self.tokens):
+            token = self.tokens[self.index]
+            raise QueryError(f"Unexpected '{token.text}' at position {token.position}.")
+        return expression
+
+    def parse_or(self):
+        operands = [self.parse_and()]
+        while self.peek("keyword", "or"):
+            self.index += 1
+            operands.append(self.parse_and())
+        return operands[0] if len(operands) == 1 else BooleanOperation("or", operands)
+
+    def parse_and(self):
+        operands = [self.parse_not()]
+        while self.peek("keyword", "and"):
+            self.index += 1
+            operands.append(self.parse_not())
+        return operands[0] if len(operands) == 1 else BooleanOperation("and", operands)
+
+    def parse_not(self):
+        if self.peek("keyword", "not"):
+            self.index += 1
+            return BooleanOperation("not", [self.parse_not()])
+        if self.peek("operator", "("):
+            self.index += 1
+            expression = self.parse_or()
+            self.take("operator", ")", expected="')'")
+            return expression
+        return self.parse_comparison()
+
+    def parse_comparison(self):
+        key = self.take_value("a key").text
+        if self.peek("keyword", "between"):
+            self.index += 1
+            low = self.take_value("a value")
+            self.take("keyword", "and", expected="'and' of between")
+            high = self.take_value("a value")
+            (low, high), numeric = typed_values([low, high], [">=", "<="])
+            return Comparison(key, "between", (low, high), numeric)
+        if self.peek("keyword", "startswith") or self.peek("keyword", "matches"):
+            operator = self.tokens[self.index].text
+            self.index += 1
+            value = self.take_value("a value").text
+            if operator == "matches":
+                try:
+                    re.compile(value)
+                except re.error as e:
+                    raise QueryError(f"Invalid regular expression '{value}': {e}.") from e
+            return Comparison(key, operator, value, False)
+        operator = self.take("operator", expected="a comparison operator").text
+        if operator == "~=":
+            value = self.take_value("a number")
+            self.take("operator", "+-", expected="'+-' and a tolerance")
+            tolerance = self.take_value("a tolerance")
+            relative = bool(self.peek("operator", "%"))
+            if relative:
+                self.index += 1
+            number, tolerance = number_value(value), number_value(tolerance)
+            if tolerance < 0:
+                raise QueryError("The tolerance must not be negative.")
+            tolerance = abs(number) * tolerance / 100 if relative else tolerance
+            return Comparison(key, "~=", (number - tolerance, number + tolerance), True)
+        if operator not in COMPARISON_OPERATORS:
+            raise QueryError(f"Expected a comparison operator after '{key}', found '{operator}'.")
+        operator = COMPARISON_OPERATORS[operator]
+        value = self.take_value("a value")
+        if operator == "=" and date_pattern.fullmatch(value.text):
+            # A date without a time matches the whole day
+            (low, high), _ = typed_values([value, value], [">=", "<="])
+            return Comparison(key, "between", (low, high), False)
+        (value,), numeric = typed_values([value], [operator])
+        return Comparison(key, operator, value, numeric)
+
+    def take_value(self, expected):
+        token = self.peek()
+        if token is None or token.kind not in ("string", "word"):
+            return self.take("string", expected=expected)
+        self.index += 1
+        return token
+
+
+def number_value(token):
+    try:
+        return float(token.text)
+    except ValueError:
+        raise QueryError(f"'{token.text}' at position {token.position} is no number.") from None
+
+
+def date_value(token, end_of_day):
+    """A date as the "YYYY-MM-DD HH:MM:SS" string of the Archived time, so dates compare as strings."""
+    text = token.text
+    if len(text) == 10:
+        text += " 23:59:59" if end_of_day else " 00:00:00"
+    elif len(text) == 16:
+        text += ":59" if end_of_day else ":00"
+    try:
+        datetime.strptime(text, "%Y-%m-%d %H:%M:%S")
+    except ValueError:
+        raise QueryError(f"'{token.text}' at position {token.position} is no valid date.") from None
+    return text
+
+
+def typed_values(tokens, operators):
+    """
+    The values of the tokens compared with the given operators and whether
+    they are compared as numbers. All values of one comparison share the
+    type: dates if they look like dates, numbers if unquoted and numeric,
+    strings otherwise.
+    """
+    if all(date_pattern.fullmatch(token.text) for token in tokens):
+        # The end of the day for upper bounds and for "later than"
+        return [date_value(token, operator in ("<=", ">")) for token, operator in zip(tokens, operators)], False
+    if all(token.kind == "word" for token in tokens):
+        try:
+            return [float(token.text) for token in tokens], True
+        except ValueError:
+            pass
+    return [token.text for token in tokens], False
+
+
+def parse_query(text):
+    """Parse a query into Comparison and BooleanOperation nodes, raises QueryError with the position of a mistake."""
+    return _Parser(text).parse()
+
+
+@lru_cache(maxsize=64)
+def _compiled_pattern(pattern):
+    return re.compile(pattern)
+
+
+def _regexp(pattern, value):
+    return value is not None and _compiled_pattern(pattern).search(value) is not None
+
+
+def _cost(node):
+    if isinstance(node, Comparison):
+        return OPERATOR_COSTS[node.operator]
+    if node.operator == "not":
+        return 5 + _cost(node.operands[0])
+    return max(_cost(operand) for operand in node.operands)
+
+
+class QueryPlanner:
+    """
+    Runs a parsed query against the tables of a WarehouseIndex. Every
+    comparison is one indexed range scan over the entries of the matching key
+    paths: numbers use the number column, strings and dates the value column.
+    The operands of an "and" are evaluated from the cheapest to the most
+    expensive kind of comparison, and once few files are left the remaining
+    operands only look at those files. "not" is the complement within the
+    files of the queried kind.
+    """
+
+    def __init__(self, conn, prefix):
+        self.conn = conn
+        self.prefix = prefix
+        self.path_ids = {}
+        conn.create_function("REGEXP", 2, _regexp, deterministic=True)
+
+    def _path_ids(self, key):
+        if key not in self.path_ids:
+            self.path_ids[key] = [path_id for path_id, in self.conn.execute(
+                "SELECT id FROM paths WHERE prefix = ? AND (path = ? OR key = ?)", (self.prefix, key, key))]
+        return self.path_ids[key]
+
+    def all_files(self):
+        return {file_id for file_id, in self.conn.execute("SELECT id FROM files WHERE prefix = ?", (self.prefix,))}
+
+    def comparison_files(self, comparison, candidates=None):
+        path_ids = self._path_ids(comparison.key)
+        if not path_ids:
+            return set()
+        column = "number" if comparison.numeric else "value"
+        if comparison.operator in ("between", "~="):
+            condition, parameters = f"{column} BETWEEN ? AND ?", list(comparison.value)
+        elif comparison.operator == "startswith":
+            # A range on the value index instead of LIKE, which ignores the index and the case
+            condition, parameters = "value >= ? AND value < ?", [comparison.value, comparison.value + "\U0010ffff"]
+        elif comparison.operator == "matches":
+            condition, parameters = "value REGEXP ?", [comparison.value]
+        else:
+            condition, parameters = f"{column} {comparison.operator} ?", [comparison.value]
+        sql = (f"SELECT DISTINCT file_id FROM entries WHERE path_id IN ({', '.join('?' * len(path_ids))})"
+               f" AND {condition}")
+        parameters = path_ids + parameters
+        if candidates is not None:
+            sql += " AND file_id IN (SELECT value FROM json_each(?))"
+            parameters.append("[" + ",".join(map(str, candidates)) + "]")
+        return {file_id for file_id, in self.conn.execute(sql, parameters)}
+
+    def files(self, node, candidates=None):
+        """File ids matching a node, restricted to the candidates if given."""
+        if isinstance(node, Comparison):
+            return self.comparison_files(node, candidates)
+        if node.operator == "not":
+            matching = self.files(node.operands[0], candidates)
+            return (self.all_files() if candidates is None else set(candidates)) - matching
+        if node.operator == "or":
+            matching = set()
+            for operand in node.operands:
+                matching |= self.files(operand, candidates)
+            return matching
+        for operand in sorted(node.operands, key=_cost):
+            matching = self.files(operand, candidates if candidates is None or len(candidates) <= CANDIDATE_LIMIT
+                                  else None)
+            candidates = matching if candidates is None else candidates & matching
+            if not candidates:
+                break
+        return candidates
+
+    def run(self, query):
+        """Names of the files matching a query (a string or a parsed query), sorted."""
+        node = parse_query(query) if isinstance(query, str) else query
+        file_ids = self.files(node)
+        if not file_ids:
+            return []
+        return sorted(file for file, in self.conn.execute(
+            "SELECT file FROM files WHERE id IN (SELECT value FROM json_each(?))",
+            ("[" + ",".join(map(str, file_ids)) + "]",)))
+
+
+def main(argv=None):
+    # Imported here, parsing a query does not need the index
+    from shared.warehouseIndex import WarehouseIndex
+    from shared.warehouseLayout import FILE_PREFIXES
+    parser = argparse.ArgumentParser(description="Query the metadata files of a metadata warehouse.")
+    parser.add_argument("warehouse", help="metadata warehouse directory")
+    parser.add_argument("kind", choices=FILE_PREFIXES, help="kind of metadata files to query")
+    parser.add_argument("query", help='e.g. "young_p between 1e4 and 1e6 and cohesion_model == sjkr"')
+    args = parser.parse_args(argv)
+    # Checked before the index is updated, so a typo is reported right away
+    try:
+        parse_query(args.query)
+    except QueryError as e:
+        parser.error(str(e))
+
+    warehouse_index = WarehouseIndex(args.warehouse)
+    warehouse_index.update()
+    files = warehouse_index.query(args.kind, args.query)
+    for file in files:
+        print(file)
+    return 0 if files else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+"""
+This file is part of the "DEMvironment" Add-on package for Orange3, that
+facilitates the data management of the DEM parameter calibration, Mainly using
+Aspherix(c) as a DEM calibration tool.
+DEMvironment add-on is a free software: you can redistribute it
+and/or modify it under the  terms of the GNU General Public License as
+published by the Free Software  Foundation, either version 3 of the License,
+or (at your option) any later version.
+
+DEMvironment add-on is distributed in the hope that it will be useful, but WITHOUT ANY
+ WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR
+ A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License along with
+ PP-SBSC. If not, see <https://www.gnu.org/licenses/>.
+
+ -------------------------------------------------------------------------
+    Contributing author and copyright for this file:
+
+        Copyright (c) 2023    Nazanin Ghods (TU Graz)
+        Copyright (c) 2023    Richard Amering (TU Graz)
+        Copyright (c) 2023    Stefan Radl (TU Graz)
+ -------------------------------------------------------------------------
+"""
+import collections
+import json
+import os
+import threading
+
+from shared.warehouseIndex import WarehouseIndex
+
+DEFAULT_MAX_RECORDS = 2048
+
+
+class WarehouseService:
+    """
+    Process-wide access to the metadata warehouse files, shared by the
+    Lookup, Registry and DOI widgets.
+
+    Parsed JSON files are kept in a bounded LRU cache keyed on the absolute
+    path, the modification time and the size of the file, so a canvas with
+    several warehouse widgets parses every file once. The returned documents
+    are shared between the callers and must not be modified. The warehouse
+    indexes are shared in the same way, one per directory.
+    """
+
+    def __init__(self, max_records=DEFAULT_MAX_RECORDS):
+        self.max_records = max_records
+        self.hits = 0
+        self.misses = 0
+        self._records = collections.OrderedDict()
+        self._indexes = {}
+        self._lock = threading.Lock()
+
+    def read(self, file_path, store=True):
+        """
+        Return the parsed JSON of a file, from the cache while the file is
+        unchanged. Without store a parsed file is not added to the cache, so a
+        scan of the whole warehouse does not evict the files in use.
+        """
+        path = os.path.abspath(file_path)
+        stat = os.stat(path)
+        key = (path, stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            record = self._records.get(path)
+            if record is not None and record[0] == key:
+                self._records.move_to_end(path)
+                self.hits += 1
+                return record[1]
+            self.misses += 1
+        with open(path, 'r') as file:
+            data = json.load(file)
+        if not store:
+            return data
+        with self._lock:
+            self._records[path] = (key, data)
+            self._records.move_to_end(path)
+            while len(self._records) > self.max_records:
+                self._records.popitem(last=False)
+        return data
+
+    def invalidate(self, file_path):
+        """Drop a file from the cache, e.g. after it was written or renamed."""
+        with self._lock:
+            self._records.pop(os.path.abspath(file_path), None)
+
+    def index(self, warehouse_directory):
+        """The WarehouseIndex of a warehouse directory, created once per process."""
+        directory = os.path.abspath(warehouse_directory)
+        with self._lock:
+            warehouse_index = self._indexes.get(directory)
+        if warehouse_index is None:
+            warehouse_index = WarehouseIndex(directory)
+            with self._lock:
+                warehouse_index = self._indexes.setdefault(directory, warehouse_index)
+        return warehouse_index
+
+    def stats(self):
+        """Hit and miss counters and the number of cached records."""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "records": len(self._records),
+                    "max records": self.max_records}
+
+    def clear(self):
+        with self._lock:
+            self._records.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+_default_service = None
+_default_service_lock = threading.Lock()
+
+
+def get_warehouse_service():
+    """The warehouse service shared by all widgets of the process."""
+    global _default_service
+    with _default_service_lock:
+        if _default_service is None:
+            _default_service = WarehouseService()
+        return _default_service
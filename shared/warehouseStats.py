@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+"""
+This file is part of the "DEMvironment" Add-on package for Orange3, that
+facilitates the data management of the DEM parameter calibration, Mainly using
+Aspherix(c) as a DEM calibration tool.
+DEMvironment add-on is a free software: you can redistribute it
+and/or modify it under the  terms of the GNU General Public License as
+published by the Free Software  Foundation, either version 3 of the License,
+or (at your option) any later version.
+
+DEMvironment add-on is distributed in the hope that it will be useful, but WITHOUT ANY
+ WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR
+ A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License along with
+ PP-SBSC. If not, see <https://www.gnu.org/licenses/>.
+
+ -------------------------------------------------------------------------
+    Contributing author and copyright for this file:
+
+        Copyright (c) 2023    Nazanin Ghods (TU Graz)
+        Copyright (c) 2023    Richard Amering (TU Graz)
+        Copyright (c) 2023    Stefan Radl (TU Graz)
+ -------------------------------------------------------------------------
+"""
+# Core-hour statistics of the calibrations registered in a metadata warehouse:
+#
+#     python -m shared.warehouseStats WAREHOUSE_DIR
+#     python -m shared.warehouseStats WAREHOUSE_DIR --by material "contact model"
+import argparse
+import sys
+
+from shared import metadataWarehouse
+
+GROUP_KEYS = ["material", "template", "contact model"]
+UNKNOWN = "unknown"
+
+
+def _joined(values):
+    values = sorted({value for value in values if value})
+    return ", ".join(values) if values else UNKNOWN
+
+
+def core_hour_records(documents):
+    """
+    One record per registered calibration with its core-hours and the
+    material, template and contact model it belongs to. The material is taken
+    from the experiment documents the templates refer to. Calibrations
+    registered before the core-hours were extracted are skipped.
+    """
+    records = []
+    for doi, document in documents.items():
+        if metadataWarehouse.widget_indicator(document) != "calib":
+            continue
+        core_hours = document.get("Aspherix Info", {}).get("core hours")
+        if core_hours is None:
+            continue
+        materials = []
+        for template_meta_info in document.get("Template Meta Info", {}).values():
+            experiment = documents.get(template_meta_info.get("doi"), {})
+            materials.append(experiment.get("Particle Info", {}).get("Particle's Material"))
+        records.append({
+            "doi": doi,
+            "material": _joined(materials),
+            "template": _joined(document.get("Templates Info", {})),
+            "contact model": document.get("Models Info", {}).get("normal_contact_model") or UNKNOWN,
+            "core hours": float(core_hours)
+        })
+    return records
+
+
+def core_hour_records_from_index(warehouse_index):
+    """
+    Same records as core_hour_records, built from the key paths stored in a
+    WarehouseIndex, so no metadata file has to be opened.
+    """
+    # The index stores the values as strings, a missing value is "None"
+    experiment_materials = {doi: value for doi, _, _, value
+                            in warehouse_index.path_values("exp", "Particle Info.Particle's Material")
+                            if value != "None"}
+    sections = {}
+    for section, pattern in (("core hours", "Aspherix Info.core hours"),
+                             ("experiments", "Template Meta Info.*.doi"),
+                             ("templates", "Templates Info.*"),
+                             ("contact model", "Models Info.normal_contact_model")):
+        values = sections[section] = {}
+        for doi, path, key, value in warehouse_index.path_values("calib", pattern):
+            if section == "templates" and path != f"Templates Info.{key}":
+                continue
+            values.setdefault(doi, []).append(key if section == "templates" else value)
+
+    records = []
+    for doi, (core_hours, *_) in sections["core hours"].items():
+        if core_hours == "None":
+            continue
+        contact_model = sections["contact model"].get(doi, [None])[0]
+        records.append({
+            "doi": doi,
+            "material": _joined(experiment_materials.get(experiment_doi)
+                                for experiment_doi in sections["experiments"].get(doi, [])),
+            "template": _joined(sections["templates"].get(doi, [])),
+            "contact model": contact_model if contact_model not in (None, "", "None") else UNKNOWN,
+            "core hours": float(core_hours)
+        })
+    return records
+
+
+def aggregate_core_hours(records, by=GROUP_KEYS):
+    """
+    Sum up the core-hours of the records per group of the given keys. Returns
+    one dictionary per group with the number of calibrations and the total,
+    mean and largest core-hours, the most expensive group first.
+    """
+    if not records:
+        return []
+    # numpy is only needed for the aggregation, reading the warehouse does not use it
+    import numpy
+    group_labels = numpy.array(["\0".join(record[key] for key in by) for record in records])
+    core_hours = numpy.array([record["core hours"] for record in records], dtype=float)
+    groups, inverse = numpy.unique(group_labels, return_inverse=True)
+    totals = numpy.bincount(inverse, weights=core_hours, minlength=len(groups))
+    counts = numpy.bincount(inverse, minlength=len(groups))
+    maxima = numpy.full(len(groups), -numpy.inf)
+    numpy.maximum.at(maxima, inverse, core_hours)
+
+    aggregated = []
+    for index in numpy.argsort(-totals, kind="stable"):
+        group = dict(zip(by, str(groups[index]).split("\0")))
+        group.update({
+            "calibrations": int(counts[index]),
+            "core hours": round(float(totals[index]), 4),
+            "mean core hours": round(float(totals[index] / counts[index]), 4),
+            "max core hours": round(float(maxima[index]), 4)
+        })
+        aggregated.append(group)
+    return aggregated
+
+
+def warehouse_core_hours(warehouse_directory, by=GROUP_KEYS):
+    """Core-hours of all calibrations of a warehouse, aggregated by the given keys."""
+    documents = metadataWarehouse.read_warehouse_documents(warehouse_directory)
+    return aggregate_core_hours(core_hour_records(documents), by)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Core-hours of the calibrations in a metadata warehouse.")
+    parser.add_argument("warehouse", help="metadata warehouse directory")
+    parser.add_argument("--by", nargs="+", choices=GROUP_KEYS, default=GROUP_KEYS,
+                        help="keys to group the calibrations by (default: all)")
+    args = parser.parse_args(argv)
+
+    aggregated = warehouse_core_hours(args.warehouse, args.by)
+    if not aggregated:
+        print("No calibrations with core-hours found.", file=sys.stderr)
+        return 1
+    columns = list(args.by) + ["calibrations", "core hours", "mean core hours", "max core hours"]
+    widths = [max(len(column), *(len(str(group[column])) for group in aggregated)) for column in columns]
+    print("  ".join(column.ljust(width) for column, width in zip(columns, widths)).rstrip())
+    for group in aggregated:
+        print("  ".join(str(group[column]).ljust(width) for column, width in zip(columns, widths)).rstrip())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
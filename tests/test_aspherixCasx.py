@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""
+This file is part of the "DEMvironment" Add-on package for Orange3, that
+facilitates the data management of the DEM parameter calibration, Mainly using
+Aspherix(c) as a DEM calibration tool.
+DEMvironment add-on is a free software: you can redistribute it
+and/or modify it under the  terms of the GNU General Public License as
+published by the Free Software  Foundation, either version 3 of the License,
+or (at your option) any later version.
+
+DEMvironment add-on is distributed in the hope that it will be useful, but WITHOUT ANY
+ WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR
+ A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License along with
+ PP-SBSC. If not, see <https://www.gnu.org/licenses/>.
+
+ -------------------------------------------------------------------------
+    Contributing author and copyright for this file:
+
+        Copyright (c) 2023    Nazanin Ghods (TU Graz)
+        Copyright (c) 2023    Richard Amering (TU Graz)
+        Copyright (c) 2023    Stefan Radl (TU Graz)
+ -------------------------------------------------------------------------
+"""
+# Tests of the input deck cross-check on synthetic logs, run from the repository root:
+#
+#     python -m pytest tests
+import io
+import os
+import tempfile
+import unittest
+
+from benchmarks.aspherixLogGenerator import generate_log
+from shared import aspherixCasx, aspherixLog
+
+
+def setup_commands(log_text):
+    """The commands of the first setup echoed in a log, i.e. the input deck it was started with."""
+    commands = []
+    for line in log_text.splitlines():
+        if line[aspherixLog.MARKER_START:aspherixLog.MARKER_END] != aspherixLog.COMMAND_MARKER:
+            continue
+        payload = line[aspherixLog.PAYLOAD_START:]
+        if payload.startswith("run "):
+            break
+        if not payload.startswith("reading file"):
+            commands.append(payload)
+    return commands
+
+
+class RestartedCrossCheckTest(unittest.TestCase):
+    """The setup repeated by a restart must not show up as differences to the input deck."""
+
+    def test_no_differences(self):
+        log_file = io.StringIO()
+        generate_log(log_file, iterations=40, templates=2, restarts=3, psd_classes=4)
+        parser = aspherixLog.CalibrationLogParser()
+        parser.feed_file(io.StringIO(log_file.getvalue()))
+        with tempfile.TemporaryDirectory() as directory:
+            casx_path = os.path.join(directory, "benchmark" + aspherixCasx.CASX_EXTENSION)
+            with open(casx_path, 'w') as casx_file:
+                casx_file.write("\n".join(setup_commands(log_file.getvalue())) + "\n")
+            input_deck = aspherixCasx.read_input_deck(casx_path)
+        self.assertEqual(aspherixCasx.cross_check(input_deck, parser.results()), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""
+This file is part of the "DEMvironment" Add-on package for Orange3, that
+facilitates the data management of the DEM parameter calibration, Mainly using
+Aspherix(c) as a DEM calibration tool.
+DEMvironment add-on is a free software: you can redistribute it
+and/or modify it under the  terms of the GNU General Public License as
+published by the Free Software  Foundation, either version 3 of the License,
+or (at your option) any later version.
+
+DEMvironment add-on is distributed in the hope that it will be useful, but WITHOUT ANY
+ WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR
+ A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License along with
+ PP-SBSC. If not, see <https://www.gnu.org/licenses/>.
+
+ -------------------------------------------------------------------------
+    Contributing author and copyright for this file:
+
+        Copyright (c) 2023    Nazanin Ghods (TU Graz)
+        Copyright (c) 2023    Richard Amering (TU Graz)
+        Copyright (c) 2023    Stefan Radl (TU Graz)
+ -------------------------------------------------------------------------
+"""
+# Tests of the calibration log parser on synthetic logs, run from the repository root:
+#
+#     python -m pytest tests
+import io
+import unittest
+
+from benchmarks.aspherixLogGenerator import generate_log
+from shared import aspherixLog
+
+
+def parse_generated_log(**settings):
+    """Parse a synthetic log written by the benchmark generator."""
+    log_file = io.StringIO()
+    generate_log(log_file, **settings)
+    log_file.seek(0)
+    parser = aspherixLog.CalibrationLogParser()
+    parser.feed_file(log_file)
+    return parser
+
+
+class RestartedLogTest(unittest.TestCase):
+    """A restart repeats the setup commands, they must not be counted twice."""
+
+    def setUp(self):
+        settings = {"iterations": 40, "templates": 2, "psd_classes": 4}
+        self.single = parse_generated_log(**settings).results()
+        self.restarted = parse_generated_log(restarts=3, **settings).results()
+
+    def test_psd(self):
+        psd = self.restarted[aspherixLog.SECTION_NAMES.index("PSD")]
+        self.assertEqual(psd["dispersity"], 4)
+        self.assertEqual(len(psd["mass_fractions_list"]), 4)
+        self.assertEqual(psd, self.single[aspherixLog.SECTION_NAMES.index("PSD")])
+
+    def test_templates_info(self):
+        index = aspherixLog.SECTION_NAMES.index("Templates Info")
+        self.assertEqual(self.restarted[index], self.single[index])
+        for target_params in self.restarted[index].values():
+            self.assertEqual(len(target_params), len(set(target_params)))
+
+
+if __name__ == "__main__":
+    unittest.main()